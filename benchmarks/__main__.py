@@ -0,0 +1,78 @@
+"""Набор бенчмарков с сохраненными базовыми значениями.
+
+Запуск: python -m benchmarks [--filter memory] [--save-baseline] [--threshold 0.25]
+
+Базовые значения хранятся в benchmarks/baselines.json отдельно для каждой
+машины и версии Python. Если случай стал медленнее базы больше чем на
+threshold, он помечается как регрессия и команда завершается с кодом 1.
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+from benchmarks.suite import CASES, run_cases
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+def machine_key():
+    return f"{platform.node()}/{platform.system()}/{platform.python_version()}"
+
+def load_baselines():
+    try:
+        with open(BASELINES_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} мс"
+    return f"{seconds * 1e6:9.1f} мкс"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="запускать только случаи, содержащие эту подстроку")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как базовые")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление (0.25 = 25%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальная длительность одной серии, с")
+    parser.add_argument("--repeat", type=int, default=5, help="число серий")
+    parser.add_argument("--list", action="store_true", help="показать случаи и выйти")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return
+    if not names:
+        parser.error(f"Нет случаев, содержащих «{args.filter}»")
+
+    baselines = load_baselines()
+    baseline = baselines.get(machine_key(), {})
+    results, regressions = {}, []
+
+    for name, seconds in run_cases(names, args.min_time, args.repeat):
+        results[name] = seconds
+        line = f"{name:42} {format_time(seconds)}"
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += f"   база {format_time(baseline[name])}  {ratio - 1:+7.1%}"
+            if ratio > 1 + args.threshold:
+                line += "  РЕГРЕССИЯ"
+                regressions.append(name)
+        print(line, flush=True)
+
+    if args.save_baseline:
+        baselines[machine_key()] = {**baseline, **results}
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"\nБазовые значения сохранены для {machine_key()}")
+    elif not baseline:
+        print("\nБазовых значений для этой машины нет; сохраните их флагом --save-baseline")
+
+    if regressions:
+        print(f"\nРегрессии (> {args.threshold:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Скорость движков распознавания на записанных WAV-файлах.
+
+Запуск: python -m benchmarks.bench_recognizers [--fixtures папка_с_wav] [--backends google,vosk]
+
+Для каждого файла и движка выводится коэффициент реального времени
+(RTF = время обработки / длительность записи) и задержка после конца
+фразы: для потоковых движков это только время finish(), остальное
+распознается параллельно с захватом. Нераспознанные фразы считаются
+отдельно; их время тоже входит в медиану — движок на них потратил столько же.
+
+Если папка не указана или в ней нет WAV-файлов, фразы генерируются:
+синтезатором речи (TTSWorker), а без него — синтетическим звуком, который
+движки не распознают, но обрабатывают за реальное время.
+"""
+import os
+import time
+import wave
+import argparse
+import tempfile
+import statistics
+import speech_recognition as sr
+from core.recognizers import create_backend
+from benchmarks import fakes
+
+PHRASES = [
+    "который час",
+    "открой блокнот",
+    "какая погода в москве",
+    "найди рецепт борща",
+    "сделай скриншот второго монитора",
+    "расскажи, как настроить резервное копирование",
+]
+
+def generate_fixtures(directory):
+    """Записывает PHRASES в WAV-файлы папки directory"""
+    os.makedirs(directory, exist_ok=True)
+    try:
+        from core.tts_worker import TTSWorker
+        tts = TTSWorker({"voice_rate": 190})
+    except Exception as e:
+        tts = None
+        print(f"Синтезатор речи недоступен ({e}), фразы заменены синтетическим звуком")
+
+    for index, phrase in enumerate(PHRASES):
+        path = os.path.join(directory, f"phrase_{index:02d}.wav")
+        if tts is not None:
+            tts.save_to_file(phrase, path)
+            continue
+        seconds = 1.0 + 0.08 * len(phrase)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(fakes.synthetic_speech(seconds=seconds, bursts=((0.3, seconds - 0.3),)))
+    if tts is not None:
+        tts.close()
+
+def load_audio(path):
+    with sr.AudioFile(path) as source:
+        chunks = []
+        while True:
+            chunk = source.stream.read(source.CHUNK)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return chunks, source.SAMPLE_RATE, source.SAMPLE_WIDTH
+
+def run_backend(backend, chunks, sample_rate, sample_width):
+    """Возвращает (текст или None, общее время обработки, задержка после последнего фрагмента)"""
+    started = time.perf_counter()
+    try:
+        if backend.streaming:
+            stream = backend.start_stream(sample_rate, sample_width)
+            for chunk in chunks:
+                stream.feed(chunk)
+            finish_started = time.perf_counter()
+            text = stream.finish()
+        else:
+            audio = sr.AudioData(b"".join(chunks), sample_rate, sample_width)
+            finish_started = started
+            text = backend.recognize(audio)
+    except sr.UnknownValueError:
+        text = None
+    finished = time.perf_counter()
+    return text, finished - started, finished - finish_started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="папка с WAV-файлами; пустая или новая заполняется сгенерированными фразами")
+    parser.add_argument("--backends", default="google,vosk")
+    parser.add_argument("--vosk-model-path", default="data/models/vosk-model-small-ru")
+    parser.add_argument("--whisper-model", default="base")
+    args = parser.parse_args()
+
+    tmp = None
+    fixtures = args.fixtures
+    if fixtures is None:
+        tmp = tempfile.TemporaryDirectory(prefix="jarvis-bench-")
+        fixtures = tmp.name
+    if not os.path.isdir(fixtures) or not any(name.lower().endswith(".wav") for name in os.listdir(fixtures)):
+        generate_fixtures(fixtures)
+    files = sorted(
+        os.path.join(fixtures, name) for name in os.listdir(fixtures) if name.lower().endswith(".wav")
+    )
+
+    config = {"language": "ru-RU", "vosk_model_path": args.vosk_model_path, "whisper_model": args.whisper_model}
+    recognizer = sr.Recognizer()
+    audio = {path: load_audio(path) for path in files}
+
+    for name in args.backends.split(","):
+        try:
+            backend = create_backend(name.strip(), recognizer, config)
+        except Exception as e:
+            print(f"{name}: пропущен ({e})")
+            continue
+
+        factors, tails, unrecognized, errors = [], [], 0, 0
+        for path in files:
+            chunks, sample_rate, sample_width = audio[path]
+            duration = len(b"".join(chunks)) / (sample_rate * sample_width)
+            try:
+                text, elapsed, tail = run_backend(backend, chunks, sample_rate, sample_width)
+            except Exception as e:
+                errors += 1
+                print(f"{name} {os.path.basename(path)}: ошибка {e}")
+                continue
+            if not text:
+                unrecognized += 1
+            factors.append(elapsed / duration)
+            tails.append(tail)
+            print(f"{name:8} {os.path.basename(path):30} RTF {elapsed / duration:5.2f}  "
+                  f"после фразы {tail * 1000:7.1f} мс  «{text or '— не распознано —'}»")
+
+        summary = f"{name:8} файлов {len(files)}, не распознано {unrecognized}, ошибок {errors}"
+        if factors:
+            summary += (f"; медиана RTF {statistics.median(factors):.2f}, "
+                        f"задержка после фразы {statistics.median(tails) * 1000:.1f} мс")
+        print(summary + "\n")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Хвост задержек и сбои при обращении к ИИ: с дублирующими запросами и без.
+
+Запуск: python -m benchmarks.bench_resilience [--requests 300] [--slow-rate 0.02] [--quantile 0.95]
+Использует локальный FakeOpenAIServer, который замедляет часть ответов
+и, при --error-rate, отвечает ошибками 503.
+"""
+import time
+import argparse
+import openai
+from core.ai_client import ResilientClient
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def run(args, hedge):
+    """Прогоняет запросы и возвращает времена (секунды) и число неудачных"""
+    server = FakeOpenAIServer(
+        first_token_delay=args.delay, token_delay=0, error_rate=args.error_rate,
+        slow_rate=args.slow_rate, slow_delay=args.slow_delay, seed=args.seed,
+    )
+    with server:
+        openai.api_key = "bench"
+        openai.api_base = server.api_base
+        client = ResilientClient({
+            "hedge": hedge, "hedge_quantile": args.quantile, "backoff": 0.05, "failure_threshold": args.requests,
+        })
+        messages = [{"role": "user", "content": "привет"}]
+
+        # Разогрев: набираем статистику для порога дублирования
+        for _ in range(client.hedge_min_samples):
+            client.create(model="fake", messages=messages, max_tokens=20)
+
+        times, failures = [], 0
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            try:
+                client.create(model="fake", messages=messages, max_tokens=20)
+            except Exception:
+                failures += 1
+            times.append(time.perf_counter() - started)
+        client.close()
+        return times, failures, server.requests, len(server.connections)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--delay", type=float, default=0.02, help="обычная задержка ответа, с")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="доля медленных ответов")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="дополнительная задержка медленного ответа, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов с ошибкой 503")
+    parser.add_argument("--quantile", type=float, default=0.95, help="квантиль задержки для дублирующего запроса")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'режим':12} {'p50':>8} {'p95':>8} {'p99':>8} {'макс':>8} {'сбоев':>6} {'запросов':>9} {'соединений':>11}")
+    for hedge in (False, True):
+        times, failures, requests, connections = run(args, hedge)
+        print(
+            f"{'hedge' if hedge else 'обычный':12}"
+            + "".join(f" {percentile(times, p) * 1000:6.0f}мс" for p in (0.5, 0.95, 0.99, 1.0))
+            + f" {failures:6} {requests:9} {connections:11}"
+        )
+
+if __name__ == "__main__":
+    main()
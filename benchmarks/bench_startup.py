@@ -0,0 +1,121 @@
+"""Время холодного старта: импорт и инициализация по компонентам.
+
+Запуск: python -m benchmarks.bench_startup [--runs 5]
+
+Каждый замер идет в отдельном процессе, чтобы импорты были холодными.
+Сравниваются два режима:
+  serial — все компоненты создаются по очереди при старте (как раньше);
+  lazy   — при старте параллельно создаются только startup_components,
+           остальное загружается при первом обращении.
+Для режима serial выводится разбивка: импорт модуля и создание объекта.
+Как и в остальном наборе, речь, микрофон и модель заменены заглушками,
+а данные и настройки лежат во временной папке.
+"""
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+import statistics
+from benchmarks import fakes
+
+# Модуль, который импортирует фабрика каждого компонента
+COMPONENT_MODULES = {
+    "memory": "core.memory",
+    "executor": "core.executor",
+    "speech": "core.speech",
+    "ai": "core.ai_brain",
+    "system_commands": "modules.system_commands",
+    "app_manager": "modules.applications",
+    "web_search": "modules.web_search",
+    "personal_assistant": "modules.personal_assist",
+}
+
+def child(mode):
+    """Замер в текущем (свежем) процессе; результат печатается как JSON"""
+    result = {"components": {}}
+    restore = [
+        fakes.install_chat_completion(fakes.FakeChatCompletion()),
+        fakes.install_tts(fakes.FakeTTSEngine()),
+        fakes.install_microphone(),
+    ]
+    tmp = fakes.temp_dir()
+    # Заменители ставятся перехватом импорта: openai, speech_recognition и
+    # прочие зависимости еще не импортированы и попадут в замер
+    assert "openai" not in sys.modules and "speech_recognition" not in sys.modules
+
+    started = time.perf_counter()
+    import main
+    result["import_main"] = time.perf_counter() - started
+
+    config = {
+        "ai": {"api_key": "bench"},
+        "weather": {"prefetch_interval": 0},
+    }
+    if mode == "serial":
+        config["system"] = {"startup_components": []}
+
+    init_started = time.perf_counter()
+    jarvis = fakes.make_jarvis(tmp.name, config)
+    if mode == "serial":
+        for name, module in COMPONENT_MODULES.items():
+            try:
+                import_started = time.perf_counter()
+                importlib.import_module(module)
+                imported = time.perf_counter()
+                jarvis.registry.get(name)
+                result["components"][name] = [imported - import_started, time.perf_counter() - imported]
+            except Exception as e:
+                result["components"][name] = str(e)
+    else:
+        result["components"] = dict(jarvis.registry.timings)
+    result["init"] = time.perf_counter() - init_started
+    result["ready"] = time.perf_counter() - started
+
+    jarvis.registry.close()
+    for undo in reversed(restore):
+        undo()
+    tmp.cleanup()
+    print(json.dumps(result))
+
+def run_child(mode):
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode], capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()
+        sys.exit(f"Режим {mode}: запуск не удался: {error[-1] if error else process.returncode}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=["serial", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    results = {mode: [run_child(mode) for _ in range(args.runs)] for mode in ("serial", "lazy")}
+
+    print("Разбивка по компонентам (serial), медиана, мс:")
+    for name in COMPONENT_MODULES:
+        values = [run["components"].get(name) for run in results["serial"]]
+        if any(not isinstance(value, list) for value in values):
+            error = next(value for value in values if not isinstance(value, list))
+            print(f"  {name:20} ошибка: {error}")
+            continue
+        import_time = statistics.median(value[0] for value in values) * 1000
+        init_time = statistics.median(value[1] for value in values) * 1000
+        print(f"  {name:20} импорт {import_time:8.1f}  создание {init_time:8.1f}")
+
+    print("\nДо готовности к первому «Слушаю...», медиана, мс:")
+    for mode, runs in results.items():
+        import_main = statistics.median(run["import_main"] for run in runs) * 1000
+        ready = statistics.median(run["ready"] for run in runs) * 1000
+        print(f"  {mode:7} импорт main {import_main:8.1f}  всего {ready:8.1f}")
+
+if __name__ == "__main__":
+    main()
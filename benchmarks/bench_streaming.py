@@ -0,0 +1,51 @@
+"""Время до первого звука: обычный и потоковый ответ ИИ.
+
+Запуск: python -m benchmarks.bench_streaming [--runs 5]
+Использует локальный FakeOpenAIServer вместо настоящего API.
+"""
+import time
+import argparse
+import tempfile
+import statistics
+from core.memory import MemorySystem
+from core.ai_brain import AI
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+def measure(ai, question, stream):
+    """Возвращает (время до первого предложения, полное время) в секундах"""
+    first_audio = []
+    started = time.perf_counter()
+
+    def speak(sentence):
+        if not first_audio:
+            first_audio.append(time.perf_counter() - started)
+
+    if stream:
+        ai.process_stream(question, speak)
+    else:
+        speak(ai.process(question))
+    return first_audio[0], time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(first_token_delay=args.first_token_delay, token_delay=args.token_delay) as server, \
+            tempfile.TemporaryDirectory() as memory_dir:
+        memory = MemorySystem(memory_dir, {"retrieval": False})
+        ai = AI({"api_key": "fake", "api_base": server.api_base, "model": "fake", "cache": {"enabled": False}}, memory)
+
+        for stream in (False, True):
+            results = [measure(ai, f"Как обновить систему? {i}", stream) for i in range(args.runs)]
+            first = statistics.median(r[0] for r in results) * 1000
+            total = statistics.median(r[1] for r in results) * 1000
+            mode = "поток" if stream else "целиком"
+            print(f"{mode:8} первое предложение: {first:7.1f} мс   полный ответ: {total:7.1f} мс")
+
+        memory.close()
+
+if __name__ == "__main__":
+    main()
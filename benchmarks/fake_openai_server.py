@@ -0,0 +1,136 @@
+"""Локальная имитация OpenAI Chat Completions для бенчмарков.
+
+Отвечает на POST /v1/chat/completions заранее заданным текстом, в том
+числе потоком (SSE), с настраиваемой задержкой первого токена и между
+токенами. Подключение: openai.api_base = server.api_base
+
+Для проверки устойчивости клиента сервер умеет вносить сбои: первые
+fail_first запросов и доля error_rate остальных получают ответ с кодом
+error_status, а доля slow_rate запросов отвечает на slow_delay секунд
+дольше (хвост задержек).
+"""
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Конечно, я могу помочь. Сначала откройте настройки системы. "
+    "Затем выберите раздел с обновлениями и нажмите кнопку проверки. "
+    "После установки обновлений перезагрузите компьютер."
+)
+
+class FakeOpenAIServer:
+    def __init__(self, reply=DEFAULT_REPLY, first_token_delay=0.3, token_delay=0.02, port=0,
+                 fail_first=0, error_rate=0.0, error_status=503, slow_rate=0.0, slow_delay=1.0, seed=None):
+        """Создает сервер; port=0 выбирает свободный порт"""
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.connections = set()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                server.connections.add(self.client_address)
+                server.handle_completion(self, body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def tokens(self):
+        """Делит ответ на токены примерно по словам"""
+        words = self.reply.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def handle_completion(self, handler, body):
+        """Отвечает на запрос завершения, обычный или потоковый"""
+        model = body.get("model", "fake")
+        with self.lock:
+            self.requests += 1
+            failing = self.requests <= self.fail_first or self.random.random() < self.error_rate
+            slow = self.random.random() < self.slow_rate
+            self.errors += failing
+            self.slow += slow
+        time.sleep(self.first_token_delay + (self.slow_delay if slow else 0))
+
+        if failing:
+            payload = json.dumps({"error": {"message": "injected failure", "type": "server_error"}}).encode("utf-8")
+            handler.send_response(self.error_status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+
+        if not body.get("stream"):
+            time.sleep(self.token_delay * len(self.tokens()))
+            payload = json.dumps({
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": self.reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode("utf-8")
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+
+        # Длина потока заранее неизвестна: его конец обозначается закрытием соединения
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+        for i, token in enumerate(self.tokens()):
+            if i:
+                time.sleep(self.token_delay)
+            chunk = {
+                "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,82 @@
+"""Локальная имитация OpenWeatherMap для проверок и бенчмарков.
+
+Отвечает на GET /data/2.5/weather?q=Город с настраиваемой задержкой.
+Города из списка unknown дают 404, fail_first первых запросов — 503
+(для проверки повторов). Подключение: weather.base_url = server.base_url
+"""
+import json
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeWeatherServer:
+    def __init__(self, delay=0.05, fail_first=0, unknown=(), port=0):
+        """Создает сервер; port=0 выбирает свободный порт"""
+        self.delay = delay
+        self.fail_first = fail_first
+        self.unknown = set(unknown)
+        self.requests = 0
+        self.cities = []
+        self.connections = set()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Иначе заголовки и тело уходят разными пакетами и ответ ждет подтверждения TCP
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                server.connections.add(self.client_address)
+                server.handle_weather(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/data/2.5/weather"
+
+    def handle_weather(self, handler):
+        city = parse_qs(urlparse(handler.path).query).get("q", [""])[0]
+        self.cities.append(city)
+        time.sleep(self.delay)
+
+        if self.requests <= self.fail_first:
+            status, payload = 503, {"cod": 503, "message": "service unavailable"}
+        elif city in self.unknown:
+            status, payload = 404, {"cod": "404", "message": "city not found"}
+        else:
+            status, payload = 200, {
+                "name": city,
+                "weather": [{"description": "переменная облачность"}],
+                "main": {"temp": 12.3, "feels_like": 10.1, "humidity": 71},
+            }
+
+        body = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
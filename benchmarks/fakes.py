@@ -0,0 +1,254 @@
+"""Локальные заменители внешних зависимостей для бенчмарков.
+
+FakeChatCompletion — openai.ChatCompletion без сети, FakeMicrophone —
+sr.Microphone с синтетическим звуком, FakeTTSEngine — движок pyttsx3 без
+звука. HTTP-заглушки: fake_openai_server и fake_weather_server.
+
+Заменители ставятся перехватом импорта: openai и speech_recognition
+импортируются по-настоящему там, где их импортирует Джарвис, и
+подменяются сразу после этого — замеры холодного старта видят
+реальную стоимость импорта.
+"""
+import os
+import sys
+import json
+import math
+import time
+import types
+import wave
+import struct
+import tempfile
+import importlib.util
+
+DEFAULT_REPLY = "Конечно. Сначала откройте настройки. Затем выберите нужный раздел и сохраните изменения."
+
+class FakeChatCompletion:
+    """Заменитель openai.ChatCompletion: отвечает заданным текстом без обращения к сети"""
+    def __init__(self, reply=DEFAULT_REPLY, delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+        self.last_messages = None
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        self.calls += 1
+        self.last_messages = messages
+        if self.delay:
+            time.sleep(self.delay)
+        if stream:
+            return self.chunks()
+        return FakeObject(choices=[FakeObject(message={"role": "assistant", "content": self.reply})])
+
+    def chunks(self):
+        for word in self.reply.split(" "):
+            yield {"choices": [{"delta": {"content": word + " "}}]}
+
+class FakeObject(dict):
+    """Словарь с доступом к полям через атрибуты, как OpenAIObject"""
+    __getattr__ = dict.__getitem__
+
+class PatchingLoader:
+    """Загрузчик-обертка: выполняет модуль настоящим загрузчиком, затем применяет заменитель"""
+    def __init__(self, loader, hook):
+        self.loader = loader
+        self.hook = hook
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        self.hook.apply(module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+class PostImportHook:
+    """Перехватчик в sys.meta_path: находит модуль обычными средствами и оборачивает загрузчик"""
+    def __init__(self, name, patch):
+        self.name = name
+        self.patch = patch
+        self.undo = None
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname != self.name:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None and spec.loader is not None:
+                spec.loader = PatchingLoader(spec.loader, self)
+                return spec
+        return None
+
+    def apply(self, module):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        self.undo = self.patch(module)
+
+def patch_on_import(name, patch):
+    """Вызывает patch(module) сразу после импорта модуля name (или сейчас, если он уже импортирован).
+
+    patch возвращает функцию отмены. Результат — функция, которая снимает
+    перехват и отменяет подмену.
+    """
+    hook = PostImportHook(name, patch)
+    if name in sys.modules:
+        hook.apply(sys.modules[name])
+    else:
+        sys.meta_path.insert(0, hook)
+
+    def undo():
+        if hook in sys.meta_path:
+            sys.meta_path.remove(hook)
+        if hook.undo is not None:
+            hook.undo()
+    return undo
+
+def replace_attribute(name, value):
+    """patch для patch_on_import: заменяет атрибут модуля и возвращает отмену"""
+    def patch(module):
+        original = getattr(module, name, None)
+        setattr(module, name, value)
+        return lambda: setattr(module, name, original)
+    return patch
+
+def install_chat_completion(fake):
+    """Подменяет openai.ChatCompletion после импорта openai; возвращает функцию отмены"""
+    return patch_on_import("openai", replace_attribute("ChatCompletion", fake))
+
+def synthetic_speech(seconds=3.0, sample_rate=16000, bursts=((0.8, 1.6),), noise=80, level=3000):
+    """PCM 16 бит: фоновый шум и тональные «фразы» в указанных интервалах"""
+    samples = []
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        value = noise * math.sin(2 * math.pi * 53 * t)
+        if any(start <= t < end for start, end in bursts):
+            value += level * math.sin(2 * math.pi * 220 * t)
+        samples.append(int(value))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+class FakeMicrophoneStream:
+    def __init__(self, data, realtime):
+        self.data = data
+        self.position = 0
+        self.realtime = realtime
+
+    def read(self, size):
+        chunk = self.data[self.position:self.position + size * 2]
+        self.position += size * 2
+        if self.realtime and chunk:
+            time.sleep(len(chunk) / 2 / 16000)
+        return chunk
+
+class FakeMicrophone:
+    """Заменитель sr.Microphone: отдает заранее синтезированный звук.
+
+    Повторяет интерфейс sr.AudioSource, но не наследует его, чтобы
+    speech_recognition не импортировался вместе с заменителями.
+    """
+    def __init__(self, data=None, realtime=False):
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = 1024
+        self.data = data if data is not None else synthetic_speech()
+        self.realtime = realtime
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = FakeMicrophoneStream(self.data, self.realtime)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stream = None
+
+class FakeVoice:
+    def __init__(self, voice_id):
+        self.id = voice_id
+
+class FakeTTSEngine:
+    """Заменитель движка pyttsx3: «произносит» без звука, в файл пишет тишину.
+
+    Поддерживает внешний цикл событий (startLoop(False) и iterate), как
+    его использует TTSWorker: речь длится seconds_per_char на символ.
+    """
+    def __init__(self, seconds_per_char=0.0):
+        self.properties = {"voices": [FakeVoice("fake-ru")], "voice": "fake-ru", "rate": 190}
+        self.seconds_per_char = seconds_per_char
+        self.speaking = None
+        self.spoken = []
+        self.stopped = []
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def startLoop(self, use_driver_loop=True):
+        pass
+
+    def endLoop(self):
+        pass
+
+    def iterate(self):
+        if self.speaking is not None and time.perf_counter() >= self.speaking[1]:
+            self.spoken.append(self.speaking[0])
+            self.speaking = None
+
+    def isBusy(self):
+        return self.speaking is not None
+
+    def say(self, text, name=None):
+        self.speaking = (text, time.perf_counter() + len(text) * self.seconds_per_char)
+
+    def save_to_file(self, text, path, name=None):
+        # Как sapi5: запись в файл выполняется сразу
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(b"\0\0" * 1600)
+
+    def stop(self):
+        if self.speaking is not None:
+            self.stopped.append(self.speaking[0])
+            self.speaking = None
+
+def install_tts(engine):
+    """Подменяет pyttsx3.init; если pyttsx3 не установлен, регистрирует модуль-заменитель"""
+    if "pyttsx3" not in sys.modules and importlib.util.find_spec("pyttsx3") is None:
+        sys.modules["pyttsx3"] = types.ModuleType("pyttsx3")
+    return patch_on_import("pyttsx3", replace_attribute("init", lambda *args, **kwargs: engine))
+
+def install_microphone(factory=FakeMicrophone):
+    """Подменяет sr.Microphone после импорта speech_recognition; возвращает функцию отмены"""
+    return patch_on_import("speech_recognition", replace_attribute("Microphone", factory))
+
+def merge(base, changes):
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+def make_jarvis(root, config=None, overrides=None):
+    """Создает Джарвиса, у которого данные и настройки лежат во временной папке root.
+
+    Настройки — стандартные (как при первом запуске) с изменениями из config.
+    """
+    import main
+
+    main.CONFIG_PATH = os.path.join(root, "config", "settings.json")
+    main.DATA_PATH = os.path.join(root, "data")
+    os.makedirs(os.path.join(main.DATA_PATH, "memory"), exist_ok=True)
+
+    settings = merge(main.load_config(), config or {})
+    with open(main.CONFIG_PATH, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False)
+    return main.Jarvis(overrides)
+
+def temp_dir():
+    return tempfile.TemporaryDirectory(prefix="jarvis-bench-")
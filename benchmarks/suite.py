@@ -0,0 +1,248 @@
+"""Набор бенчмарков горячих путей Джарвиса.
+
+Каждый случай — генератор: код до yield готовит окружение, yield отдает
+замеряемую функцию без аргументов, код после yield освобождает ресурсы.
+Все внешние зависимости заменены локальными (см. benchmarks.fakes).
+"""
+import io
+import os
+import time
+import random
+import itertools
+import logging
+import statistics
+import contextlib
+from collections import deque
+from datetime import datetime, timedelta
+from benchmarks import fakes
+from benchmarks.fake_weather_server import FakeWeatherServer
+
+CASES = {}
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+UTTERANCES = [
+    "сделай скриншот",
+    "сделай скрин шот",
+    "открой ютуб",
+    "закрой блокнот",
+    "найди рецепт борща",
+    "найди видео про котов",
+    "который час",
+    "какое сегодня число",
+    "погода в москве",
+    "расскажи, как настроить резервное копирование",
+    "что такое квантовый компьютер",
+]
+
+WORDS = ("погода музыка работа проект отчет встреча рецепт фильм новости компьютер "
+         "браузер программа письмо календарь задача поездка книга спорт игра").split()
+
+def synthetic_turns(count, seed=1):
+    """Реплики для заполнения истории"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "timestamp": (start + timedelta(minutes=i)).isoformat(),
+            "user": " ".join(rng.choice(WORDS) for _ in range(6)),
+            "assistant": " ".join(rng.choice(WORDS) for _ in range(12)),
+        }
+
+def make_memory(root, turns):
+    """MemorySystem с историей из turns реплик; ждет окончания фоновой индексации"""
+    from core.memory import MemorySystem
+    from core.conversation_log import ConversationLog
+
+    memory_dir = os.path.join(root, f"memory-{turns}")
+    log = ConversationLog(os.path.join(memory_dir, "conversation"), segment_size=1000)
+    log.extend(synthetic_turns(turns))
+    log.close()
+
+    memory = MemorySystem(memory_dir, {"flush_interval": 2.0})
+    memory.indexing_thread.join()
+    return memory
+
+class Environment:
+    """Общее окружение: временная папка, заглушки сети, речи и микрофона"""
+    def __init__(self):
+        self.tmp = fakes.temp_dir()
+        self.root = self.tmp.name
+        self.restore = []
+        self.jarvis = None
+
+    def __enter__(self):
+        from core import headless
+
+        self.weather = FakeWeatherServer(delay=0).start()
+        self.chat = fakes.FakeChatCompletion()
+        self.tts = fakes.FakeTTSEngine()
+        self.restore += [
+            fakes.install_chat_completion(self.chat),
+            fakes.install_tts(self.tts),
+            fakes.install_microphone(),
+        ]
+        # Браузер и процессы не запускаются, их намерения складываются в короткий буфер
+        self.dry_run = headless.DryRun().__enter__()
+        self.effects_token = headless.current_effects.set(deque(maxlen=100))
+        return self
+
+    def get_jarvis(self):
+        if self.jarvis is None:
+            self.jarvis = fakes.make_jarvis(self.root, {
+                "weather_api_key": "bench",
+                "weather": {"base_url": self.weather.base_url, "prefetch_interval": 0},
+                "ai": {"api_key": "bench", "stream": False, "cache": {"enabled": False}},
+                "memory": {"retrieval": True},
+                "apps": {"scan_path": False, "directories": []},
+                "screenshots": {"source": "synthetic"},
+            })
+        return self.jarvis
+
+    def __exit__(self, *exc_info):
+        from core import headless
+
+        if self.jarvis is not None:
+            self.jarvis.registry.close()
+        headless.current_effects.reset(self.effects_token)
+        self.dry_run.__exit__(None, None, None)
+        for restore in reversed(self.restore):
+            restore()
+        self.weather.stop()
+        self.tmp.cleanup()
+
+@case("router.find_command_match")
+def bench_router(env):
+    jarvis = env.get_jarvis()
+    utterances = UTTERANCES
+    yield lambda: [jarvis.find_command_match(text) for text in utterances]
+
+@case("intent.web_search.parse_search_intent")
+def bench_web_search_intent(env):
+    web_search = env.get_jarvis().web_search
+    queries = ["найди рецепт борща", "найди видео про котов", "поиск новости технологий", "расскажи анекдот"]
+    yield lambda: [web_search.parse_search_intent(query) for query in queries]
+
+@case("intent.personal.parse_intent")
+def bench_personal_intent(env):
+    assistant = env.get_jarvis().personal_assistant
+    queries = ["который час", "какое сегодня число", "погода в москве", "расскажи анекдот"]
+    yield lambda: [assistant.parse_intent(query) for query in queries]
+
+for turns in (1000, 10000, 50000):
+    @case(f"memory.add_and_save[{turns}]")
+    def bench_memory(env, turns=turns):
+        memory = make_memory(env.root, turns)
+
+        def run():
+            memory.add_to_conversation("как дела с проектом", "проект почти готов, осталось написать отчет")
+            memory.save_conversation()
+
+        yield run
+        memory.close()
+
+def zipf_documents(count, vocabulary=20000, length=14, seed=1):
+    """Документы со словами по закону Ципфа: частые слова есть почти везде, редкие — в единицах"""
+    rng = random.Random(seed)
+    words = [f"слово{i}" for i in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** 1.05 for rank in range(vocabulary)))
+    for _ in range(count):
+        yield " ".join(rng.choices(words, cum_weights=cumulative, k=length))
+
+@case("retrieval.search[zipf 100000]")
+def bench_retrieval(env):
+    from core.retrieval import RetrievalIndex
+    index = RetrievalIndex()
+    documents = list(zipf_documents(100000))
+    for doc_id, text in enumerate(documents):
+        index.add(text, doc_id)
+    rng = random.Random(2)
+    queries = [" ".join(rng.sample(rng.choice(documents).split(), 5)) for _ in range(50)]
+    yield lambda: [index.search(query, 3) for query in queries]
+
+@case("ai.build_messages[10000]")
+def bench_build_messages(env):
+    from core.ai_brain import AI
+    memory = make_memory(env.root, 10000)
+    memory.add_user_fact("город", "Москва")
+    ai = AI({"api_key": "bench", "stream": False, "cache": {"enabled": False}}, memory)
+    yield lambda: ai.build_messages("напомни, что я говорил про отчет по проекту")
+    ai.close()
+    memory.close()
+
+@case("ai.process")
+def bench_ai_process(env):
+    ai = env.get_jarvis().ai
+    yield lambda: ai.process("что такое квантовый компьютер")
+
+@case("weather.fetch")
+def bench_weather_fetch(env):
+    from modules.weather import WeatherService
+    service = WeatherService("bench", {"base_url": env.weather.base_url, "ttl": 0, "prefetch_interval": 0})
+    yield lambda: service.get("москве")
+    service.close()
+
+@case("capture.segment_phrase")
+def bench_capture(env):
+    from core.audio_capture import CaptureStream
+    audio = fakes.synthetic_speech(seconds=3.0)
+
+    def run():
+        capture = CaptureStream(fakes.FakeMicrophone(audio), {"pause_threshold": 0.5})
+        capture.start()
+        # Ждем, пока поток захвата дочитает запись, и забираем выделенные фразы
+        capture.thread.join()
+        phrases = capture.utterances.qsize()
+        capture.stop()
+        return phrases
+
+    yield run
+
+@case("speech.speak")
+def bench_speak(env):
+    speech = env.get_jarvis().speech
+    yield lambda: speech.speak("Работаю над этим...")
+
+@case("jarvis.process_command")
+def bench_process_command(env):
+    jarvis = env.get_jarvis()
+    yield lambda: [jarvis.process_command(text) for text in UTTERANCES]
+
+def measure(func, min_time=0.2, repeat=5):
+    """Медиана времени одного вызова (секунды) по repeat сериям длительностью не меньше min_time"""
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9)))
+
+    results = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        results.append((time.perf_counter() - started) / loops)
+    return statistics.median(results)
+
+def run_cases(names, min_time=0.2, repeat=5):
+    """Выполняет выбранные случаи и возвращает {название: секунды на вызов}"""
+    logging.getLogger("jarvis").setLevel(logging.WARNING)
+    results = {}
+    with Environment() as env:
+        for name in names:
+            generator = CASES[name](env)
+            func = next(generator)
+            # Речь печатает реплики в консоль — не смешиваем их с отчетом
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = measure(func, min_time, repeat)
+            generator.close()
+            yield name, results[name]
@@ -1,5 +1,11 @@
+import os
+import time
 import openai
 import logging
+from core.ai_client import ResilientClient, CircuitOpen
+from core.response_cache import ResponseCache
+from utils.helpers import SentenceSplitter, SpokenResponse
+from utils.metrics import metrics
 
 logger = logging.getLogger("jarvis.ai")
 
@@ -7,47 +13,215 @@ class AI:
     def __init__(self, config, memory):
         """Инициализация ИИ-мозга"""
         openai.api_key = config.get("api_key", "")
+        if config.get("api_base"):
+            openai.api_base = config["api_base"]
         self.model = config.get("model", "gpt-4")
+        self.stream = config.get("stream", True)
+        self.last_first_sentence_latency = None
         self.memory = memory
         
-        logger.info(f"ИИ инициализирован, модель: {self.model}")
+        # Таймауты, повторы и размыкатель для запросов к API
+        self.client = ResilientClient(config.get("client", {}))
+        
+        # Настройки контекста: сколько последних и релевантных реплик отправлять
+        self.recent_turns = config.get("recent_turns", 2)
+        self.relevant_turns = config.get("relevant_turns", 3)
+        self.context_budget = config.get("context_budget", 1500)
+        
+        # Кэш ответов на повторяющиеся вопросы
+        self.cache = None
+        cache_config = config.get("cache", {})
+        if cache_config.get("enabled", True):
+            self.cache = ResponseCache(os.path.join(memory.memory_dir, "response_cache.json"), cache_config)
+        
+        logger.info("ИИ инициализирован, модель: %s", self.model)
     
     def process(self, user_input):
         """Обрабатывает ввод пользователя и генерирует ответ"""
         if not openai.api_key:
             return "API ключ не настроен. Пожалуйста, добавьте ключ API в настройках."
         
-        # Получаем историю диалога
-        history = self.memory.get_conversation_history()
-        
-        # Формируем сообщения для API
-        messages = [
-            {"role": "system", "content": "Вы - Джарвис, персональный ИИ-ассистент. Вы работаете на Windows компьютере пользователя. Отвечайте кратко и по делу."}
-        ]
-        
-        # Добавляем историю диалога (последние 5 сообщений)
-        for item in history[-5:]:
-            messages.append({"role": "user", "content": item["user"]})
-            messages.append({"role": "assistant", "content": item["assistant"]})
+        messages, relevant_facts = self.build_messages(user_input)
         
-        # Добавляем текущий ввод пользователя
-        messages.append({"role": "user", "content": user_input})
+        cache_key, cached_response = self.lookup_cache(user_input, messages, relevant_facts)
+        if cached_response is not None:
+            self.memory.add_to_conversation(user_input, cached_response)
+            return cached_response
         
         try:
             # Запрос к API
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=150
-            )
+            with metrics.span("ai_request", model=self.model, mode="single"):
+                response = self.client.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=150
+                )
             
             # Получаем ответ
             ai_response = response.choices[0].message["content"]
             
             # Сохраняем диалог в памяти
-            self.memory.add_to_conversation(user_input, ai_response)
+            self.remember(user_input, ai_response, cache_key)
             
             return ai_response
+        except CircuitOpen:
+            return "Сервис ИИ сейчас недоступен. Попробуйте чуть позже."
+        except Exception as e:
+            logger.error("Ошибка при запросе к API: %s", e)
+            return "Извините, у меня возникла проблема при обработке вашего запроса."
+    
+    def process_stream(self, user_input, on_sentence):
+        """Генерирует ответ потоком и передает каждое готовое предложение в on_sentence.
+        
+        Возвращает полный ответ как SpokenResponse.
+        """
+        if not openai.api_key:
+            reply = "API ключ не настроен. Пожалуйста, добавьте ключ API в настройках."
+            on_sentence(reply)
+            return SpokenResponse(reply)
+        
+        messages, relevant_facts = self.build_messages(user_input)
+        
+        cache_key, cached_response = self.lookup_cache(user_input, messages, relevant_facts)
+        if cached_response is not None:
+            on_sentence(cached_response)
+            self.memory.add_to_conversation(user_input, cached_response)
+            return SpokenResponse(cached_response)
+        
+        started = time.perf_counter()
+        self.last_first_sentence_latency = None
+        splitter = SentenceSplitter()
+        parts = []
+        
+        def emit(sentence):
+            if self.last_first_sentence_latency is None:
+                self.last_first_sentence_latency = time.perf_counter() - started
+                logger.info("Первое предложение готово через %.0f мс", self.last_first_sentence_latency * 1000)
+            on_sentence(sentence)
+        
+        try:
+            # Потоковый запрос к API: ответ приходит по фрагментам
+            with metrics.span("ai_request", model=self.model, mode="stream"):
+                stream = self.client.stream(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=150
+                )
+                
+                for chunk in stream:
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+                    if not delta:
+                        continue
+                    if not parts:
+                        metrics.observe("ai_first_token", time.perf_counter() - started, model=self.model)
+                    parts.append(delta)
+                    for sentence in splitter.feed(delta):
+                        emit(sentence)
         except Exception as e:
-            logger.error(f"Ошибка при запросе к API: {e}")
-            return "Извините, у меня возникла проблема при обработке вашего запроса."
\ No newline at end of file
+            logger.error("Ошибка при потоковом запросе к API: %s", e)
+            if not parts:
+                if isinstance(e, CircuitOpen):
+                    reply = "Сервис ИИ сейчас недоступен. Попробуйте чуть позже."
+                else:
+                    reply = "Извините, у меня возникла проблема при обработке вашего запроса."
+                on_sentence(reply)
+                return SpokenResponse(reply)
+            # Часть ответа уже произнесена: договариваем и сохраняем то, что успели получить
+            cache_key = None
+        
+        rest = splitter.flush()
+        if rest:
+            emit(rest)
+        
+        ai_response = "".join(parts).strip()
+        self.remember(user_input, ai_response, cache_key)
+        return SpokenResponse(ai_response)
+    
+    def lookup_cache(self, user_input, messages, relevant_facts):
+        """Возвращает ключ кэша (или None) и ответ из кэша (или None)"""
+        # Ключ учитывает модель и факты о пользователе, а для уточняющих вопросов —
+        # последние реплики диалога, чтобы «а почему?» не получил ответ из другого разговора.
+        # Найденные прошлые реплики в ключ не входят: часто это прошлые ответы на тот же вопрос
+        if self.cache is None or not self.cache.is_cacheable(user_input):
+            return None, None
+        
+        key_context = {"facts": relevant_facts}
+        if self.cache.include_recent or self.cache.is_follow_up(user_input):
+            key_context["recent"] = [message for message in messages[:-1] if message["role"] != "system"]
+        cache_key = self.cache.make_key(user_input, self.model, key_context)
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            logger.info("Ответ взят из кэша")
+            metrics.increment("ai_cache_hits")
+        return cache_key, cached_response
+    
+    def remember(self, user_input, ai_response, cache_key=None):
+        """Сохраняет диалог в памяти и ответ в кэше"""
+        self.memory.add_to_conversation(user_input, ai_response)
+        if cache_key is not None:
+            self.cache.put(cache_key, ai_response)
+    
+    def build_messages(self, user_input):
+        """Формирует сообщения для API; возвращает их и использованные факты о пользователе"""
+        # Получаем последние реплики диалога из окна в памяти
+        history = self.memory.recent(self.recent_turns)
+        
+        # Формируем сообщения для API
+        messages = [
+            {"role": "system", "content": "Вы - Джарвис, персональный ИИ-ассистент. Вы работаете на Windows компьютере пользователя. Отвечайте кратко и по делу."}
+        ]
+        
+        # Добавляем релевантные запросу фрагменты прошлых диалогов и факты
+        context, facts = self.build_relevant_context(user_input, history)
+        if context:
+            messages.append({"role": "system", "content": context})
+        
+        # Добавляем историю диалога (последние сообщения)
+        for item in history:
+            messages.append({"role": "user", "content": item["user"]})
+            messages.append({"role": "assistant", "content": item["assistant"]})
+        
+        # Добавляем текущий ввод пользователя
+        messages.append({"role": "user", "content": user_input})
+        
+        return messages, facts
+    
+    def build_relevant_context(self, user_input, history):
+        """Собирает релевантные прошлые реплики и факты в пределах бюджета символов.
+        
+        Возвращает текст контекста и список включенных в него фактов.
+        """
+        if self.relevant_turns <= 0:
+            return "", []
+        
+        relevant = self.memory.search_relevant(
+            user_input,
+            k=self.relevant_turns,
+            exclude_timestamps=[item["timestamp"] for item in history]
+        )
+        
+        lines = []
+        facts = []
+        budget = self.context_budget
+        for item in relevant:
+            if "fact" in item:
+                line = f"- Факт о пользователе: {item['fact']}: {item['value']}"
+            else:
+                line = f"- Пользователь: {item['user']} | Джарвис: {item['assistant']}"
+            if len(line) > budget:
+                break
+            lines.append(line)
+            if "fact" in item:
+                facts.append(line)
+            budget -= len(line)
+        
+        if not lines:
+            return "", facts
+        return "Из прошлых разговоров с пользователем:\n" + "\n".join(lines), facts
+    
+    def close(self):
+        """Сохраняет кэш ответов и закрывает соединения с API"""
+        self.client.close()
+        if self.cache is not None:
+            logger.info("Статистика кэша ответов: %s", self.cache.stats())
+            self.cache.close()
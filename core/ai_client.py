@@ -0,0 +1,199 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import openai
+from utils.metrics import metrics
+
+logger = logging.getLogger("jarvis.ai_client")
+
+class CircuitOpen(Exception):
+    """Обращения к API временно приостановлены после серии сбоев"""
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """Размыкатель: после failure_threshold сбоев подряд запросы сразу отклоняются.
+
+        Через reset_timeout секунд пропускается один пробный запрос: успех
+        замыкает цепь, сбой снова размыкает ее.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning("API недоступен: запросы приостановлены на %s с", self.reset_timeout)
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+def is_retryable(error):
+    """Сетевые сбои, таймауты, 429 и 5xx повторяем; ошибки запроса и ключа — нет"""
+    retryable = (
+        openai.error.Timeout, openai.error.APIConnectionError, openai.error.RateLimitError,
+        openai.error.ServiceUnavailableError, openai.error.TryAgain,
+    )
+    if isinstance(error, retryable):
+        return True
+    if isinstance(error, openai.error.APIError) and not isinstance(error, openai.error.InvalidRequestError):
+        status = getattr(error, "http_status", None)
+        return status is None or status >= 500
+    return False
+
+class ResilientClient:
+    def __init__(self, config=None):
+        """Обертка над openai.ChatCompletion: таймауты, повторы, дублирующие запросы и размыкатель.
+
+        Все запросы идут через одну сессию requests с пулом соединений.
+        Если ответ задерживается дольше p95 недавних ответов, отправляется
+        второй такой же запрос (hedge) и берется тот, что придет первым.
+        """
+        config = config or {}
+        self.timeout = (config.get("connect_timeout", 3), config.get("read_timeout", 20))
+        self.retries = config.get("retries", 2)
+        self.backoff = config.get("backoff", 0.5)
+        self.max_backoff = config.get("max_backoff", 4)
+
+        self.hedge = config.get("hedge", False)
+        self.hedge_quantile = config.get("hedge_quantile", 0.95)
+        self.hedge_min_samples = config.get("hedge_min_samples", 20)
+        self.hedge_min_delay = config.get("hedge_min_delay", 0.2)
+        self.latencies = deque(maxlen=config.get("latency_window", 200))
+        self.latencies_lock = threading.Lock()
+        self.hedge_pool = ThreadPoolExecutor(config.get("hedge_workers", 4), thread_name_prefix="jarvis-ai-hedge") if self.hedge else None
+
+        self.breaker = CircuitBreaker(config.get("failure_threshold", 5), config.get("reset_timeout", 30))
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        # Повторы делает сам клиент: адаптер не должен повторять запросы молча
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=config.get("pool_size", 8), max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        openai.requestssession = self.session
+
+    def backoff_delay(self, attempt):
+        """Экспоненциальная пауза со случайным разбросом (full jitter)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def hedge_delay(self):
+        """Когда отправлять дублирующий запрос: p95 недавних ответов; None — пока мало данных.
+
+        Дублирование спасает только хвост тоньше 1 - hedge_quantile: если медленных
+        ответов больше, порог сам попадает на них и повторный запрос не уходит.
+        """
+        with self.latencies_lock:
+            if len(self.latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_quantile))
+        return max(self.hedge_min_delay, ordered[index])
+
+    def call(self, attempt_fn):
+        """Выполняет attempt_fn с повторами через размыкатель"""
+        if not self.breaker.allow():
+            metrics.increment("ai_circuit_rejected")
+            raise CircuitOpen("Сервис ИИ временно недоступен")
+
+        for attempt in range(self.retries + 1):
+            try:
+                result = attempt_fn()
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # Сервис ответил (например, ошибкой запроса) — он доступен
+                    self.breaker.record_success()
+                    raise
+                if attempt == self.retries:
+                    self.breaker.record_failure()
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning("Ошибка API (%s), повтор через %.2f с", e, delay)
+                metrics.increment("ai_retries")
+                time.sleep(delay)
+
+    def request(self, **kwargs):
+        return openai.ChatCompletion.create(request_timeout=self.timeout, **kwargs)
+
+    def hedged_request(self, **kwargs):
+        """Запрос с дублированием: второй уходит после задержки p95, побеждает первый успешный.
+
+        В статистику попадает время, за которое получен ответ, а не время
+        проигравшего запроса — иначе спасенные медленные ответы поднимали бы порог.
+        """
+        started = time.perf_counter()
+        response = self.race(**kwargs)
+        with self.latencies_lock:
+            self.latencies.append(time.perf_counter() - started)
+        return response
+
+    def race(self, **kwargs):
+        delay = self.hedge_delay() if self.hedge_pool is not None else None
+        if delay is None:
+            return self.request(**kwargs)
+
+        futures = [self.hedge_pool.submit(self.request, **kwargs)]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            metrics.increment("ai_hedged")
+            futures.append(self.hedge_pool.submit(self.request, **kwargs))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        metrics.increment("ai_hedge_wins")
+                    # Проигравший запрос дорабатывает в фоне, его ответ не нужен
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def create(self, **kwargs):
+        """Обычный (не потоковый) запрос"""
+        return self.call(lambda: self.hedged_request(**kwargs))
+
+    def stream(self, **kwargs):
+        """Потоковый запрос; повторяется только до получения первого фрагмента"""
+        def first_chunk():
+            chunks = iter(openai.ChatCompletion.create(request_timeout=self.timeout, stream=True, **kwargs))
+            return next(chunks, None), chunks
+
+        first, chunks = self.call(first_chunk)
+        if first is not None:
+            yield first
+            yield from chunks
+
+    def close(self):
+        if self.hedge_pool is not None:
+            self.hedge_pool.shutdown(wait=False)
+        if openai.requestssession is self.session:
+            openai.requestssession = None
+        self.session.close()
@@ -0,0 +1,283 @@
+import time
+import queue
+import audioop
+import logging
+import threading
+import contextlib
+from collections import deque, namedtuple
+import speech_recognition as sr
+from core.recognizers import ThreadedStream
+from utils.metrics import metrics
+
+logger = logging.getLogger("jarvis.capture")
+
+# Выделенная фраза: звук и, для потоковых движков, уже идущий сеанс распознавания
+Phrase = namedtuple("Phrase", ["audio", "stream"])
+
+class CaptureStream:
+    def __init__(self, source, config=None, backend=None):
+        """Постоянный поток захвата звука с фоновой калибровкой шума и выделением фраз.
+
+        source — любой sr.AudioSource: sr.Microphone для работы или
+        sr.AudioFile с WAV-файлом для проверки без микрофона. Если backend
+        умеет потоковое распознавание, звук подается в него прямо во время речи.
+        """
+        config = config or {}
+        self.source = source
+        self.backend = backend
+
+        # Порог громкости речи = оценка шума * ratio, но не ниже min_threshold
+        self.energy_threshold = config.get("energy_threshold", 300)
+        self.min_threshold = config.get("min_energy_threshold", 50)
+        self.threshold_ratio = config.get("threshold_ratio", 1.5)
+        self.noise_damping = config.get("noise_damping", 0.15)
+
+        self.pause_threshold = config.get("pause_threshold", 0.8)
+        self.min_phrase = config.get("min_phrase", 0.3)
+        self.max_phrase = config.get("max_phrase", 15)
+        self.pre_roll = config.get("pre_roll", 0.3)
+        # Первые секунды потока всегда считаются шумом, чтобы задать начальную оценку
+        self.initial_calibration = config.get("initial_calibration", 0.5)
+
+        # После ошибки устройства источник переоткрывается с нарастающей паузой
+        self.restart_delay = config.get("restart_delay", 0.5)
+        self.max_restart_delay = config.get("max_restart_delay", 30)
+
+        # Пока Джарвис говорит, звук не слушается: иначе его собственный голос
+        # станет следующей командой. echo_tail — запас на отзвук после речи
+        self.echo_tail = config.get("echo_tail", 0.3)
+        self.mute_lock = threading.Lock()
+        self.mute_count = 0
+        self.muted_until = 0.0
+
+        self.noise_level = None
+        self.utterances = queue.Queue(maxsize=config.get("max_pending_utterances", 10))
+
+        self.running = False
+        self.finished = threading.Event()
+        self.wakeup = threading.Event()
+        self.source_lock = threading.Lock()
+        self.source_open = False
+        self.thread = None
+
+    def start(self):
+        """Запускает фоновый поток захвата; источник звука открывается в нем"""
+        if self.thread is not None:
+            return
+        self.running = True
+        self.finished.clear()
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self.supervise, name="jarvis-audio-capture", daemon=True)
+        self.thread.start()
+        logger.info("Поток захвата звука запущен")
+
+    def open_source(self):
+        with metrics.span("mic_open"):
+            self.source.__enter__()
+        with self.source_lock:
+            self.source_open = True
+
+    def close_source(self):
+        """Закрывает источник звука, если он открыт"""
+        with self.source_lock:
+            if not self.source_open:
+                return
+            self.source_open = False
+        try:
+            self.source.__exit__(None, None, None)
+        except Exception as e:
+            logger.error("Ошибка при закрытии источника звука: %s", e)
+
+    def supervise(self):
+        """Держит захват запущенным: после ошибки устройства переоткрывает источник.
+
+        Пауза перед повтором удваивается от restart_delay до max_restart_delay
+        и сбрасывается, если источник проработал дольше max_restart_delay.
+        Поток завершается по stop() или когда источник закончился (WAV-файл).
+        """
+        delay = self.restart_delay
+        try:
+            while self.running:
+                started = time.monotonic()
+                try:
+                    self.open_source()
+                    if self.run():
+                        return
+                except Exception as e:
+                    logger.error("Ошибка захвата звука: %s", e)
+                finally:
+                    self.close_source()
+
+                if not self.running:
+                    return
+                if time.monotonic() - started > self.max_restart_delay:
+                    delay = self.restart_delay
+                metrics.increment("capture_restarts")
+                logger.warning("Перезапуск захвата звука через %.1f с", delay)
+                if self.wakeup.wait(delay):
+                    return
+                delay = min(self.max_restart_delay, delay * 2)
+        finally:
+            self.running = False
+            self.finished.set()
+
+    @contextlib.contextmanager
+    def muted(self):
+        """Не выделяет фразы, пока выполняется блок, и еще echo_tail секунд после него"""
+        with self.mute_lock:
+            self.mute_count += 1
+        try:
+            yield
+        finally:
+            with self.mute_lock:
+                self.mute_count -= 1
+                if not self.mute_count:
+                    self.muted_until = time.monotonic() + self.echo_tail
+
+    def is_muted(self):
+        return self.mute_count > 0 or time.monotonic() < self.muted_until
+
+    def update_noise(self, energy, seconds_per_chunk):
+        """Обновляет скользящую оценку фонового шума и порог речи"""
+        if self.noise_level is None:
+            self.noise_level = energy
+        else:
+            damping = self.noise_damping ** seconds_per_chunk
+            self.noise_level = self.noise_level * damping + energy * (1 - damping)
+        self.energy_threshold = max(self.min_threshold, self.noise_level * self.threshold_ratio)
+
+    def run(self):
+        """Читает звук, калибрует порог и выделяет фразы по паузам.
+
+        Возвращает True, если источник закончился или захват остановлен;
+        ошибки устройства пробрасываются в supervise.
+        """
+        source = self.source
+        sample_width = source.SAMPLE_WIDTH
+        seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll / seconds_per_chunk)))
+
+        frames = None
+        stream = None
+        speech_time = silence_time = energy_sum = 0.0
+        calibration_left = self.initial_calibration
+        calibration_started = phrase_started = time.perf_counter()
+
+        try:
+            while self.running:
+                chunk = source.stream.read(source.CHUNK)
+                if not chunk:
+                    break
+
+                energy = audioop.rms(chunk, sample_width)
+
+                if self.is_muted():
+                    # Начатая фраза смешана с речью Джарвиса; шум по ней не оцениваем
+                    if frames is not None:
+                        metrics.increment("phrases_muted")
+                        if stream is not None:
+                            stream.cancel()
+                        frames = stream = None
+                    pre_roll.clear()
+                    continue
+
+                if calibration_left > 0:
+                    calibration_left -= seconds_per_chunk
+                    self.update_noise(energy, seconds_per_chunk)
+                    pre_roll.append(chunk)
+                    if calibration_left <= 0:
+                        metrics.observe("calibration", time.perf_counter() - calibration_started)
+                    continue
+
+                if frames is None:
+                    if energy > self.energy_threshold:
+                        # Начало фразы: берем с собой немного звука до нее
+                        frames = list(pre_roll) + [chunk]
+                        speech_time = seconds_per_chunk
+                        silence_time = 0.0
+                        energy_sum = energy
+                        phrase_started = time.perf_counter()
+                        pre_roll.clear()
+                        stream = self.start_recognition(frames)
+                    else:
+                        self.update_noise(energy, seconds_per_chunk)
+                        pre_roll.append(chunk)
+                    continue
+
+                frames.append(chunk)
+                if stream is not None:
+                    stream.feed(chunk)
+                energy_sum += energy
+                if energy > self.energy_threshold:
+                    speech_time += seconds_per_chunk
+                    silence_time = 0.0
+                else:
+                    silence_time += seconds_per_chunk
+
+                duration = len(frames) * seconds_per_chunk
+                if silence_time >= self.pause_threshold or duration >= self.max_phrase:
+                    # Длительность захвата: от начала речи до выделения фразы
+                    metrics.observe("capture", time.perf_counter() - phrase_started)
+                    self.emit(frames, speech_time, stream)
+                    if duration >= self.max_phrase:
+                        # Непрерывный «голос» без пауз — скорее всего, вырос шум: подстраиваем порог
+                        self.update_noise(energy_sum / len(frames), duration)
+                    frames = stream = None
+        except Exception:
+            # Начатое распознавание оборванной фразы больше не нужно
+            if stream is not None:
+                stream.cancel()
+            raise
+
+        if frames is not None:
+            self.emit(frames, speech_time, stream)
+        return True
+
+    def start_recognition(self, frames):
+        """Начинает потоковое распознавание фразы, если движок это умеет"""
+        if self.backend is None or not self.backend.streaming:
+            return None
+        try:
+            stream = ThreadedStream(self.backend.start_stream(self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH))
+        except Exception as e:
+            logger.error("Не удалось начать потоковое распознавание: %s", e)
+            return None
+        for frame in frames:
+            stream.feed(frame)
+        return stream
+
+    def emit(self, frames, speech_time, stream=None):
+        """Отдает готовую фразу слушателю"""
+        if speech_time < self.min_phrase:
+            metrics.increment("phrases_skipped")
+            if stream is not None:
+                stream.cancel()
+            return
+
+        audio = sr.AudioData(b"".join(frames), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+        try:
+            self.utterances.put_nowait(Phrase(audio, stream))
+        except queue.Full:
+            logger.warning("Очередь фраз переполнена, фраза отброшена")
+            metrics.increment("phrases_dropped")
+            if stream is not None:
+                stream.cancel()
+
+    def listen(self, timeout=None):
+        """Возвращает следующую выделенную фразу (Phrase) или None"""
+        self.start()
+        while True:
+            try:
+                return self.utterances.get(timeout=timeout if timeout is not None else 0.5)
+            except queue.Empty:
+                if timeout is not None or self.finished.is_set():
+                    return None
+
+    def stop(self):
+        """Останавливает захват и закрывает источник"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        # Если поток застрял в чтении, закрытие источника его разбудит
+        self.close_source()
@@ -0,0 +1,275 @@
+import re
+import logging
+from collections import deque
+
+logger = logging.getLogger("jarvis.router")
+
+WORD_PATTERN = re.compile(r'\S+')
+
+def edit_distance(a, b, limit):
+    """Расстояние Левенштейна; если оно больше limit, возвращает limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+def deletions(word, depth):
+    """Все строки, получаемые из word удалением не более depth символов"""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        found |= frontier
+    return found
+
+class CommandRouter:
+    def __init__(self, commands_config, config=None):
+        """Компилирует триггеры из commands.json в автомат Ахо-Корасик.
+
+        Для искаженных распознаванием команд («сделай скрин шот») строится
+        индекс слов триггеров: если точного совпадения нет, ищется фрагмент
+        запроса не дальше max_distance правок от триггера. Действия из
+        exact_actions (выключение, перезагрузка, выход) нечетко не сопоставляются:
+        «включи компьютер» не должно превращаться в «выключи компьютер».
+        """
+        config = config or {}
+        # Переходы, ссылки неудач и выходы для каждого состояния автомата
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        # Описание триггеров: (триггер, категория, действие, приоритет)
+        self.triggers = []
+
+        for category, commands in commands_config.items():
+            for cmd_trigger, cmd_action in commands.items():
+                self.add_trigger(cmd_trigger, category, cmd_action)
+
+        self.build()
+
+        # Нечеткий поиск: допустимое число правок — доля длины триггера, но не больше max_distance
+        self.fuzzy = config.get("fuzzy", True)
+        self.max_distance = config.get("max_distance", 2)
+        self.distance_ratio = config.get("distance_ratio", 0.25)
+        self.min_fuzzy_length = config.get("min_length", 5)
+        # Короткие слова часто отличаются от триггера лишь окончанием («закрою» — «закрой»)
+        self.min_word_length = config.get("min_word_length", 7)
+        # Насколько ближайшее слово должно быть ближе следующего кандидата
+        self.margin = config.get("margin", 1)
+        # Необратимые действия запускаются только точной фразой, без исправления опечаток
+        self.exact_actions = set(config.get("exact_actions", ["shutdown", "restart", "exit"]))
+        self.build_fuzzy_index()
+
+        logger.info("Маршрутизатор команд скомпилирован: %s триггеров, %s состояний", len(self.triggers), len(self.goto))
+
+    def add_trigger(self, trigger, category, action):
+        """Добавляет триггер в бор"""
+        trigger = trigger.lower()
+        if not trigger:
+            return
+
+        state = 0
+        for char in trigger:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+
+        # Порядок в конфигурации служит приоритетом при равной длине
+        trigger_id = len(self.triggers)
+        self.triggers.append((trigger, category, action, trigger_id))
+        self.output[state].append(trigger_id)
+
+    def build(self):
+        """Строит ссылки неудач обходом бора в ширину"""
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+
+                # Наследуем выходы суффиксного состояния
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def build_fuzzy_index(self):
+        """Один раз при загрузке строит индекс удалений по словам триггеров.
+
+        Для каждого слова триггеров запоминаются его варианты без одного-двух
+        символов; слово запроса с опечаткой находит кандидатов по своим
+        вариантам удалений за несколько обращений к словарю.
+        """
+        self.fuzzy_words = {}
+        self.deletion_index = {}
+        self.max_word_length = 0
+        for trigger, _, action, _ in self.triggers:
+            if action in self.exact_actions:
+                continue
+            for word in trigger.split():
+                if word in self.fuzzy_words:
+                    continue
+                limit = self.allowed_distance(word, self.min_word_length)
+                self.fuzzy_words[word] = limit
+                self.max_word_length = max(self.max_word_length, len(word))
+                for variant in deletions(word, limit):
+                    self.deletion_index.setdefault(variant, []).append(word)
+
+    def allowed_distance(self, text, min_length=None):
+        """Допустимое число правок: доля длины, но не больше max_distance"""
+        if len(text) < (self.min_fuzzy_length if min_length is None else min_length):
+            return 0
+        return min(self.max_distance, max(1, int(len(text) * self.distance_ratio)))
+
+    def correct_word(self, token):
+        """Ближайшее слово триггеров для слова запроса: (слово, расстояние) или None.
+
+        Если второй кандидат ближе чем на margin правок к лучшему, слово не
+        исправляется: выбор между ними был бы случайным.
+        """
+        if token in self.fuzzy_words:
+            return token, 0
+        limit = self.allowed_distance(token, self.min_word_length)
+        if not limit or len(token) > self.max_word_length + limit:
+            return None
+        candidates = {}
+        for variant in deletions(token, limit):
+            for word in self.deletion_index.get(variant, ()):
+                if word in candidates:
+                    continue
+                word_limit = min(limit, self.fuzzy_words[word])
+                distance = edit_distance(token, word, word_limit)
+                if distance <= word_limit:
+                    candidates[word] = distance
+        if not candidates:
+            return None
+        ranked = sorted(candidates.items(), key=lambda item: item[1])
+        if len(ranked) > 1 and ranked[1][1] - ranked[0][1] < self.margin:
+            return None
+        return ranked[0]
+
+    def fuzzy_match(self, text):
+        """Ищет триггер с поправкой на опечатки распознавания в отдельных словах.
+
+        Слова запроса заменяются ближайшими словами триггеров (соседние слова
+        можно склеить: «скрин шот» → «скриншот»), исправленный текст
+        проверяется тем же автоматом. Возвращает (триггер, расстояние,
+        совпавший фрагмент запроса) или None.
+        """
+        spans = [(match.start(), match.end()) for match in WORD_PATTERN.finditer(text)]
+
+        # Исправленные слова: (слово, расстояние, начало, конец в исходном тексте)
+        corrected = []
+        i = 0
+        while i < len(spans):
+            start, end = spans[i]
+            single = self.correct_word(text[start:end])
+            if i + 1 < len(spans):
+                merged = self.correct_word(text[start:spans[i + 1][1]].replace(" ", ""))
+                if merged is not None and (single is None or merged[1] + 1 <= single[1]):
+                    corrected.append((merged[0], merged[1] + 1, start, spans[i + 1][1]))
+                    i += 2
+                    continue
+            word, distance = single if single is not None else (text[start:end], 0)
+            corrected.append((word, distance, start, end))
+            i += 1
+
+        if not any(distance for _, distance, _, _ in corrected):
+            return None
+
+        # Позиции слов в исправленном тексте
+        corrected_text = " ".join(word for word, _, _, _ in corrected)
+        word_at = {}
+        offset = 0
+        for index, (word, _, _, _) in enumerate(corrected):
+            word_at[offset] = index
+            offset += len(word) + 1
+
+        best = None
+        for start, trigger_id in self.find_all(corrected_text):
+            trigger, _, action, _ = self.triggers[trigger_id]
+            if action in self.exact_actions:
+                continue
+            first = word_at.get(start)
+            if first is None:
+                continue
+            # Триггер должен занимать целые слова исправленного текста
+            count = len(trigger.split())
+            if first + count > len(corrected) or " ".join(w for w, _, _, _ in corrected[first:first + count]) != trigger:
+                continue
+            distance = sum(d for _, d, _, _ in corrected[first:first + count])
+            if distance == 0 or distance > self.allowed_distance(trigger):
+                continue
+            key = (distance, -len(trigger), trigger_id, start)
+            if best is None or key < best[0]:
+                window = text[corrected[first][2]:corrected[first + count - 1][3]]
+                best = (key, trigger_id, window)
+
+        if best is None:
+            return None
+        (distance, _, _, _), trigger_id, window = best
+        return self.triggers[trigger_id], distance, window
+
+    def find_all(self, text):
+        """Находит все вхождения триггеров за один проход по тексту"""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+
+            for trigger_id in self.output[state]:
+                start = position - len(self.triggers[trigger_id][0]) + 1
+                matches.append((start, trigger_id))
+
+        return matches
+
+    def match(self, text):
+        """Возвращает лучший триггер: самый длинный, затем первый в конфигурации.
+
+        Третий элемент результата — фрагмент запроса, совпавший с триггером
+        (при нечетком совпадении он отличается от самого триггера).
+        """
+        text = text.lower()
+        best = None
+        for start, trigger_id in self.find_all(text):
+            trigger = self.triggers[trigger_id]
+            key = (-len(trigger[0]), trigger[3], start)
+            if best is None or key < best[0]:
+                best = (key, trigger)
+
+        if best is not None:
+            trigger, category, action, _ = best[1]
+            return category, action, trigger
+
+        if self.fuzzy:
+            fuzzy = self.fuzzy_match(text)
+            if fuzzy is not None:
+                (trigger, category, action, _), distance, window = fuzzy
+                logger.info("Нечеткое совпадение: «%s» → «%s» (расстояние %s)", window, trigger, distance)
+                return category, action, window
+
+        return None
@@ -0,0 +1,48 @@
+import re
+
+# Союзы и знаки, разделяющие части составной команды
+CONJUNCTIONS = re.compile(r"(\s*,?\s+(?:а также|а потом|а затем|и ещё|и еще|и потом|и затем|потом|затем|и)\s+|\s*[,;]\s+)")
+
+# Действия одной «полосы» выполняются по порядку, разные полосы — параллельно.
+# Системные команды и выход идут друг за другом («сделай скриншот и заблокируй компьютер»)
+SEQUENTIAL_CATEGORIES = {"system_commands": "system", "exit_commands": "system"}
+
+def split_clauses(text):
+    """Делит фразу по союзам: возвращает части и разделители перед каждой частью (у первой — пустой)"""
+    pieces = CONJUNCTIONS.split(text)
+    clauses = [pieces[0]]
+    separators = [""]
+    for index in range(1, len(pieces), 2):
+        separators.append(pieces[index])
+        clauses.append(pieces[index + 1])
+    return clauses, separators
+
+def plan_lanes(matches):
+    """Группирует маршрутизированные части в полосы выполнения.
+
+    matches — список (category, action, params). Возвращает списки номеров
+    частей: части одной полосы зависят друг от друга и выполняются по
+    порядку. Открытие и закрытие одного приложения тоже идут по порядку.
+    """
+    lanes = {}
+    for index, (category, action, params) in enumerate(matches):
+        if category in SEQUENTIAL_CATEGORIES:
+            key = SEQUENTIAL_CATEGORIES[category]
+        elif category == "app_commands":
+            key = ("app", params)
+        else:
+            key = index
+        lanes.setdefault(key, []).append(index)
+    return list(lanes.values())
+
+def join_replies(replies):
+    """Склеивает ответы частей в одну реплику в исходном порядке"""
+    sentences = []
+    for reply in replies:
+        reply = str(reply).strip() if reply else ""
+        if not reply:
+            continue
+        if reply[-1] not in ".!?…":
+            reply += "."
+        sentences.append(reply)
+    return " ".join(sentences)
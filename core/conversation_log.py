@@ -0,0 +1,556 @@
+import os
+import re
+import json
+import logging
+import threading
+import contextlib
+from core.persistence import atomic_write_json
+
+logger = logging.getLogger("jarvis.memory.log")
+
+SEGMENT_PATTERN = re.compile(r'^segment_(\d+)\.jsonl$')
+COMPACT_PATTERN = re.compile(r'^segment_(\d+)-(\d+)\.compact$')
+STATE_FILE = "state.json"
+
+class ConversationLog:
+    def __init__(self, log_dir, segment_size=1000, compact_every=10, compacted_size=10000, fsync=False):
+        """Инициализация сегментированного журнала диалогов (JSONL, только дозапись)"""
+        self.log_dir = log_dir
+        self.segment_size = segment_size
+        self.compact_every = compact_every
+        self.compacted_size = compacted_size
+        self.fsync = fsync
+
+        os.makedirs(log_dir, exist_ok=True)
+
+        # Блокировка защищает сегменты от компактации во время чтения из других потоков
+        self.lock = threading.RLock()
+        # Читатели закрепляют снимок списка сегментов; компактация ждет, пока их не останется
+        self.readers = 0
+        self.readers_done = threading.Condition(self.lock)
+        # Пока компактация ждет подмены файлов, новые читатели не закрепляются
+        self.swap_pending = False
+        self.compaction_thread = None
+
+        # Счетчик закрытых сегментов и отметка о миграции переживают перезапуск
+        self.state_path = os.path.join(log_dir, STATE_FILE)
+        self.state = self.load_state()
+        # Число записей в закрытых сегментах, чтобы компактация не пересчитывала их заново
+        self.entry_counts = {int(segment_id): count for segment_id, count in self.state.get("entry_counts", {}).items()}
+
+        # Доводим до конца прерванную компактацию и убираем временные файлы
+        self.recover_compaction()
+
+        self.segments = self.list_segments()
+        if not self.segments:
+            self.segments = [1]
+
+        # Восстанавливаем хвост последнего сегмента после возможного сбоя
+        self.active_entries = self.recover_tail(self.segment_path(self.segments[-1]))
+        self.active_file = open(self.segment_path(self.segments[-1]), 'ab')
+        self.active_size = self.active_file.tell()
+
+        # Куда переехали слитые сегменты: старый номер -> (новый номер, смещение в байтах)
+        self.relocations = {}
+
+        # Границы по времени для закрытых сегментов вычисляются лениво и кэшируются
+        self.bounds_cache = {}
+
+        logger.info("Журнал диалогов открыт: %s сегментов", len(self.segments))
+
+    def load_state(self):
+        """Читает состояние журнала из state.json"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self, **changes):
+        """Обновляет и атомарно записывает состояние журнала"""
+        with self.lock:
+            self.state.update(changes)
+            self.state["entry_counts"] = {str(segment_id): count for segment_id, count in self.entry_counts.items()}
+            atomic_write_json(self.state_path, self.state)
+
+    def segment_path(self, segment_id):
+        """Возвращает путь к файлу сегмента"""
+        return os.path.join(self.log_dir, f"segment_{segment_id:06d}.jsonl")
+
+    def list_segments(self):
+        """Возвращает отсортированный список номеров сегментов"""
+        segment_ids = []
+        for name in os.listdir(self.log_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segment_ids.append(int(match.group(1)))
+        return sorted(segment_ids)
+
+    def recover_compaction(self):
+        """Завершает компактацию, прерванную сбоем"""
+        for name in os.listdir(self.log_dir):
+            path = os.path.join(self.log_dir, name)
+            if name.endswith(".tmp"):
+                # Недописанный результат компактации: исходные сегменты целы
+                os.remove(path)
+                continue
+
+            match = COMPACT_PATTERN.match(name)
+            if match:
+                # Готовый результат компактации: удаляем покрытые сегменты и ставим его на место первого
+                first, last = int(match.group(1)), int(match.group(2))
+                for segment_id in self.list_segments():
+                    if first < segment_id <= last:
+                        os.remove(self.segment_path(segment_id))
+                # Сохраненные размеры сегментов группы устарели
+                for segment_id in range(first, last + 1):
+                    self.entry_counts.pop(segment_id, None)
+                os.replace(path, self.segment_path(first))
+                logger.warning("Завершена прерванная компактация сегментов %s-%s", first, last)
+
+    def recover_tail(self, path):
+        """Обрезает поврежденный хвост сегмента и возвращает число целых записей"""
+        if not os.path.exists(path):
+            return 0
+
+        entries = 0
+        valid_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                entries += 1
+                valid_size += len(line)
+
+        if valid_size < os.path.getsize(path):
+            logger.warning("Обрезан поврежденный хвост журнала: %s", path)
+            with open(path, 'r+b') as f:
+                f.truncate(valid_size)
+
+        return entries
+
+    def append(self, entry):
+        """Дописывает одну запись в активный сегмент и возвращает ее положение"""
+        data = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        with self.lock:
+            location = (self.segments[-1], self.active_size)
+            self.active_file.write(data)
+            self.active_file.flush()
+            if self.fsync:
+                os.fsync(self.active_file.fileno())
+
+            self.active_size += len(data)
+            self.active_entries += 1
+            if self.active_entries >= self.segment_size:
+                self.rotate()
+
+        return location
+
+    def extend(self, entries):
+        """Дописывает несколько записей"""
+        for entry in entries:
+            self.append(entry)
+
+    def flush(self):
+        """Сбрасывает активный сегмент на диск"""
+        with self.lock:
+            self.active_file.flush()
+            os.fsync(self.active_file.fileno())
+
+    def rotate(self):
+        """Закрывает активный сегмент и начинает новый"""
+        self.flush()
+        self.active_file.close()
+        self.entry_counts[self.segments[-1]] = self.active_entries
+
+        self.segments.append(self.segments[-1] + 1)
+        self.active_file = open(self.segment_path(self.segments[-1]), 'ab')
+        self.active_size = 0
+        self.active_entries = 0
+
+        sealed = self.state.get("sealed_since_compaction", 0) + 1
+        self.save_state(sealed_since_compaction=sealed)
+        if self.compact_every and sealed >= self.compact_every:
+            self.start_compaction()
+
+    def start_compaction(self):
+        """Запускает компактацию в фоновом потоке, чтобы не задерживать append"""
+        with self.lock:
+            if self.compaction_thread is not None and self.compaction_thread.is_alive():
+                return
+            self.compaction_thread = threading.Thread(
+                target=self.compact, name="jarvis-log-compaction", daemon=True
+            )
+            self.compaction_thread.start()
+
+    def compact(self):
+        """Объединяет закрытые сегменты в более крупные"""
+        try:
+            with self.lock:
+                self.save_state(sealed_since_compaction=0)
+                sealed = self.segments[:-1]
+
+            # Группируем подряд идущие сегменты, пока их суммарный размер не превысит лимит
+            groups = []
+            group, group_entries = [], 0
+            for segment_id in sealed:
+                entries = self.count_entries(segment_id)
+                if group and group_entries + entries > self.compacted_size:
+                    groups.append(group)
+                    group, group_entries = [], 0
+                group.append(segment_id)
+                group_entries += entries
+            if group:
+                groups.append(group)
+
+            for group in groups:
+                if len(group) > 1:
+                    self.merge_segments(group)
+        except Exception as e:
+            logger.error("Ошибка компактации журнала: %s", e)
+
+    def count_entries(self, segment_id):
+        """Считает записи в закрытом сегменте (результат кэшируется)"""
+        count = self.entry_counts.get(segment_id)
+        if count is None:
+            with open(self.segment_path(segment_id), 'rb') as f:
+                count = sum(1 for _ in f)
+            self.entry_counts[segment_id] = count
+        return count
+
+    def merge_segments(self, group):
+        """Атомарно сливает группу сегментов в первый сегмент группы.
+
+        Закрытые сегменты не меняются, поэтому копирование идет без
+        блокировки; под ней только подменяются файлы, когда не осталось
+        читателей. Строки копируются побайтно, поэтому положение записи в
+        слитом сегменте равно ее старому смещению плюс размер предыдущих.
+        """
+        first, last = group[0], group[-1]
+        tmp_path = os.path.join(self.log_dir, f"segment_{first:06d}-{last:06d}.tmp")
+        compact_path = os.path.join(self.log_dir, f"segment_{first:06d}-{last:06d}.compact")
+
+        shifts = {}
+        with open(tmp_path, 'wb') as out:
+            for segment_id in group:
+                shifts[segment_id] = out.tell()
+                with open(self.segment_path(segment_id), 'rb') as f:
+                    out.write(f.read())
+            out.flush()
+            os.fsync(out.fileno())
+
+        with self.lock:
+            self.wait_readers()
+
+            # После переименования результат считается готовым, даже если дальше случится сбой
+            os.replace(tmp_path, compact_path)
+            for segment_id in group[1:]:
+                os.remove(self.segment_path(segment_id))
+            os.replace(compact_path, self.segment_path(first))
+
+            for segment_id in group[1:]:
+                self.relocations[segment_id] = (first, shifts[segment_id])
+            self.segments = [segment_id for segment_id in self.segments if segment_id not in group[1:]]
+            self.entry_counts[first] = sum(self.entry_counts.pop(segment_id, 0) for segment_id in group)
+            for segment_id in group:
+                self.bounds_cache.pop(segment_id, None)
+            self.save_state()
+
+        logger.info("Сегменты %s-%s объединены", first, last)
+
+    def wait_readers(self):
+        """Ждет, пока читатели отпустят снимки сегментов (вызывается под блокировкой)"""
+        self.swap_pending = True
+        try:
+            while self.readers:
+                self.readers_done.wait()
+        finally:
+            self.swap_pending = False
+            self.readers_done.notify_all()
+
+    @contextlib.contextmanager
+    def pinned_segments(self):
+        """Снимок списка сегментов: пока он используется, компактация не удаляет файлы"""
+        with self.lock:
+            while self.swap_pending:
+                self.readers_done.wait()
+            self.readers += 1
+            if not self.active_file.closed:
+                self.active_file.flush()
+            segment_ids = list(self.segments)
+        try:
+            yield segment_ids
+        finally:
+            with self.lock:
+                self.readers -= 1
+                if not self.readers:
+                    self.readers_done.notify_all()
+
+    def read_segment(self, segment_id):
+        """Читает записи одного сегмента, пропуская поврежденные строки"""
+        with open(self.segment_path(segment_id), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning("Пропущена поврежденная запись в сегменте %s", segment_id)
+
+    def is_empty(self):
+        """Проверяет, есть ли в журнале записи"""
+        return len(self.segments) == 1 and self.active_entries == 0
+
+    def __iter__(self):
+        """Перебирает все записи журнала от старых к новым"""
+        with self.pinned_segments() as segment_ids:
+            for segment_id in segment_ids:
+                yield from self.read_segment(segment_id)
+
+    def iter_with_locations(self, stop=None, start=None):
+        """Перебирает пары (положение, запись) от старых к новым.
+
+        Перебор начинается с положения start (по умолчанию с начала журнала)
+        и останавливается на положении stop (например, на end_location,
+        взятом в начале перебора). Сегмент читается под блокировкой, чтобы
+        чтение из фонового потока не пересеклось с компактацией.
+        """
+        with self.lock:
+            cursor = start if start is not None else (self.segments[0], 0)
+        while True:
+            with self.lock:
+                segment_id, offset = self.resolve(cursor)
+                stop_at = self.resolve(stop) if stop is not None else None
+                if segment_id == self.segments[-1]:
+                    self.active_file.flush()
+                with open(self.segment_path(segment_id), 'rb') as f:
+                    f.seek(offset)
+                    lines = f.readlines()
+                later = [other for other in self.segments if other > segment_id]
+
+            for line in lines:
+                location = (segment_id, offset)
+                if stop_at is not None and location >= stop_at:
+                    return
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    yield location, json.loads(line)
+                except ValueError:
+                    logger.warning("Пропущена поврежденная запись в сегменте %s", segment_id)
+
+            if not later:
+                return
+            cursor = (later[0], 0)
+
+    def end_location(self):
+        """Возвращает положение, на которое будет записана следующая запись"""
+        with self.lock:
+            return self.segments[-1], self.active_size
+
+    def tail_location(self, count):
+        """Возвращает положение, с которого начинаются последние count записей"""
+        with self.pinned_segments() as segment_ids:
+            for segment_id in reversed(segment_ids):
+                offset = os.path.getsize(self.segment_path(segment_id))
+                for line in self.read_lines_reversed(segment_id):
+                    if count <= 0:
+                        return segment_id, offset
+                    offset -= len(line) + 1
+                    count -= 1
+                if count <= 0:
+                    return segment_id, 0
+            return segment_ids[0], 0
+
+    def resolve(self, location):
+        """Пересчитывает положение записи с учетом слитых сегментов"""
+        segment_id, offset = location
+        while segment_id in self.relocations:
+            segment_id, shift = self.relocations[segment_id]
+            offset += shift
+        return segment_id, offset
+
+    def read_at(self, location):
+        """Читает одну запись по положению, которое вернул append"""
+        with self.lock:
+            segment_id, offset = self.resolve(location)
+            if segment_id == self.segments[-1]:
+                self.active_file.flush()
+            with open(self.segment_path(segment_id), 'rb') as f:
+                f.seek(offset)
+                line = f.readline()
+
+        try:
+            return json.loads(line)
+        except ValueError:
+            logger.warning("Не удалось прочитать запись %s", location)
+            return None
+
+    def read_lines_reversed(self, segment_id, block_size=65536):
+        """Читает строки сегмента с конца блоками, не загружая файл целиком"""
+        with open(self.segment_path(segment_id), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b""
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                lines = (f.read(read_size) + remainder).split(b"\n")
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line:
+                        yield line
+            if remainder:
+                yield remainder
+
+    def read_segment_reversed(self, segment_id):
+        """Читает записи одного сегмента от новых к старым"""
+        for line in self.read_lines_reversed(segment_id):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning("Пропущена поврежденная запись в сегменте %s", segment_id)
+
+    def iter_reversed(self):
+        """Перебирает записи от новых к старым, читая сегменты с конца"""
+        with self.pinned_segments() as segment_ids:
+            for segment_id in reversed(segment_ids):
+                yield from self.read_segment_reversed(segment_id)
+
+    def tail(self, count):
+        """Возвращает последние count записей в хронологическом порядке"""
+        entries = []
+        if count <= 0:
+            return entries
+        records = self.iter_reversed()
+        try:
+            for entry in records:
+                entries.append(entry)
+                if len(entries) >= count:
+                    break
+        finally:
+            # Отпускаем снимок сразу, а не когда сборщик мусора доберется до генератора
+            records.close()
+        entries.reverse()
+        return entries
+
+    def segment_bounds(self, segment_id):
+        """Возвращает метки времени первой и последней записи сегмента"""
+        with self.lock:
+            is_active = segment_id == self.segments[-1]
+        if not is_active and segment_id in self.bounds_cache:
+            return self.bounds_cache[segment_id]
+
+        first = last = None
+        for entry in self.read_segment(segment_id):
+            first = entry.get("timestamp")
+            break
+        for entry in self.read_segment_reversed(segment_id):
+            last = entry.get("timestamp")
+            break
+
+        if not is_active:
+            self.bounds_cache[segment_id] = (first, last)
+        return first, last
+
+    def iter_range(self, start=None, end=None, reverse=False):
+        """Перебирает записи в диапазоне времени [start, end], подгружая только нужные сегменты.
+
+        Границы принимаются как datetime или строки ISO 8601.
+        """
+        if start is not None and not isinstance(start, str):
+            start = start.isoformat()
+        if end is not None and not isinstance(end, str):
+            end = end.isoformat()
+
+        with self.pinned_segments() as segment_ids:
+            if reverse:
+                segment_ids.reverse()
+
+            for segment_id in segment_ids:
+                first, last = self.segment_bounds(segment_id)
+                if first is None:
+                    continue
+                if (start is not None and last < start) or (end is not None and first > end):
+                    continue
+
+                if reverse:
+                    entries = self.read_segment_reversed(segment_id)
+                else:
+                    entries = self.read_segment(segment_id)
+
+                for entry in entries:
+                    timestamp = entry.get("timestamp", "")
+                    if start is not None and timestamp < start:
+                        continue
+                    if end is not None and timestamp > end:
+                        continue
+                    yield entry
+
+    def reset(self):
+        """Удаляет все записи журнала"""
+        self.wait_compaction()
+        with self.lock:
+            self.wait_readers()
+            self.active_file.close()
+            for segment_id in self.segments:
+                os.remove(self.segment_path(segment_id))
+            self.segments = [1]
+            self.active_file = open(self.segment_path(1), 'ab')
+            self.active_size = 0
+            self.active_entries = 0
+            self.entry_counts.clear()
+            self.relocations.clear()
+            self.bounds_cache.clear()
+            self.save_state(sealed_since_compaction=0)
+
+    def migrate_from_json(self, json_path):
+        """Однократно переносит историю из старого conversation.json.
+
+        Отметка в state.json ставится до переноса и снимается после него:
+        если перенос прервался, при следующем запуске частично перенесенные
+        записи удаляются и миграция повторяется.
+        """
+        migration = self.state.get("migration")
+        if not os.path.exists(json_path) or migration == "done":
+            return 0
+        if migration != "started" and not self.is_empty():
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error("Не удалось прочитать %s для миграции: %s", json_path, e)
+            return 0
+
+        if migration == "started":
+            logger.warning("Повтор прерванной миграции из %s", json_path)
+            self.reset()
+
+        self.save_state(migration="started")
+        self.extend(history)
+        self.flush()
+        self.save_state(migration="done")
+
+        # Старый файл сохраняем рядом, чтобы миграция не повторялась
+        os.replace(json_path, json_path + ".migrated")
+        logger.info("Перенесено записей из %s: %s", json_path, len(history))
+        return len(history)
+
+    def wait_compaction(self):
+        """Ждет окончания фоновой компактации"""
+        thread = self.compaction_thread
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        """Закрывает журнал"""
+        self.wait_compaction()
+        if not self.active_file.closed:
+            self.flush()
+            self.active_file.close()
@@ -0,0 +1,88 @@
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger("jarvis.executor")
+
+class ActionTimeout(Exception):
+    """Действие не завершилось за отведенное время"""
+    def __init__(self, future):
+        super().__init__("Время ожидания действия истекло")
+        self.future = future
+
+class ActionExecutor:
+    def __init__(self, config=None):
+        """Фоновое выполнение действий: пул потоков для ввода-вывода, пул процессов для тяжелых вычислений"""
+        config = config or {}
+        self.default_timeout = config.get("timeout", 30)
+        self.ack_after = config.get("ack_after", 1.5)
+        self.process_workers = config.get("process_workers", 2)
+
+        self.threads = ThreadPoolExecutor(config.get("thread_workers", 4), thread_name_prefix="jarvis-action")
+        # Пул процессов создается при первой тяжелой задаче: его запуск недешев
+        self.processes = None
+        self.processes_lock = threading.Lock()
+
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+
+        logger.info("Исполнитель действий инициализирован")
+
+    def submit(self, fn, *args, cpu_bound=False, **kwargs):
+        """Запускает действие в фоне и возвращает Future"""
+        if cpu_bound:
+            with self.processes_lock:
+                if self.processes is None:
+                    self.processes = ProcessPoolExecutor(self.process_workers)
+            future = self.processes.submit(fn, *args, **kwargs)
+        else:
+            # Действие видит контекст вызывающего потока (например, текущую реплику)
+            future = self.threads.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+        with self.pending_lock:
+            self.pending.add(future)
+        future.add_done_callback(self.forget)
+        return future
+
+    def forget(self, future):
+        with self.pending_lock:
+            self.pending.discard(future)
+
+    def run(self, fn, *args, timeout=None, cpu_bound=False, on_slow=None, **kwargs):
+        """Выполняет действие и ждет результат не дольше timeout секунд.
+
+        Если действие длится дольше ack_after, вызывается on_slow (например,
+        чтобы сказать «Работаю над этим»). По истечении времени ожидания
+        действие отменяется, если еще не началось, и выбрасывается
+        ActionTimeout с его Future, чтобы результат можно было сообщить позже.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        future = self.submit(fn, *args, cpu_bound=cpu_bound, **kwargs)
+
+        if on_slow is not None and self.ack_after < timeout:
+            try:
+                return future.result(timeout=self.ack_after)
+            except FutureTimeoutError:
+                on_slow()
+                timeout -= self.ack_after
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning("Действие %s не завершилось за отведенное время", getattr(fn, '__name__', fn))
+            raise ActionTimeout(future)
+
+    def cancel_all(self):
+        """Отменяет все еще не начатые действия"""
+        with self.pending_lock:
+            pending = list(self.pending)
+        return sum(1 for future in pending if future.cancel())
+
+    def shutdown(self, wait=True):
+        """Останавливает пулы"""
+        self.cancel_all()
+        self.threads.shutdown(wait=wait)
+        if self.processes is not None:
+            self.processes.shutdown(wait=wait)
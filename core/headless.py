@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import logging
+import contextvars
+import subprocess
+import webbrowser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import metrics
+
+logger = logging.getLogger("jarvis.headless")
+
+# Список побочных эффектов текущей реплики (задается для каждой реплики отдельно)
+current_effects = contextvars.ContextVar("current_effects", default=None)
+
+class NullSpeech:
+    """Речевой движок без микрофона и синтеза: ничего не слушает и не произносит"""
+    capture = None
+
+    def speak(self, text):
+        logger.debug("Сказал бы: %s", text)
+
+    def listen(self):
+        return ""
+
+    def prewarm(self, phrases):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+class RecordingAI:
+    """Заменитель ИИ для пробного прогона: записывает запрос вместо обращения к API"""
+    stream = False
+
+    def process(self, user_input):
+        record_effect("ai", user_input)
+        return ""
+
+    def process_stream(self, user_input, on_sentence):
+        return self.process(user_input)
+
+    def close(self):
+        pass
+
+def record_effect(kind, *args):
+    """Запоминает намерение выполнить действие для текущей реплики"""
+    effects = current_effects.get()
+    if effects is not None:
+        effects.append({
+            "type": kind,
+            "args": [[str(item) for item in arg] if isinstance(arg, (list, tuple)) else str(arg) for arg in args],
+        })
+    else:
+        logger.warning("Побочный эффект вне реплики: %s %s", kind, args)
+
+class DryRun:
+    """Подменяет запуск процессов и открытие браузера записью намерений"""
+    def __enter__(self):
+        self.saved = {
+            (subprocess, "Popen"): subprocess.Popen,
+            (subprocess, "run"): subprocess.run,
+            (webbrowser, "open"): webbrowser.open,
+            (os, "startfile"): getattr(os, "startfile", None),
+        }
+
+        def fake_popen(args, *rest, **kwargs):
+            record_effect("subprocess", args)
+            return subprocess.CompletedProcess(args, 0)
+
+        def fake_run(args, *rest, **kwargs):
+            record_effect("subprocess", args)
+            return subprocess.CompletedProcess(args, 0, "", "")
+
+        def fake_open(url, *rest, **kwargs):
+            record_effect("browser", url)
+            return True
+
+        subprocess.Popen = fake_popen
+        subprocess.run = fake_run
+        webbrowser.open = fake_open
+        os.startfile = lambda path, *rest: record_effect("startfile", path)
+        return self
+
+    def __exit__(self, *exc_info):
+        for (module, name), value in self.saved.items():
+            if value is None:
+                delattr(module, name)
+            else:
+                setattr(module, name, value)
+
+def read_utterances(lines):
+    """Читает реплики: обычный текст построчно или JSONL с полями id и text"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            item = json.loads(line)
+            yield item.get("id", number), item["text"]
+        else:
+            yield number, line
+
+class HeadlessRunner:
+    def __init__(self, jarvis, workers=4, dry_run=False):
+        """Прогоняет текстовые реплики через process_command без микрофона и речи"""
+        self.jarvis = jarvis
+        self.workers = workers
+        self.dry_run = dry_run
+
+    def process(self, utterance_id, text):
+        """Обрабатывает одну реплику и возвращает результат с замерами времени"""
+        effects = []
+        spoken = []
+        current_effects.set(effects)
+
+        # Маршрут ищется один раз и передается в обработку: route_ms — время
+        # маршрутизации именно той обработки, что выполнится следом
+        started = time.perf_counter()
+        with metrics.span("routing"):
+            parts = self.jarvis.route_parts(text)
+        routed = time.perf_counter()
+
+        if len(parts) > 1:
+            category, action = "compound", [match[1] for _, match in parts]
+        else:
+            category, action, _ = parts[0][1]
+        result = {"id": utterance_id, "input": text, "category": category, "action": action}
+        try:
+            response = self.jarvis.process_command(text, speak=spoken.append, parts=parts)
+            result["response"] = str(response) if response is not None else None
+        except Exception as e:
+            logger.error("Ошибка обработки «%s»: %s", text, e)
+            result["error"] = str(e)
+        finished = time.perf_counter()
+
+        if spoken:
+            result["spoken"] = spoken
+        if self.dry_run:
+            result["effects"] = effects
+        result["route_ms"] = round((routed - started) * 1000, 3)
+        result["total_ms"] = round((finished - started) * 1000, 3)
+        return result
+
+    def run(self, utterances):
+        """Обрабатывает реплики пулом потоков и отдает результаты в исходном порядке"""
+        def submit(pool, utterance_id, text):
+            # Каждая реплика выполняется в своем контексте, чтобы эффекты не смешивались
+            return pool.submit(contextvars.copy_context().run, self.process, utterance_id, text)
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="jarvis-headless") as pool:
+            pending = deque()
+            for utterance_id, text in utterances:
+                pending.append(submit(pool, utterance_id, text))
+                # Ограничиваем число реплик в работе, чтобы большой корпус не копился в памяти
+                if len(pending) >= self.workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+def summarize(results, elapsed):
+    """Сводка прогона: число реплик, пропускная способность и перцентили времени"""
+    totals = sorted(result["total_ms"] for result in results)
+    if not totals:
+        return {"count": 0}
+
+    def percentile(p):
+        return totals[min(len(totals) - 1, int(len(totals) * p))]
+
+    categories = {}
+    for result in results:
+        categories[result["category"]] = categories.get(result["category"], 0) + 1
+    return {
+        "count": len(totals),
+        "errors": sum(1 for result in results if "error" in result),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(totals) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "categories": categories,
+    }
+
+def run_headless(jarvis, lines, output, workers=4, dry_run=False):
+    """Прогоняет реплики из lines и пишет по строке JSONL на каждую в output; возвращает сводку"""
+    runner = HeadlessRunner(jarvis, workers, dry_run)
+    results = []
+    started = time.perf_counter()
+
+    def emit(result):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        # Для сводки достаточно категории, времени и признака ошибки
+        results.append({key: result[key] for key in ("category", "total_ms", "error") if key in result})
+
+    if dry_run:
+        with DryRun():
+            for result in runner.run(read_utterances(lines)):
+                emit(result)
+    else:
+        for result in runner.run(read_utterances(lines)):
+            emit(result)
+
+    return summarize(results, time.perf_counter() - started)
@@ -0,0 +1,101 @@
+import re
+
+class Intent:
+    """Результат классификации запроса: тип, обработчик и извлеченные параметры"""
+    __slots__ = ("type", "handler", "slots")
+
+    def __init__(self, intent_type, handler, slots=None):
+        self.type = intent_type
+        self.handler = handler
+        self.slots = slots or {}
+
+    def __repr__(self):
+        return f"Intent({self.type!r}, {self.handler!r}, {self.slots!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Intent):
+            return NotImplemented
+        return (self.type, self.handler, self.slots) == (other.type, other.handler, other.slots)
+
+# Таблица намерений компилируется один раз при импорте.
+# Порядок строк задает приоритет: поиск проверяется раньше личных запросов.
+# Каждая строка: (тип, обработчик, шаблон распознавания, имя параметра,
+#                 шаблоны извлечения параметра, шаблон очистки для запасного варианта)
+INTENT_TABLE = [
+    (
+        "search_recipe", "web_search",
+        re.compile(r'найти рецепт|как приготовить|рецепт'),
+        "dish",
+        [
+            re.compile(r'рецепт\s+([а-яё\s]+)'),
+            re.compile(r'приготовить\s+([а-яё\s]+)'),
+            re.compile(r'найти\s+рецепт\s+([а-яё\s]+)'),
+        ],
+        re.compile(r'найти рецепт|рецепт|как приготовить'),
+    ),
+    (
+        "search_video", "web_search",
+        re.compile(r'найти видео|посмотреть видео'),
+        "topic",
+        [re.compile(r'видео\s+([а-яё\s]+)')],
+        re.compile(r'найти видео|посмотреть видео'),
+    ),
+    (
+        "search", "web_search",
+        re.compile(r'найти|поиск|искать|загугли|найди'),
+        "query",
+        [],
+        re.compile(r'найти|поиск|искать|загугли|найди'),
+    ),
+    (
+        "get_date", "personal",
+        re.compile(r'какое сегодня число|какая сегодня дата|дата сегодня|число сегодня'),
+        None, [], None,
+    ),
+    (
+        "get_time", "personal",
+        re.compile(r'который час|сколько времени|время сейчас|текущее время'),
+        None, [], None,
+    ),
+    (
+        "get_weather", "personal",
+        re.compile(r'погода|прогноз погоды'),
+        "city",
+        [re.compile(r'погода в (\w+)'), re.compile(r'погода (\w+)')],
+        None,
+    ),
+]
+
+def classify_intent(query, handler=None):
+    """Определяет намерение пользователя без побочных эффектов.
+
+    Возвращает Intent или None. Если указан handler, проверяются только
+    намерения этого обработчика.
+    """
+    query = query.lower()
+
+    for intent_type, intent_handler, detect, slot_name, extractors, cleanup in INTENT_TABLE:
+        if handler and intent_handler != handler:
+            continue
+        if not detect.search(query):
+            continue
+
+        slots = {}
+        if slot_name:
+            value = None
+            for extractor in extractors:
+                match = extractor.search(query)
+                if match:
+                    value = match.group(1).strip()
+                    break
+
+            # Если шаблоны не сработали, убираем ключевые слова из запроса
+            if value is None and cleanup is not None:
+                value = cleanup.sub('', query).strip()
+
+            if value:
+                slots[slot_name] = value
+
+        return Intent(intent_type, intent_handler, slots)
+
+    return None
@@ -1,35 +1,131 @@
 import os
 import json
 import logging
+import threading
+from collections import deque
 from datetime import datetime
+from core.conversation_log import ConversationLog
+from core.persistence import WriteBehindStore, atomic_write_json
+from core.retrieval import RetrievalIndex
 
 logger = logging.getLogger("jarvis.memory")
 
 class MemorySystem:
-    def __init__(self, memory_dir):
+    def __init__(self, memory_dir, config=None):
         """Инициализация системы памяти"""
+        config = config or {}
         self.memory_dir = memory_dir
         self.conversation_file = os.path.join(memory_dir, "conversation.json")
+        self.conversation_dir = os.path.join(memory_dir, "conversation")
+        self.window_size = config.get("window_size", 50)
+        # Сколько последних реплик истории индексируется при запуске (None — вся история)
+        self.index_turns = config.get("index_turns", 10000)
         self.user_data_file = os.path.join(memory_dir, "user_data.json")
         
         # Создаем директорию, если она не существует
         os.makedirs(memory_dir, exist_ok=True)
         
+        # Журнал диалогов: сегменты JSONL, в которые только дописываются записи
+        self.conversation_log = ConversationLog(
+            self.conversation_dir,
+            segment_size=config.get("segment_size", 1000),
+            compact_every=config.get("compact_every", 10),
+            compacted_size=config.get("compacted_size", 10000),
+            fsync=config.get("fsync", False)
+        )
+        
         # Загружаем или создаем файлы памяти
         self.load_memory()
         
+        # Данные пользователя записываются отложенно, пачки изменений объединяются
+        self.user_data_store = WriteBehindStore(
+            self.user_data_file,
+            self.user_data,
+            flush_interval=config.get("flush_interval", 2.0)
+        )
+        
+        # Поисковый индекс по истории и фактам; история индексируется в фоне
+        self.retrieval_index = None
+        if config.get("retrieval", True):
+            self.start_indexing()
+        
         logger.info("Система памяти инициализирована")
     
+    def start_indexing(self):
+        """Создает поисковый индекс и заполняет его историей в фоновом потоке"""
+        self.retrieval_index = RetrievalIndex()
+        self.fact_documents = {}
+        
+        with self.user_data_store.lock:
+            facts = dict(self.user_data["facts"])
+        for key, value in facts.items():
+            self.index_fact(key, value)
+        
+        # Новые реплики индексируются сразу при добавлении, поэтому
+        # фоновый проход останавливается на текущем конце журнала. Индекс
+        # строится в памяти при каждом запуске, поэтому он покрывает только
+        # последние index_turns реплик: время запуска и память не растут с историей
+        stop = self.conversation_log.end_location()
+        self.indexing_thread = threading.Thread(
+            target=self.index_history, args=(stop,), name="memory-indexer", daemon=True
+        )
+        self.indexing_thread.start()
+    
+    def index_history(self, stop):
+        """Индексирует последние index_turns реплик истории до указанного положения в журнале"""
+        count = 0
+        try:
+            start = self.conversation_log.tail_location(self.index_turns) if self.index_turns is not None else None
+            for location, entry in self.conversation_log.iter_with_locations(stop, start):
+                self.retrieval_index.add(
+                    f"{entry.get('user', '')} {entry.get('assistant', '')}", ("turn", location)
+                )
+                count += 1
+        except Exception as e:
+            logger.error("Ошибка индексации истории: %s", e)
+        logger.info("Проиндексировано реплик истории: %s", count)
+    
+    def index_fact(self, key, value):
+        """Добавляет факт в поисковый индекс, заменяя прежнее значение"""
+        if self.retrieval_index is None:
+            return
+        previous = self.fact_documents.get(key)
+        if previous is not None:
+            self.retrieval_index.remove(previous)
+        self.fact_documents[key] = self.retrieval_index.add(f"{key} {value}", ("fact", key))
+    
+    def search_relevant(self, query, k=3, exclude_timestamps=()):
+        """Возвращает до k релевантных прошлых реплик и фактов о пользователе.
+        
+        Реплики возвращаются как словари истории, факты — как {"fact": ключ, "value": значение}.
+        """
+        if self.retrieval_index is None or k <= 0:
+            return []
+        
+        results = []
+        exclude_timestamps = set(exclude_timestamps)
+        for score, (kind, ref) in self.retrieval_index.search(query, k + len(exclude_timestamps)):
+            if kind == "fact":
+                results.append({"fact": ref, "value": self.get_user_fact(ref)})
+            else:
+                entry = self.conversation_log.read_at(ref)
+                if entry is None or entry.get("timestamp") in exclude_timestamps:
+                    continue
+                results.append(entry)
+            if len(results) >= k:
+                break
+        return results
+    
     def load_memory(self):
         """Загружает данные памяти из файлов"""
-        # Загружаем историю разговоров
-        try:
-            with open(self.conversation_file, 'r', encoding='utf-8') as f:
-                self.conversation_history = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.conversation_history = []
-            with open(self.conversation_file, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation_history, f)
+        # Однократно переносим историю из старого формата
+        self.conversation_log.migrate_from_json(self.conversation_file)
+        
+        # В памяти держим только окно последних реплик в виде кортежей
+        # (время, пользователь, ассистент); старые реплики читаются с диска по запросу
+        self.recent_window = deque(maxlen=self.window_size)
+        for entry in self.conversation_log.tail(self.window_size):
+            self.recent_window.append((entry.get("timestamp"), entry.get("user", ""), entry.get("assistant", "")))
         
         # Загружаем данные пользователя
         try:
@@ -41,42 +137,71 @@ class MemorySystem:
                 "facts": {},
                 "last_interaction": None
             }
-            with open(self.user_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.user_data, f)
+            atomic_write_json(self.user_data_file, self.user_data)
     
     def save_conversation(self):
-        """Сохраняет историю разговоров"""
-        with open(self.conversation_file, 'w', encoding='utf-8') as f:
-            json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
+        """Сбрасывает журнал диалогов на диск"""
+        self.conversation_log.flush()
     
     def save_user_data(self):
-        """Сохраняет данные пользователя"""
-        with open(self.user_data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.user_data, f, ensure_ascii=False, indent=2)
+        """Немедленно сохраняет данные пользователя"""
+        self.user_data_store.mark_dirty()
+        self.user_data_store.flush()
     
     def add_to_conversation(self, user_input, assistant_response):
         """Добавляет диалог в историю"""
-        self.conversation_history.append({
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "user": user_input,
             "assistant": assistant_response
-        })
+        }
+        self.recent_window.append((entry["timestamp"], user_input, assistant_response))
         
         # Обновляем время последнего взаимодействия
-        self.user_data["last_interaction"] = datetime.now().isoformat()
+        with self.user_data_store.lock:
+            self.user_data["last_interaction"] = entry["timestamp"]
+        self.user_data_store.mark_dirty()
         
-        # Сохраняем изменения
-        self.save_conversation()
-        self.save_user_data()
+        # Дописываем одну строку в журнал вместо перезаписи всей истории
+        location = self.conversation_log.append(entry)
+        
+        if self.retrieval_index is not None:
+            self.retrieval_index.add(f"{user_input} {assistant_response}", ("turn", location))
     
     def get_conversation_history(self):
-        """Возвращает историю разговоров"""
-        return self.conversation_history
+        """Возвращает окно последних реплик (полная история доступна через iter_history)"""
+        return self.recent(self.window_size)
+    
+    def recent(self, n):
+        """Возвращает последние n реплик в хронологическом порядке"""
+        if n <= 0:
+            return []
+        
+        # Если окна не хватает, дочитываем недостающее с диска
+        if n > len(self.recent_window):
+            return self.conversation_log.tail(n)
+        
+        items = list(self.recent_window)[-n:]
+        return [
+            {"timestamp": timestamp, "user": user, "assistant": assistant}
+            for timestamp, user, assistant in items
+        ]
+    
+    def iter_history(self, start=None, end=None, reverse=False):
+        """Лениво перебирает историю с диска, при необходимости в диапазоне времени"""
+        return self.conversation_log.iter_range(start, end, reverse=reverse)
     
     def add_user_preference(self, key, value):
         """Добавляет предпочтение пользователя"""
-        self.user_data["preferences"][key] = value
-        self.save_user_data()
+        with self.user_data_store.lock:
+            self.user_data["preferences"][key] = value
+        self.user_data_store.mark_dirty()
+    
+    def add_user_preferences(self, preferences):
+        """Добавляет несколько предпочтений за одну запись на диск"""
+        with self.user_data_store.lock:
+            self.user_data["preferences"].update(preferences)
+        self.user_data_store.mark_dirty()
     
     def get_user_preference(self, key, default=None):
         """Возвращает предпочтение пользователя"""
@@ -84,9 +209,24 @@ class MemorySystem:
     
     def add_user_fact(self, key, value):
         """Добавляет факт о пользователе"""
-        self.user_data["facts"][key] = value
-        self.save_user_data()
+        with self.user_data_store.lock:
+            self.user_data["facts"][key] = value
+        self.user_data_store.mark_dirty()
+        self.index_fact(key, value)
+    
+    def add_user_facts(self, facts):
+        """Добавляет несколько фактов за одну запись на диск"""
+        with self.user_data_store.lock:
+            self.user_data["facts"].update(facts)
+        self.user_data_store.mark_dirty()
+        for key, value in facts.items():
+            self.index_fact(key, value)
     
     def get_user_fact(self, key, default=None):
         """Возвращает факт о пользователе"""
-        return self.user_data["facts"].get(key, default)
\ No newline at end of file
+        return self.user_data["facts"].get(key, default)
+    
+    def close(self):
+        """Записывает отложенные изменения и закрывает файлы памяти"""
+        self.user_data_store.close()
+        self.conversation_log.close()
@@ -0,0 +1,106 @@
+import os
+import json
+import atexit
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger("jarvis.persistence")
+
+def atomic_write(path, text):
+    """Атомарно записывает текст: временный файл в той же папке и переименование"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path, data, indent=2):
+    """Атомарно записывает данные в JSON-файл"""
+    atomic_write(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+class WriteBehindStore:
+    def __init__(self, path, data, flush_interval=2.0, indent=2, lock=None):
+        """Отложенная запись JSON-данных с объединением изменений.
+
+        Изменения только помечают данные как грязные; фоновый поток
+        записывает их не чаще раза в flush_interval секунд. При
+        flush_interval <= 0 запись выполняется сразу. Владелец данных может
+        передать свою блокировку, под которой он изменяет data.
+        """
+        self.path = path
+        self.data = data
+        self.flush_interval = flush_interval
+        self.indent = indent
+
+        # Блокировка защищает данные от изменения во время сериализации
+        self.lock = lock or threading.RLock()
+        # Отдельная блокировка упорядочивает записи, чтобы старый снимок не перезаписал новый
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.writes = 0
+
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+        if flush_interval > 0:
+            self.thread = threading.Thread(target=self.run, name=f"write-behind:{os.path.basename(path)}", daemon=True)
+            self.thread.start()
+
+        atexit.register(self.close)
+
+    def mark_dirty(self):
+        """Помечает данные как измененные"""
+        with self.lock:
+            self.dirty = True
+
+        if self.thread is None:
+            self.flush()
+        else:
+            self.wake_event.set()
+
+    def flush(self):
+        """Записывает данные на диск, если они изменились"""
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty:
+                    return False
+                snapshot = json.dumps(self.data, ensure_ascii=False, indent=self.indent)
+                self.dirty = False
+
+            try:
+                atomic_write(self.path, snapshot)
+                self.writes += 1
+                return True
+            except Exception as e:
+                logger.error("Ошибка записи %s: %s", self.path, e)
+                # Оставляем данные грязными, чтобы повторить запись позже
+                with self.lock:
+                    self.dirty = True
+                return False
+
+    def run(self):
+        """Фоновый цикл отложенной записи"""
+        while not self.stop_event.is_set():
+            self.wake_event.wait()
+            self.wake_event.clear()
+
+            # Ждем интервал, собирая все изменения за это время в одну запись
+            if self.stop_event.wait(self.flush_interval):
+                break
+            self.flush()
+
+    def close(self):
+        """Останавливает фоновый поток и записывает оставшиеся изменения"""
+        if self.thread is not None and self.thread.is_alive():
+            self.stop_event.set()
+            self.wake_event.set()
+            self.thread.join()
+        self.flush()
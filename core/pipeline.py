@@ -0,0 +1,189 @@
+import re
+import time
+import asyncio
+import difflib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.helpers import SpokenResponse
+
+logger = logging.getLogger("jarvis.pipeline")
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def words(text):
+    """Слова фразы в нижнем регистре, без пунктуации"""
+    return WORD_PATTERN.findall(text.lower().replace("ё", "е"))
+
+def coverage(phrase, sentence, cutoff=0.75):
+    """Доля слов phrase, которые есть в sentence точно или с ошибкой распознавания"""
+    if not phrase:
+        return 0.0
+    vocabulary = set(sentence)
+    matched = sum(
+        1 for word in phrase
+        if word in vocabulary or difflib.get_close_matches(word, vocabulary, n=1, cutoff=cutoff)
+    )
+    return matched / len(phrase)
+
+class VoicePipeline:
+    def __init__(self, jarvis, config=None):
+        """Конвейер из параллельных стадий: захват речи, обработка команд, озвучивание.
+
+        Стадии связаны очередями asyncio. Микрофон слушает и во время
+        озвучивания, новая команда прерывает текущую речь, а медленный
+        обработчик не мешает распознать следующую команду.
+        """
+        config = config or {}
+        self.jarvis = jarvis
+        self.speech = jarvis.speech
+        self.max_handlers = config.get("max_concurrent_handlers", 4)
+        self.barge_in = config.get("barge_in", True)
+        # Распознаватель выдает фразу только после паузы, то есть когда реплика
+        # уже досказана: эхо ищется среди недавно произнесенных реплик
+        self.echo_window = config.get("echo_window", 5.0)
+        self.echo_similarity = config.get("echo_similarity", 0.8)
+        self.recent_speech = deque(maxlen=config.get("echo_history", 10))
+
+        # Номер «поколения» ответов: растет при каждом прерывании,
+        # реплики старых поколений больше не озвучиваются
+        self.generation = 0
+        self.current_text = None
+        self.handler_tasks = set()
+
+    async def run(self):
+        """Запускает стадии и ждет завершения работы"""
+        self.loop = asyncio.get_running_loop()
+        self.utterances = asyncio.Queue()
+        self.speech_queue = asyncio.Queue()
+        self.handler_slots = asyncio.Semaphore(self.max_handlers)
+        self.finished = asyncio.Event()
+
+        self.handler_executor = ThreadPoolExecutor(self.max_handlers, thread_name_prefix="jarvis-handler")
+        self.speech_executor = ThreadPoolExecutor(1, thread_name_prefix="jarvis-speech")
+
+        # Захват блокируется внутри listen(), поэтому живет в отдельном фоновом потоке
+        capture_thread = threading.Thread(target=self.capture_loop, name="jarvis-capture", daemon=True)
+        capture_thread.start()
+
+        stages = [
+            asyncio.create_task(self.routing_stage()),
+            asyncio.create_task(self.speech_stage()),
+        ]
+
+        try:
+            await self.finished.wait()
+        finally:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            if self.handler_tasks:
+                await asyncio.gather(*self.handler_tasks, return_exceptions=True)
+            self.handler_executor.shutdown(wait=True)
+            self.speech_executor.shutdown(wait=True)
+
+    def capture_loop(self):
+        """Стадия захвата: непрерывно слушает микрофон, в том числе во время речи"""
+        while self.jarvis.running:
+            command = self.speech.listen()
+            if command and self.jarvis.running:
+                self.loop.call_soon_threadsafe(self.on_utterance, command)
+
+    def on_utterance(self, command):
+        """Принимает распознанную фразу в потоке цикла событий"""
+        if self.is_echo(command):
+            logger.debug("Пропущено эхо собственной речи: %s", command)
+            return
+
+        if self.barge_in and (self.current_text is not None or not self.speech_queue.empty()):
+            self.interrupt()
+
+        self.utterances.put_nowait(command)
+
+    def is_echo(self, command):
+        """Проверяет, не услышал ли микрофон собственную речь Джарвиса.
+
+        Фраза сравнивается с репликами, которые звучат сейчас или закончились
+        не раньше echo_window секунд назад. Распознавание неточно, поэтому
+        эхом считается фраза, большая часть слов которой (echo_similarity)
+        есть в реплике, хотя бы с небольшими искажениями.
+        """
+        phrase = words(command)
+        if not phrase:
+            return False
+        now = time.monotonic()
+        for sentence, finished_at in self.recent_speech:
+            if finished_at is not None and now - finished_at > self.echo_window:
+                continue
+            if coverage(phrase, sentence) >= self.echo_similarity:
+                return True
+        return False
+
+    def interrupt(self):
+        """Прерывает текущую речь и отбрасывает очередь реплик"""
+        logger.info("Речь прервана новой командой")
+        self.generation += 1
+        while not self.speech_queue.empty():
+            generation, text = self.speech_queue.get_nowait()
+            if text is None:
+                # Сигнал завершения не отбрасываем
+                self.speech_queue.put_nowait((self.generation, None))
+                break
+        self.speech.stop()
+
+    async def routing_stage(self):
+        """Стадия маршрутизации: запускает обработчики, не дожидаясь их завершения"""
+        while True:
+            command = await self.utterances.get()
+            logger.info("Получена команда: %s", command)
+
+            await self.handler_slots.acquire()
+            task = asyncio.create_task(self.handle(command, self.generation))
+            self.handler_tasks.add(task)
+            task.add_done_callback(self.handler_tasks.discard)
+
+    async def handle(self, command, generation):
+        """Выполняет команду в пуле потоков и ставит ответ в очередь речи"""
+        def speak(sentence):
+            # Вызывается из потока обработчика при потоковом ответе ИИ
+            self.loop.call_soon_threadsafe(self.speech_queue.put_nowait, (generation, sentence))
+
+        try:
+            response = await self.loop.run_in_executor(
+                self.handler_executor, self.jarvis.profiler.run, self.jarvis.process_command, command, speak
+            )
+            logger.info("Ответ: %s", response)
+            if response and not isinstance(response, SpokenResponse):
+                self.speech_queue.put_nowait((generation, response))
+        except Exception as e:
+            logger.error("Ошибка при обработке команды '%s': %s", command, e)
+            self.speech_queue.put_nowait((generation, "Извините, при выполнении команды произошла ошибка."))
+        finally:
+            self.handler_slots.release()
+
+        if not self.jarvis.running:
+            # Команда выхода: договариваем ответ и завершаем работу
+            self.speech_queue.put_nowait((generation, None))
+
+    async def speech_stage(self):
+        """Стадия озвучивания: произносит реплики по очереди"""
+        while True:
+            generation, text = await self.speech_queue.get()
+            if text is None:
+                self.finished.set()
+                return
+            if generation < self.generation:
+                continue
+
+            self.current_text = text
+            # Время окончания ставится после речи; пока она звучит, там None
+            spoken = [words(text), None]
+            self.recent_speech.append(spoken)
+            try:
+                await self.loop.run_in_executor(self.speech_executor, self.speech.speak, text)
+            except Exception as e:
+                logger.error("Ошибка синтеза речи: %s", e)
+            finally:
+                spoken[1] = time.monotonic()
+                self.current_text = None
@@ -0,0 +1,153 @@
+import json
+import queue
+import logging
+import threading
+import speech_recognition as sr
+
+logger = logging.getLogger("jarvis.recognizers")
+
+class RecognitionStream:
+    def __init__(self, backend, sample_rate, sample_width):
+        """Сеанс распознавания одной фразы; по умолчанию копит звук и распознает в конце"""
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.chunks = []
+
+    def feed(self, chunk):
+        """Принимает очередной фрагмент звука"""
+        self.chunks.append(chunk)
+
+    def finish(self):
+        """Завершает фразу и возвращает распознанный текст"""
+        audio = sr.AudioData(b"".join(self.chunks), self.sample_rate, self.sample_width)
+        return self.backend.recognize(audio)
+
+    def cancel(self):
+        """Отменяет сеанс (например, если фраза оказалась слишком короткой)"""
+        self.chunks = []
+
+class ThreadedStream:
+    def __init__(self, stream):
+        """Подает фрагменты в сеанс распознавания из отдельного потока, не задерживая захват"""
+        self.stream = stream
+        self.chunks = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="jarvis-recognition", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            try:
+                self.stream.feed(chunk)
+            except Exception as e:
+                self.error = e
+                return
+
+    def feed(self, chunk):
+        self.chunks.put(chunk)
+
+    def finish(self):
+        self.chunks.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.stream.finish()
+
+    def cancel(self):
+        self.chunks.put(None)
+        self.stream.cancel()
+
+class RecognizerBackend:
+    """Базовый интерфейс движка распознавания речи"""
+    name = "base"
+    # Умеет ли движок распознавать по мере поступления звука
+    streaming = False
+
+    def recognize(self, audio):
+        """Распознает фразу целиком (sr.AudioData) и возвращает текст"""
+        raise NotImplementedError
+
+    def start_stream(self, sample_rate, sample_width):
+        """Начинает потоковый сеанс распознавания одной фразы"""
+        return RecognitionStream(self, sample_rate, sample_width)
+
+class GoogleBackend(RecognizerBackend):
+    name = "google"
+
+    def __init__(self, recognizer, config):
+        """Облачное распознавание Google через speech_recognition"""
+        self.recognizer = recognizer
+        self.language = config.get("language", "ru-RU")
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+class WhisperBackend(RecognizerBackend):
+    name = "whisper"
+
+    def __init__(self, recognizer, config):
+        """Локальное распознавание моделью Whisper (пакет openai-whisper)"""
+        self.recognizer = recognizer
+        self.model = config.get("whisper_model", "base")
+        self.language = config.get("whisper_language", "russian")
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_whisper(audio, model=self.model, language=self.language).strip()
+
+class VoskStream:
+    def __init__(self, model, sample_rate):
+        """Потоковый сеанс Vosk: звук распознается по мере поступления"""
+        from vosk import KaldiRecognizer
+        self.recognizer = KaldiRecognizer(model, sample_rate)
+
+    def feed(self, chunk):
+        self.recognizer.AcceptWaveform(chunk)
+
+    def finish(self):
+        return json.loads(self.recognizer.FinalResult()).get("text", "")
+
+    def cancel(self):
+        self.recognizer.Reset()
+
+class VoskBackend(RecognizerBackend):
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, recognizer, config):
+        """Локальное офлайн-распознавание Vosk с потоковым режимом"""
+        try:
+            from vosk import Model, SetLogLevel
+        except ImportError:
+            raise RuntimeError("Для офлайн-распознавания установите пакет vosk")
+
+        model_path = config.get("vosk_model_path", "data/models/vosk-model-small-ru")
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+        logger.info("Модель Vosk загружена: %s", model_path)
+
+    def recognize(self, audio):
+        stream = VoskStream(self.model, audio.sample_rate)
+        stream.feed(audio.get_raw_data(convert_width=2))
+        return stream.finish()
+
+    def start_stream(self, sample_rate, sample_width):
+        if sample_width != 2:
+            return RecognitionStream(self, sample_rate, sample_width)
+        return VoskStream(self.model, sample_rate)
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "whisper": WhisperBackend,
+    "vosk": VoskBackend,
+}
+
+def create_backend(name, recognizer, config):
+    """Создает движок распознавания по имени из настроек speech.recognizer"""
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Неизвестный движок распознавания: {name}")
+    return backend_class(recognizer, config)
@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("jarvis.registry")
+
+class ComponentRegistry:
+    def __init__(self):
+        """Реестр компонентов с ленивым созданием.
+
+        Фабрика компонента сама импортирует тяжелые зависимости, поэтому
+        openai, pyttsx3 и прочие загружаются только при первом обращении
+        к компоненту (или при явном start/preload).
+        """
+        self.factories = {}
+        self.closers = {}
+        self.instances = {}
+        self.locks = {}
+        # Время создания каждого компонента (импорт + инициализация), секунды
+        self.timings = {}
+
+    def register(self, name, factory, close=None):
+        """Регистрирует фабрику компонента и, при необходимости, функцию его закрытия"""
+        self.factories[name] = factory
+        self.locks[name] = threading.Lock()
+        if close is not None:
+            self.closers[name] = close
+
+    def get(self, name):
+        """Возвращает компонент, создавая его при первом обращении"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self.locks[name]:
+            if name not in self.instances:
+                started = time.perf_counter()
+                self.instances[name] = self.factories[name]()
+                self.timings[name] = time.perf_counter() - started
+                logger.info("Компонент %s создан за %.3f с", name, self.timings[name])
+            return self.instances[name]
+
+    def loaded(self, name):
+        return name in self.instances
+
+    def start(self, names, max_workers=None):
+        """Создает независимые компоненты параллельно и ждет их готовности"""
+        names = [name for name in names if not self.loaded(name)]
+        if not names:
+            return
+        with ThreadPoolExecutor(max_workers or len(names), thread_name_prefix="jarvis-init") as pool:
+            # result() пробрасывает ошибку инициализации вызывающему
+            for future in [pool.submit(self.get, name) for name in names]:
+                future.result()
+
+    def preload(self, names):
+        """Создает компоненты в фоновом потоке, чтобы первая команда не ждала импорта"""
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error("Ошибка фоновой загрузки компонента %s: %s", name, e)
+
+        thread = threading.Thread(target=run, name="jarvis-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Закрывает созданные компоненты в порядке, обратном регистрации"""
+        for name in reversed(list(self.factories)):
+            if name in self.instances and name in self.closers:
+                try:
+                    self.closers[name](self.instances[name])
+                except Exception as e:
+                    logger.error("Ошибка при закрытии компонента %s: %s", name, e)
+
+class Component:
+    """Атрибут класса, который берет компонент из self.registry"""
+    def __init__(self, name=None):
+        self.name = name
+
+    def __set_name__(self, owner, name):
+        if self.name is None:
+            self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.registry.get(self.name)
@@ -0,0 +1,146 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from core.persistence import WriteBehindStore
+
+logger = logging.getLogger("jarvis.ai.cache")
+
+# Запросы, ответ на которые зависит от текущего момента, не кэшируются.
+# Основы привязаны к началу слова: «год» не должен находиться в «сегодня» и «выгодно»
+TIME_SENSITIVE_PATTERN = re.compile(
+    r'\b(?:сейчас|сегодн|завтр|вчера|послезавтр|позавчера|врем[яе]\b|времени\b|который час|котором часу'
+    r'|дат[аеуы]\b|как(?:ое|ого|им) числ|погод[аеуы]\b|курс[аеуы]? (?:валют|доллар|евро|рубл|юан|биткоин|акци)'
+    r'|новост|последн|текущ|свеж|недел[яеиюь]\b|месяц|год[ау]?\b)'
+)
+
+# Уточняющие вопросы: без предыдущих реплик их смысл не определен
+FOLLOW_UP_PATTERN = re.compile(
+    r'^(?:а|и|но|ну|тогда|еще)\b|\b(?:он|она|оно|они|его|ее|их|ему|ей|им|нем|ней|них'
+    r'|это|этот|эта|эти|этого|этой|этом|этому|этим|тот|та|те|того|той|том|там|туда|оттуда|тут|здесь'
+    r'|такой|такое|почему|зачем|подробнее|дальше|продолжи)\b'
+)
+
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+SPACES_PATTERN = re.compile(r'\s+')
+
+class ResponseCache:
+    def __init__(self, cache_file, config=None):
+        """Кэш ответов ИИ с вытеснением LRU, сроком жизни и хранением на диске"""
+        config = config or {}
+        self.max_entries = config.get("max_entries", 500)
+        self.ttl = config.get("ttl", 7 * 24 * 3600)
+        # Последние реплики входят в ключ только для уточняющих вопросов: ответ на
+        # «а почему?» зависит от разговора, а на «что ты умеешь» — нет.
+        # include_recent добавляет их в ключ всегда (повторы тогда почти не попадают в кэш)
+        self.include_recent = config.get("include_recent", False)
+        self.follow_up_words = config.get("follow_up_words", 2)
+        self.bypass_patterns = [TIME_SENSITIVE_PATTERN] + [
+            re.compile(pattern) for pattern in config.get("bypass_patterns", [])
+        ]
+
+        self.lock = threading.RLock()
+        self.counters = {"hits": 0, "misses": 0, "bypassed": 0, "expired": 0, "evictions": 0}
+
+        # Порядок ключей в файле соответствует порядку LRU
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.entries = OrderedDict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = OrderedDict()
+
+        self.store = WriteBehindStore(
+            cache_file, self.entries, config.get("flush_interval", 5.0), indent=None, lock=self.lock
+        )
+
+        with self.lock:
+            self.evict_expired()
+            self.evict_overflow()
+
+        logger.info("Кэш ответов загружен: %s записей", len(self.entries))
+
+    @staticmethod
+    def normalize(utterance):
+        """Приводит запрос к нормальной форме: регистр, ё, пунктуация, пробелы"""
+        text = utterance.lower().replace("ё", "е")
+        text = PUNCTUATION_PATTERN.sub(" ", text)
+        return SPACES_PATTERN.sub(" ", text).strip()
+
+    def is_cacheable(self, utterance):
+        """Проверяет, можно ли кэшировать ответ на запрос"""
+        normalized = self.normalize(utterance)
+        if not normalized or any(pattern.search(normalized) for pattern in self.bypass_patterns):
+            with self.lock:
+                self.counters["bypassed"] += 1
+            return False
+        return True
+
+    def is_follow_up(self, utterance):
+        """Проверяет, продолжает ли запрос разговор: короткий или ссылается на сказанное"""
+        normalized = self.normalize(utterance)
+        return len(normalized.split()) <= self.follow_up_words or bool(FOLLOW_UP_PATTERN.search(normalized))
+
+    def make_key(self, utterance, model, context_messages):
+        """Строит ключ из нормализованного запроса, модели и хэша контекста"""
+        context = json.dumps(context_messages, ensure_ascii=False, sort_keys=True)
+        raw = "\x1f".join((model, self.normalize(utterance), hashlib.sha1(context.encode('utf-8')).hexdigest()))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Возвращает ответ из кэша или None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+
+            expired = time.time() - entry["created"] > self.ttl
+            if expired:
+                del self.entries[key]
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+            else:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+
+        if expired:
+            self.store.mark_dirty()
+            return None
+        return entry["response"]
+
+    def put(self, key, response):
+        """Сохраняет ответ в кэш"""
+        with self.lock:
+            self.entries[key] = {"response": response, "created": time.time()}
+            self.entries.move_to_end(key)
+            self.evict_overflow()
+        self.store.mark_dirty()
+
+    def evict_expired(self):
+        """Удаляет устаревшие записи (вызывается под блокировкой)"""
+        now = time.time()
+        for key in [key for key, entry in self.entries.items() if now - entry["created"] > self.ttl]:
+            del self.entries[key]
+            self.counters["expired"] += 1
+
+    def evict_overflow(self):
+        """Вытесняет самые давно использованные записи сверх лимита (под блокировкой)"""
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def stats(self):
+        """Возвращает счетчики попаданий и промахов"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        """Сохраняет кэш на диск"""
+        self.store.close()
@@ -0,0 +1,273 @@
+import re
+import math
+import heapq
+import bisect
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger("jarvis.retrieval")
+
+TOKEN_PATTERN = re.compile(r'[a-zа-яё0-9]+')
+
+RUSSIAN_STOPWORDS = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его ее ей ему если
+есть еще же за здесь и из или им их к как ко когда кто ли либо мне может мы на надо наш не него нее нет ни них но ну
+о об однако он она они оно от очень по под при с со так также такой там те тем то того тоже той только том ты у уже
+хотя чего чей чем что чтобы чье чья эта эти это я мой моя мое мои твой твоя свой себя себе меня тебя нам ему ней
+""".split())
+
+VOWELS = "аеиоуыэюя"
+
+# Окончания алгоритма Snowball для русского языка.
+# Окончания первой группы допустимы только после «а» или «я».
+PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")
+PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+ADJECTIVE = ("ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем",
+             "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+REFLEXIVE = ("ся", "сь")
+VERB_1 = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+VERB_2 = ("ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют", "ены",
+          "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю")
+NOUN = ("иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий",
+        "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я")
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+def _regions(word):
+    """Возвращает начала областей RV и R2 по правилам Snowball"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+def _strip(rv, group_1=(), group_2=()):
+    """Удаляет самое длинное подходящее окончание; возвращает None, если его нет"""
+    best = None
+    for ending in group_1:
+        if rv.endswith(ending) and rv[:-len(ending)].endswith(("а", "я")):
+            if best is None or len(ending) > len(best):
+                best = ending
+    for ending in group_2:
+        if rv.endswith(ending):
+            if best is None or len(ending) > len(best):
+                best = ending
+    if best is None:
+        return None
+    return rv[:-len(best)]
+
+def stem(word):
+    """Возвращает основу русского слова (стеммер Snowball/Портера)"""
+    word = word.replace("ё", "е")
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастия, иначе возвратность и прилагательные/глаголы/существительные
+    result = _strip(rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if result is not None:
+        rv = result
+    else:
+        result = _strip(rv, group_2=REFLEXIVE)
+        if result is not None:
+            rv = result
+
+        result = _strip(rv, group_2=ADJECTIVE)
+        if result is not None:
+            rv = result
+            participle = _strip(rv, PARTICIPLE_1, PARTICIPLE_2)
+            if participle is not None:
+                rv = participle
+        else:
+            result = _strip(rv, VERB_1, VERB_2)
+            if result is None:
+                result = _strip(rv, group_2=NOUN)
+            if result is not None:
+                rv = result
+
+    # Шаг 2: конечная «и»
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательные окончания в области R2
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(prefix) + len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4: превосходная степень, удвоенная «н» и мягкий знак
+    result = _strip(rv, group_2=SUPERLATIVE)
+    if result is not None:
+        rv = result
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    elif rv.endswith("ь"):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+class RetrievalIndex:
+    def __init__(self, k1=1.5, b=0.75, max_df_ratio=0.05, fallback_scan=2000):
+        """Инкрементальный инвертированный индекс BM25.
+
+        Документы только добавляются (или помечаются удаленными), поэтому
+        индекс обновляется без перестроения. Списки вхождений хранятся в
+        компактных массивах array, отсортированных по номеру документа.
+        Поиск идет по схеме MaxScore: когда частые термины уже не могут
+        вывести новый документ в первые k, их списки не перебираются, а
+        только дополняют оценки найденных кандидатов.
+        """
+        self.k1 = k1
+        self.b = b
+        # Слишком частые термины почти не влияют на ранжирование, но дорого обходятся
+        self.max_df_ratio = max_df_ratio
+        # Если в запросе только частые термины, просматриваются лишь самые новые вхождения
+        self.fallback_scan = fallback_scan
+
+        self.postings = {}      # термин -> (array номеров документов, array частот)
+        self.max_tf = {}        # термин -> наибольшая частота в документе, для верхней границы оценки
+        self.doc_lengths = array('I')
+        self.min_length = None
+        self.payloads = []
+        self.deleted = set()
+        self.total_length = 0
+
+        self.stem_cache = {}
+        self.lock = threading.RLock()
+
+    def analyze(self, text):
+        """Разбивает текст на основы слов без стоп-слов"""
+        terms = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            if token in RUSSIAN_STOPWORDS or len(token) < 2:
+                continue
+            term = self.stem_cache.get(token)
+            if term is None:
+                term = stem(token)
+                if len(self.stem_cache) < 200000:
+                    self.stem_cache[token] = term
+            terms.append(term)
+        return terms
+
+    def add(self, text, payload):
+        """Добавляет документ и возвращает его номер"""
+        terms = self.analyze(text)
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+
+        with self.lock:
+            doc_id = len(self.payloads)
+            self.payloads.append(payload)
+            self.doc_lengths.append(len(terms))
+            self.total_length += len(terms)
+            if terms and (self.min_length is None or len(terms) < self.min_length):
+                self.min_length = len(terms)
+
+            for term, count in frequencies.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = (array('I'), array('H'))
+                    self.postings[term] = posting
+                posting[0].append(doc_id)
+                posting[1].append(min(count, 65535))
+                if count > self.max_tf.get(term, 0):
+                    self.max_tf[term] = min(count, 65535)
+
+        return doc_id
+
+    def remove(self, doc_id):
+        """Помечает документ удаленным (например, при изменении факта)"""
+        with self.lock:
+            self.deleted.add(doc_id)
+
+    def __len__(self):
+        return len(self.payloads) - len(self.deleted)
+
+    def search(self, query, k=5):
+        """Возвращает до k пар (оценка, данные документа) по убыванию релевантности"""
+        terms = set(self.analyze(query))
+        if not terms or k <= 0:
+            return []
+
+        with self.lock:
+            total_docs = len(self.payloads)
+            if not total_docs:
+                return []
+            average_length = self.total_length / total_docs or 1.0
+
+            # Отбрасываем слишком частые термины, если в запросе есть более редкие
+            present = [term for term in terms if term in self.postings]
+            limit = total_docs * self.max_df_ratio if total_docs > 20 else total_docs
+            selected = [term for term in present if len(self.postings[term][0]) <= limit]
+            scan = None
+            if not selected and present:
+                selected = [min(present, key=lambda term: len(self.postings[term][0]))]
+                scan = self.fallback_scan
+
+            k1, b = self.k1, self.b
+            lengths = self.doc_lengths
+            min_norm = k1 * (1 - b + b * (self.min_length or 0) / average_length)
+
+            # Термины от редких к частым; у каждого верхняя граница вклада в оценку
+            weighted = []
+            for term in selected:
+                df = len(self.postings[term][0])
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                tf = self.max_tf[term]
+                weighted.append((idf * tf * (k1 + 1) / (tf + min_norm), idf, term))
+            weighted.sort(key=lambda item: -item[1])
+            remaining = [0.0] * (len(weighted) + 1)
+            for index in range(len(weighted) - 1, -1, -1):
+                remaining[index] = remaining[index + 1] + weighted[index][0]
+
+            scores = {}
+            for index, (_, idf, term) in enumerate(weighted):
+                doc_ids, frequencies = self.postings[term]
+                if scan is not None:
+                    doc_ids, frequencies = doc_ids[-scan:], frequencies[-scan:]
+                threshold = self.kth_score(scores, k)
+                if threshold is not None and remaining[index] <= threshold:
+                    # Новый документ уже не наберет больше k-го кандидата: оставляем
+                    # только кандидатов, которые еще могут войти в первые k, и
+                    # дополняем их оценки поиском в списке вхождений
+                    for doc_id, score in list(scores.items()):
+                        if score + remaining[index] < threshold:
+                            del scores[doc_id]
+                            continue
+                        position = bisect.bisect_left(doc_ids, doc_id)
+                        if position < len(doc_ids) and doc_ids[position] == doc_id:
+                            tf = frequencies[position]
+                            norm = k1 * (1 - b + b * lengths[doc_id] / average_length)
+                            scores[doc_id] = score + idf * tf * (k1 + 1) / (tf + norm)
+                    continue
+
+                for doc_id, tf in zip(doc_ids, frequencies):
+                    norm = k1 * (1 - b + b * lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+            candidates = (
+                (score, doc_id) for doc_id, score in scores.items()
+                if doc_id not in self.deleted
+            )
+            best = heapq.nlargest(k, candidates)
+            return [(score, self.payloads[doc_id]) for score, doc_id in best]
+
+    def kth_score(self, scores, k):
+        """k-я по величине оценка среди неудаленных кандидатов или None, если их меньше k"""
+        if len(scores) < k:
+            return None
+        best = heapq.nlargest(k, (score for doc_id, score in scores.items() if doc_id not in self.deleted))
+        return best[-1] if len(best) == k else None
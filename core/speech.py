@@ -1,46 +1,118 @@
 import speech_recognition as sr
-import pyttsx3
+import time
 import logging
+import contextlib
+from core.audio_capture import CaptureStream
+from core.recognizers import create_backend
+from core.tts_cache import PhraseCache
+from core.tts_worker import TTSWorker
+from utils.metrics import metrics
 
 logger = logging.getLogger("jarvis.speech")
 
 class SpeechEngine:
-    def __init__(self, config):
-        """Инициализация речевого движка"""
-        # Настройка синтеза речи
-        self.engine = pyttsx3.init('sapi5')
-        self.voices = self.engine.getProperty('voices')
+    def __init__(self, config, cache_dir=None):
+        """Инициализация речевого движка.
         
-        # Применяем настройки из конфигурации
-        voice_index = config.get("voice_index", 0)
-        if voice_index < len(self.voices):
-            self.engine.setProperty('voice', self.voices[voice_index].id)
+        cache_dir — папка кэша синтезированных фраз (без нее кэш отключен).
+        """
+        # Синтез речи: движок pyttsx3 живет в своем потоке, речь, синтез
+        # в файл и остановка из других потоков передаются ему заданиями
+        self.tts = TTSWorker(config)
         
-        self.engine.setProperty('rate', config.get("voice_rate", 190))
+        # Повторяющиеся фразы синтезируются один раз и проигрываются с диска
+        self.phrase_cache = None
+        cache_config = config.get("tts_cache", {})
+        if cache_dir and cache_config.get("enabled", True):
+            self.phrase_cache = PhraseCache(cache_dir, self.tts, self.tts.voice_id, self.tts.rate, cache_config)
         
         # Настройка распознавания речи
         self.recognizer = sr.Recognizer()
         self.recognizer.energy_threshold = config.get("energy_threshold", 300)
         
+        # Движок распознавания выбирается в настройках: google, vosk (офлайн) или whisper
+        self.backend = create_backend(config.get("recognizer", "google"), self.recognizer, config)
+        
+        # Постоянный поток захвата с фоновой калибровкой шума вместо
+        # открытия микрофона и adjust_for_ambient_noise перед каждой фразой.
+        # Вместо микрофона можно подать WAV-файл (input_wav) для проверки.
+        self.capture = None
+        if config.get("continuous_capture", True):
+            input_wav = config.get("input_wav")
+            source = sr.AudioFile(input_wav) if input_wav else sr.Microphone()
+            self.capture = CaptureStream(source, config, self.backend)
+        
         logger.info("Речевой движок инициализирован")
     
     def speak(self, text):
         """Произносит текст"""
-        logger.debug(f"Говорю: {text}")
+        logger.debug("Говорю: %s", text)
         print(f"Джарвис: {text}")
-        self.engine.say(text)
-        self.engine.runAndWait()
+        
+        started = time.perf_counter()
+        if self.phrase_cache is not None and self.speak_cached(text):
+            metrics.observe("speech", time.perf_counter() - started, source="cache")
+            return
+        
+        with metrics.span("speech", source="tts"):
+            self.tts.speak(text)
+    
+    def speak_cached(self, text):
+        """Проигрывает фразу из кэша; возвращает False, если ее нужно синтезировать"""
+        try:
+            path = self.phrase_cache.lookup(text)
+            if path is None and self.phrase_cache.note_spoken(text):
+                # Фраза повторяется: синтезируем в файл один раз и дальше берем из кэша
+                path = self.phrase_cache.render(text)
+            return path is not None and self.phrase_cache.play(path)
+        except Exception as e:
+            logger.error("Ошибка кэша синтеза речи: %s", e)
+            return False
+    
+    def prewarm(self, phrases):
+        """Заранее синтезирует фразы в кэш в фоновом потоке"""
+        if self.phrase_cache is not None and phrases:
+            self.phrase_cache.prewarm(phrases)
+    
+    def stop(self):
+        """Прерывает текущую речь (вызывается из другого потока)"""
+        if self.phrase_cache is not None:
+            self.phrase_cache.stop()
+        self.tts.stop()
+    
+    def muted(self):
+        """Контекст, в котором поток захвата не выделяет фразы (для последовательного цикла)"""
+        if self.capture is None:
+            return contextlib.nullcontext()
+        return self.capture.muted()
     
     def listen(self):
         """Слушает и распознает речь"""
         try:
-            with sr.Microphone() as source:
+            if self.capture is not None:
+                # Фраза уже выделена фоновым потоком захвата
                 print("Слушаю...")
-                self.recognizer.adjust_for_ambient_noise(source)
-                audio = self.recognizer.listen(source)
+                phrase = self.capture.listen()
+                if phrase is None:
+                    return ""
+                audio, stream = phrase
+            else:
+                started = time.perf_counter()
+                with sr.Microphone() as source:
+                    metrics.observe("mic_open", time.perf_counter() - started)
+                    print("Слушаю...")
+                    with metrics.span("calibration"):
+                        self.recognizer.adjust_for_ambient_noise(source)
+                    with metrics.span("capture"):
+                        audio = self.recognizer.listen(source)
+                stream = None
                 
             print("Распознаю...")
-            query = self.recognizer.recognize_google(audio, language='ru-RU')
+            # Потоковый движок уже распознал большую часть фразы во время речи
+            with metrics.span("recognition", backend=self.backend.name):
+                query = stream.finish() if stream is not None else self.backend.recognize(audio)
+            if not query:
+                raise sr.UnknownValueError()
             print(f"Вы сказали: {query}")
             return query.lower()
         except sr.UnknownValueError:
@@ -48,6 +120,14 @@ class SpeechEngine:
             print("Не удалось распознать речь")
             return ""
         except Exception as e:
-            logger.error(f"Ошибка при распознавании речи: {e}")
+            logger.error("Ошибка при распознавании речи: %s", e)
             print(f"Ошибка: {e}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    def close(self):
+        """Останавливает поток захвата звука и синтеза, сохраняет индекс кэша фраз"""
+        if self.capture is not None:
+            self.capture.stop()
+        if self.phrase_cache is not None:
+            self.phrase_cache.close()
+        self.tts.close()
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import wave
+import hashlib
+import logging
+import threading
+from core.persistence import WriteBehindStore
+
+logger = logging.getLogger("jarvis.tts_cache")
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+class PhraseCache:
+    def __init__(self, cache_dir, tts, voice_id, rate, config=None):
+        """Дисковый кэш синтезированных фраз.
+
+        Фразы, прозвучавшие не менее min_repeats раз, и фразы из списка
+        prewarm синтезируются в WAV-файлы. Ключ — (текст, голос, скорость),
+        размер кэша ограничен max_mb с вытеснением давно не звучавших фраз.
+        Синтез в файл выполняет поток движка tts (TTSWorker).
+        """
+        config = config or {}
+        self.cache_dir = cache_dir
+        self.tts = tts
+        self.voice_id = voice_id or ""
+        self.rate = rate
+        self.max_bytes = config.get("max_mb", 50) * 1024 * 1024
+        self.min_repeats = config.get("min_repeats", 2)
+        self.max_text_length = config.get("max_text_length", 200)
+        self.max_seen = config.get("max_seen", 2000)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        index_file = os.path.join(cache_dir, "index.json")
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {"entries": {}, "seen": {}}
+
+        self.lock = threading.RLock()
+        self.store = WriteBehindStore(index_file, self.index, config.get("flush_interval", 5.0), lock=self.lock)
+
+        # Прерывание воспроизведения из другого потока
+        self.stop_event = threading.Event()
+
+        logger.info("Кэш синтеза речи: %s фраз", len(self.index['entries']))
+
+    def key(self, text):
+        raw = f"{self.voice_id}\x1f{self.rate}\x1f{text}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def lookup(self, text):
+        """Возвращает путь к готовому WAV-файлу фразы или None"""
+        key = self.key(text)
+        with self.lock:
+            entry = self.index["entries"].get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(self.path(key)):
+                del self.index["entries"][key]
+                return None
+            entry["last_used"] = time.time()
+        self.store.mark_dirty()
+        return self.path(key)
+
+    def note_spoken(self, text):
+        """Учитывает произнесенную фразу; возвращает True, если ее пора закэшировать"""
+        if len(text) > self.max_text_length:
+            return False
+        key = self.key(text)
+        with self.lock:
+            seen = self.index["seen"]
+            count = seen.pop(key, 0) + 1
+            seen[key] = count
+            # Держим счетчики только для последних фраз
+            while len(seen) > self.max_seen:
+                del seen[next(iter(seen))]
+        self.store.mark_dirty()
+        return count >= self.min_repeats
+
+    def render(self, text):
+        """Синтезирует фразу в WAV-файл и возвращает путь к нему"""
+        key = self.key(text)
+        path = self.path(key)
+        tmp_path = path + ".tmp.wav"
+
+        self.tts.save_to_file(text, tmp_path)
+
+        if not os.path.exists(tmp_path):
+            logger.warning("Синтезатор не создал файл для фразы: %s", text)
+            return None
+        size = os.path.getsize(tmp_path)
+        if size > self.max_bytes:
+            # Фраза больше всего кэша — ее скажет синтезатор
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.index["entries"][key] = {"size": size, "last_used": time.time(), "text": text}
+            self.index["seen"].pop(key, None)
+            self.evict()
+        self.store.mark_dirty()
+        return path
+
+    def evict(self):
+        """Удаляет давно не звучавшие фразы сверх лимита размера (под блокировкой)"""
+        entries = self.index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda key: entries[key]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["size"]
+            del entries[key]
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def prewarm(self, phrases):
+        """Синтезирует фразы из списка в фоновом потоке"""
+        def run():
+            for text in phrases:
+                if self.lookup(text) is None:
+                    try:
+                        self.render(text)
+                    except Exception as e:
+                        logger.error("Ошибка предварительного синтеза «%s»: %s", text, e)
+            logger.info("Предварительный синтез завершен: %s фраз", len(phrases))
+
+        thread = threading.Thread(target=run, name="jarvis-tts-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def play(self, path):
+        """Воспроизводит WAV-файл; возвращает False, если воспроизведение недоступно"""
+        if winsound is None:
+            return False
+
+        with wave.open(path, 'rb') as f:
+            duration = f.getnframes() / float(f.getframerate())
+
+        self.stop_event.clear()
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+        # Ждем окончания, оставаясь прерываемыми через stop()
+        self.stop_event.wait(duration)
+        return True
+
+    def stop(self):
+        """Прерывает воспроизведение"""
+        self.stop_event.set()
+        if winsound is not None:
+            winsound.PlaySound(None, 0)
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,131 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+import pyttsx3
+
+logger = logging.getLogger("jarvis.tts")
+
+class TTSWorker:
+    def __init__(self, config, poll_interval=0.02):
+        """Выделенный поток, владеющий движком pyttsx3.
+
+        Движок sapi5 — COM-объект: он создается, настраивается, говорит,
+        пишет в файл и останавливается только в этом потоке. Поток крутит
+        внешний цикл событий pyttsx3 (startLoop(False) и iterate), поэтому
+        между порциями событий успевает принять новое задание или просьбу
+        прервать речь. Задания выполняются по одному, когда движок свободен.
+        """
+        self.config = config
+        self.poll_interval = poll_interval
+        self.tasks = queue.Queue()
+        self.stop_requested = threading.Event()
+        self.ready = threading.Event()
+        self.error = None
+        self.voice_id = None
+        self.rate = None
+
+        self.thread = threading.Thread(target=self.run, name="jarvis-tts", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def create_engine(self):
+        """Создает и настраивает движок (вызывается в потоке синтеза)"""
+        engine = pyttsx3.init('sapi5')
+        voices = engine.getProperty('voices')
+        voice_index = self.config.get("voice_index", 0)
+        if voice_index < len(voices):
+            engine.setProperty('voice', voices[voice_index].id)
+        engine.setProperty('rate', self.config.get("voice_rate", 190))
+        self.voice_id = engine.getProperty('voice')
+        self.rate = engine.getProperty('rate')
+        return engine
+
+    def run(self):
+        """Цикл потока синтеза: события движка, задания и прерывания"""
+        try:
+            import pythoncom
+        except ImportError:
+            pythoncom = None
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+
+        try:
+            engine = self.create_engine()
+            engine.startLoop(False)
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+
+        # Задание, которое уже выполнено, но движок еще говорит или пишет файл
+        current = None
+        try:
+            while True:
+                engine.iterate()
+                if self.stop_requested.is_set():
+                    self.stop_requested.clear()
+                    if engine.isBusy():
+                        engine.stop()
+                if engine.isBusy():
+                    time.sleep(self.poll_interval)
+                    continue
+
+                if current is not None:
+                    future, result = current
+                    future.set_result(result)
+                    current = None
+
+                try:
+                    task = self.tasks.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+                if task is None:
+                    break
+
+                func, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Просьба прервать относится к прежней речи, а не к новой
+                self.stop_requested.clear()
+                try:
+                    current = (future, func(engine))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if current is not None:
+                current[0].set_result(current[1])
+            try:
+                engine.endLoop()
+            except Exception as e:
+                logger.error("Ошибка остановки цикла синтеза: %s", e)
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def call(self, func):
+        """Выполняет func(engine) в потоке синтеза и ждет, пока движок освободится"""
+        future = Future()
+        self.tasks.put((func, future))
+        return future.result()
+
+    def speak(self, text):
+        """Произносит текст; возвращается, когда речь закончилась или прервана"""
+        self.call(lambda engine: engine.say(text))
+
+    def save_to_file(self, text, path):
+        """Синтезирует текст в WAV-файл"""
+        self.call(lambda engine: engine.save_to_file(text, path))
+
+    def stop(self):
+        """Прерывает текущую речь (можно вызывать из любого потока)"""
+        self.stop_requested.set()
+
+    def close(self):
+        """Завершает поток синтеза после уже поставленных заданий"""
+        if self.thread.is_alive():
+            self.tasks.put(None)
+            self.thread.join()
@@ -1,15 +1,16 @@
 import os
 import sys
 import json
-import threading
-from core.speech import SpeechEngine
-from core.ai_brain import AI
-from core.memory import MemorySystem
-from modules.system_commands import SystemCommands
-from modules.applications import ApplicationManager
-from modules.web_search import WebSearch
-from modules.personal_assist import PersonalAssistant
+import contextvars
+from core.command_router import CommandRouter
+from core.compound import split_clauses, plan_lanes, join_replies
+from core.intents import Intent, classify_intent
+from core.executor import ActionTimeout
+from core.registry import ComponentRegistry, Component
+from utils.helpers import SpokenResponse
 from utils.logger import setup_logger
+from utils.metrics import metrics, MetricsExporter
+from utils.profiling import TurnProfiler
 
 # Настройка путей
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -36,16 +37,126 @@ def load_config():
             "user_name": "",
             "ai": {
                 "api_key": "",
-                "model": "gpt-4"
+                "model": "gpt-4",
+                "stream": True,
+                "recent_turns": 2,
+                "relevant_turns": 3,
+                "context_budget": 1500,
+                "cache": {
+                    "enabled": True,
+                    "max_entries": 500,
+                    "ttl": 604800,
+                    "include_recent": False,
+                    "follow_up_words": 2
+                },
+                "client": {
+                    "connect_timeout": 3,
+                    "read_timeout": 20,
+                    "retries": 2,
+                    "backoff": 0.5,
+                    "max_backoff": 4,
+                    "hedge": False,
+                    "failure_threshold": 5,
+                    "reset_timeout": 30
+                }
             },
             "speech": {
                 "voice_rate": 190,
                 "voice_index": 0,
-                "energy_threshold": 300
+                "energy_threshold": 300,
+                "continuous_capture": True,
+                "recognizer": "google",
+                "language": "ru-RU",
+                "vosk_model_path": "data/models/vosk-model-small-ru",
+                "pause_threshold": 0.8,
+                "tts_cache": {
+                    "enabled": True,
+                    "max_mb": 50,
+                    "min_repeats": 2,
+                    "prewarm": [
+                        "До свидания!",
+                        "Работаю над этим...",
+                        "Не удалось распознать команду"
+                    ]
+                }
+            },
+            "memory": {
+                "segment_size": 1000,
+                "compact_every": 10,
+                "flush_interval": 2.0,
+                "window_size": 50,
+                "retrieval": True,
+                "index_turns": 10000
+            },
+            "executor": {
+                "thread_workers": 4,
+                "process_workers": 2,
+                "timeout": 30,
+                "ack_after": 1.5
+            },
+            "pipeline": {
+                "max_concurrent_handlers": 4,
+                "barge_in": True
+            },
+            "compound": {
+                "enabled": True,
+                "max_parallel": 4
+            },
+            "router": {
+                "fuzzy": True,
+                "max_distance": 2,
+                "distance_ratio": 0.25,
+                "min_length": 5,
+                "min_word_length": 7,
+                "margin": 1,
+                "exact_actions": ["shutdown", "restart", "exit"]
+            },
+            "apps": {
+                "scan_path": True,
+                "min_score": 0.6,
+                "exe_prefix_score": 0.8,
+                "aliases": {}
+            },
+            "weather": {
+                "default_city": "Москва",
+                "ttl": 600,
+                "prefetch_interval": 480,
+                "connect_timeout": 3,
+                "read_timeout": 5,
+                "retries": 2
+            },
+            "screenshots": {
+                "source": "screen",
+                "format": "png",
+                "compression": 6,
+                "quality": 85,
+                "dedup": True,
+                "dedup_distance": 2,
+                "retention": {
+                    "max_mb": 500,
+                    "max_age_days": 30
+                }
+            },
+            "logging": {
+                "level": "INFO",
+                "json": False,
+                "queue_size": 10000
+            },
+            "metrics": {
+                "enabled": True,
+                "interval": 30,
+                "port": None
             },
             "system": {
                 "startup": False,
-                "tray_icon": True
+                "tray_icon": True,
+                "pipeline": True,
+                "startup_components": ["memory", "speech"],
+                "preload_components": ["ai", "executor", "system_commands", "app_manager"],
+                "profiling": {
+                    "enabled": False,
+                    "every_n_turns": 20
+                }
             }
         }
         
@@ -73,32 +184,131 @@ def load_commands():
         }
 
 class Jarvis:
-    def __init__(self):
-        """Инициализация Джарвиса"""
-        logger.info("Инициализация Джарвиса")
+    # Компоненты создаются реестром при первом обращении
+    memory = Component()
+    speech = Component()
+    ai = Component()
+    executor = Component()
+    system_commands = Component()
+    app_manager = Component()
+    web_search = Component()
+    personal_assistant = Component()
+    compound_pool = Component()
+    
+    def __init__(self, overrides=None):
+        """Инициализация Джарвиса.
         
+        overrides — фабрики, заменяющие стандартные компоненты (например,
+        речь без микрофона в режиме без интерфейса).
+        """
         # Загрузка конфигурации
         self.config = load_config()
         self.commands_config = load_commands()
         
-        # Инициализация компонентов
-        self.memory = MemorySystem(os.path.join(DATA_PATH, "memory"))
-        self.speech = SpeechEngine(self.config["speech"])
-        self.ai = AI(self.config["ai"], self.memory)
-        self.system_commands = SystemCommands()
-        self.app_manager = ApplicationManager()
-        self.web_search = WebSearch()
-        self.personal_assistant = PersonalAssistant(CONFIG_PATH)
+        # Повторная настройка меняет уровень и формат журнала, а если DATA_PATH
+        # подменен (бенчмарки, проверки), переводит запись в новую папку
+        logging_config = self.config.get("logging", {})
+        setup_logger(
+            "jarvis", os.path.join(DATA_PATH, "logs", "jarvis.log"),
+            level=logging_config.get("level", "INFO"),
+            json_lines=logging_config.get("json", False),
+            queue_size=logging_config.get("queue_size", 10000),
+        )
+        logger.info("Инициализация Джарвиса")
+        self.router = CommandRouter(self.commands_config, self.config.get("router", {}))
+        
+        # Регистрация компонентов; тяжелые зависимости импортируются в фабриках
+        self.registry = ComponentRegistry()
+        # Экспорт метрик регистрируется первым и закрывается последним, сохраняя итоговый снимок
+        self.registry.register("metrics_exporter", self.create_metrics_exporter, lambda exporter: exporter.close())
+        self.registry.register("memory", self.create_memory, lambda memory: memory.close())
+        self.registry.register("executor", self.create_executor, lambda executor: executor.shutdown(wait=False))
+        self.registry.register("speech", self.create_speech, lambda speech: speech.close())
+        self.registry.register("ai", self.create_ai, lambda ai: ai.close())
+        self.registry.register("system_commands", self.create_system_commands, lambda commands: commands.close())
+        self.registry.register("app_manager", self.create_app_manager)
+        self.registry.register("web_search", self.create_web_search)
+        self.registry.register("personal_assistant", self.create_personal_assistant, lambda assistant: assistant.close())
+        self.registry.register("compound_pool", self.create_compound_pool, lambda pool: pool.shutdown(wait=False))
+        for name, factory in (overrides or {}).items():
+            self.registry.register(name, factory, self.registry.closers.get(name))
+        
+        # До первого «Слушаю...» нужны только память и речь: создаем их параллельно
+        system_config = self.config.get("system", {})
+        self.registry.start(system_config.get("startup_components", ["memory", "speech"]))
+        if self.config.get("metrics", {}).get("enabled", True):
+            self.registry.get("metrics_exporter")
+        
+        # Профилирование ходов (по умолчанию выключено)
+        self.profiler = TurnProfiler(
+            os.path.join(DATA_PATH, "logs", "profile"),
+            self.config.get("system", {}).get("profiling", {})
+        )
         
         # Флаг работы
         self.running = False
     
+    def create_metrics_exporter(self):
+        return MetricsExporter(
+            metrics, self.config.get("metrics", {}), os.path.join(DATA_PATH, "logs", "metrics.json")
+        ).start()
+    
+    def create_memory(self):
+        from core.memory import MemorySystem
+        return MemorySystem(os.path.join(DATA_PATH, "memory"), self.config.get("memory", {}))
+    
+    def create_speech(self):
+        from core.speech import SpeechEngine
+        return SpeechEngine(self.config["speech"], os.path.join(DATA_PATH, "cache", "tts"))
+    
+    def create_ai(self):
+        from core.ai_brain import AI
+        return AI(self.config["ai"], self.memory)
+    
+    def create_executor(self):
+        from core.executor import ActionExecutor
+        return ActionExecutor(self.config.get("executor", {}))
+    
+    def create_system_commands(self):
+        from modules.system_commands import SystemCommands
+        from modules.screen_tools import ScreenTools
+        config = self.config.get("screenshots", {})
+        save_dir = config.get("save_dir") or os.path.join(DATA_PATH, "media")
+        screen_tools = ScreenTools(save_dir, self.executor, config)
+        return SystemCommands(self.executor, screen_tools=screen_tools)
+    
+    def create_app_manager(self):
+        from modules.applications import ApplicationManager
+        return ApplicationManager(
+            index_file=os.path.join(DATA_PATH, "cache", "app_index.json"), config=self.config.get("apps", {})
+        )
+    
+    def create_web_search(self):
+        from modules.web_search import WebSearch
+        return WebSearch()
+    
+    def create_personal_assistant(self):
+        from modules.personal_assist import PersonalAssistant
+        return PersonalAssistant(CONFIG_PATH)
+    
+    def create_compound_pool(self):
+        from concurrent.futures import ThreadPoolExecutor
+        max_parallel = self.config.get("compound", {}).get("max_parallel", 4)
+        return ThreadPoolExecutor(max_parallel, thread_name_prefix="jarvis-compound")
+    
     def start(self):
         """Запуск Джарвиса"""
         self.running = True
         
+        # Остальные компоненты загружаются в фоне, пока звучит приветствие;
+        # команда, которой компонент нужен раньше, просто создаст его сама
+        preload = self.config.get("system", {}).get("preload_components", ["ai", "executor", "system_commands", "app_manager"])
+        if preload:
+            self.registry.preload(preload)
+        
         # Приветствие
         user_name = self.config["user_name"]
+        self.prewarm_phrases(user_name)
         if user_name:
             self.speech.speak(f"Здравствуйте, {user_name}! Джарвис к вашим услугам.")
         else:
@@ -114,50 +324,127 @@ class Jarvis:
         # Основной цикл
         self.main_loop()
     
+    def prewarm_phrases(self, user_name):
+        """Заранее синтезирует частые фразы: приветствие, прощание и сегодняшнюю дату"""
+        phrases = list(self.config["speech"].get("tts_cache", {}).get("prewarm", []))
+        if user_name:
+            phrases.append(f"Здравствуйте, {user_name}! Джарвис к вашим услугам.")
+        phrases.append(self.personal_assistant.get_date())
+        self.speech.prewarm(phrases)
+    
     def find_command_match(self, user_input):
         """Находит соответствующую команду для ввода пользователя"""
         user_input = user_input.lower()
         
-        # Проверяем категории команд
-        for category, commands in self.commands_config.items():
-            for cmd_trigger, cmd_action in commands.items():
-                if cmd_trigger in user_input:
-                    return category, cmd_action, user_input.replace(cmd_trigger, "").strip()
-        
-        # Проверяем веб-поиск через регулярные выражения
-        search_result = self.web_search.parse_search_intent(user_input)
-        if search_result:
-            return "web_search", "parse_intent", user_input
-            
-        # Проверяем запросы для персонального ассистента
-        personal_result = self.personal_assistant.parse_intent(user_input)
-        if personal_result:
-            return "personal", "response", personal_result
+        # Проверяем категории команд одним проходом автомата
+        match = self.router.match(user_input)
+        if match:
+            category, cmd_action, cmd_trigger = match
+            return category, cmd_action, user_input.replace(cmd_trigger, "").strip()
+        
+        # Классифицируем свободный запрос без выполнения действий
+        intent = classify_intent(user_input)
+        if intent:
+            return "intent", intent.type, intent
         
         # Если не найдено соответствий, используем ИИ
         return "ai", "process", user_input
     
-    def process_command(self, command):
-        """Обработка команды"""
+    def process_command(self, command, speak=None, parts=None):
+        """Обработка команды.
+        
+        speak — куда отдавать предложения потокового ответа ИИ (по умолчанию сразу в речь).
+        parts — уже найденный маршрут (route_parts), чтобы не искать его повторно.
+        """
         if not command:
             return "Не удалось распознать команду"
         
-        # Ищем соответствующую команду
-        category, action, params = self.find_command_match(command)
+        metrics.increment("turns")
+        
+        # Ищем соответствующую команду; составная фраза делится на части
+        if parts is None:
+            with metrics.span("routing"):
+                parts = self.route_parts(command)
+        
+        if len(parts) > 1:
+            return self.process_compound(parts, speak)
+        
+        text, (category, action, params) = parts[0]
+        logger.info("Категория: %s, Действие: %s, Параметры: %s", category, action, params)
         
-        logger.info(f"Категория: {category}, Действие: {action}, Параметры: {params}")
+        with metrics.span("handler", category=category, action=action):
+            return self.handle_command(text, category, action, params, speak)
+    
+    def route_parts(self, command):
+        """Делит фразу по союзам и маршрутизирует части: список (текст, (категория, действие, параметры)).
+        
+        Часть, которая сама по себе не команда, присоединяется к предыдущей
+        («найди рецепт борща и пельменей»). Если не команда уже первая
+        часть, фраза обрабатывается целиком.
+        """
+        if not self.config.get("compound", {}).get("enabled", True):
+            return [(command, self.find_command_match(command))]
         
-        # Выполняем действие в соответствии с категорией
+        clauses, separators = split_clauses(command)
+        parts = []
+        for clause, separator in zip(clauses, separators):
+            match = self.find_command_match(clause)
+            if match[0] != "ai":
+                parts.append((clause, match))
+            elif parts:
+                text = parts[-1][0] + separator + clause
+                parts[-1] = (text, self.find_command_match(text))
+            else:
+                return [(command, self.find_command_match(command))]
+        return parts
+    
+    def process_compound(self, parts, speak=None):
+        """Выполняет части составной команды и объединяет ответы в исходном порядке.
+        
+        Независимые действия (погода, запуск приложения, поиск) идут
+        параллельно, поэтому ответ ждет только самое долгое из них.
+        """
+        metrics.increment("compound_commands")
+        logger.info("Составная команда из %s частей: %s", len(parts), [text for text, _ in parts])
+        replies = [None] * len(parts)
+        
+        def run_lane(indices):
+            for index in indices:
+                text, (category, action, params) = parts[index]
+                try:
+                    with metrics.span("handler", category=category, action=action):
+                        replies[index] = self.handle_command(text, category, action, params, speak)
+                except Exception as e:
+                    logger.error("Ошибка при выполнении части «%s»: %s", text, e)
+                    replies[index] = f"Не удалось выполнить «{text}»: {e}"
+        
+        # Первая полоса выполняется в текущем потоке, остальные — в пуле
+        lanes = plan_lanes([match for _, match in parts])
+        futures = [
+            self.compound_pool.submit(contextvars.copy_context().run, run_lane, lane) for lane in lanes[1:]
+        ]
+        run_lane(lanes[0])
+        for future in futures:
+            future.result()
+        
+        # Уже произнесенные ответы (потоковый ИИ) не повторяем
+        reply = join_replies(reply for reply in replies if not isinstance(reply, SpokenResponse))
+        return reply or SpokenResponse(join_replies(replies))
+    
+    def handle_command(self, command, category, action, params, speak=None):
+        """Выполняет действие в соответствии с категорией"""
         if category == "system_commands":
             method = getattr(self.system_commands, action)
             if action == "take_screenshot":
-                return method(os.path.join(DATA_PATH, "media"))
+                return self.run_action(method, params, speak=speak)
             else:
-                return method()
+                return self.run_action(method, speak=speak)
         
         elif category == "app_commands":
             if action == "open_application":
-                return self.app_manager.open_application(params)
+                return self.run_action(self.app_manager.open_application, params, speak=speak)
+            elif action == "close_application":
+                return self.run_action(self.app_manager.close_application, params, speak=speak)
         
         elif category == "search_commands":
             if action == "search":
@@ -167,33 +454,134 @@ class Jarvis:
             elif action == "search_video":
                 return self.web_search.search_video(params)
         
+        elif category == "personal_commands":
+            # Повторно разбираем запрос, чтобы извлечь параметры (например, город)
+            intent = classify_intent(command, handler="personal")
+            if not intent or intent.type != action:
+                intent = Intent(action, "personal")
+            return self.execute_intent(intent)
+        
         elif category == "exit_commands":
             self.running = False
             return "До свидания!"
         
-        elif category == "web_search" and action == "parse_intent":
-            # Это означает, что parse_search_intent нашел совпадение
-            return self.web_search.parse_search_intent(params)
-            
-        elif category == "personal" and action == "response":
-            # Это значит, что у нас уже есть готовый ответ от парсера личного ассистента
-            return params
+        elif category == "intent":
+            response = self.execute_intent(params)
+            if response is not None:
+                return response
         
-        # Для неизвестных команд используем ИИ
+        # Для неизвестных команд используем ИИ; в потоковом режиме ответ
+        # произносится по предложениям, не дожидаясь конца генерации
+        if self.ai.stream:
+            return self.ai.process_stream(command, speak or self.speech.speak)
         return self.ai.process(command)
     
+    def run_action(self, action, *args, speak=None):
+        """Выполняет действие в фоне с таймаутом; о долгих действиях сообщает голосом"""
+        speak = speak or self.speech.speak
+        try:
+            return self.executor.run(action, *args, on_slow=lambda: speak("Работаю над этим..."))
+        except ActionTimeout as timeout:
+            # Результат сообщим, когда действие все-таки завершится
+            timeout.future.add_done_callback(lambda future: self.report_late_result(future, speak))
+            return "Действие выполняется дольше обычного. Я сообщу, когда оно завершится."
+    
+    def report_late_result(self, future, speak):
+        """Озвучивает результат действия, завершившегося после таймаута"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error("Ошибка фонового действия: %s", error)
+            speak(f"Фоновое действие завершилось с ошибкой: {error}")
+        else:
+            speak(future.result())
+    
+    def execute_intent(self, intent):
+        """Выполняет классифицированное намерение в соответствующем модуле"""
+        if intent.handler == "web_search":
+            return self.web_search.execute_intent(intent)
+        elif intent.handler == "personal":
+            return self.personal_assistant.execute_intent(intent)
+        
+        logger.warning("Неизвестный обработчик намерения: %s", intent)
+        return None
+    
     def main_loop(self):
         """Основной цикл работы"""
+        if self.config.get("system", {}).get("pipeline", True):
+            # Захват, обработка и речь работают параллельно
+            import asyncio
+            from core.pipeline import VoicePipeline
+            asyncio.run(VoicePipeline(self, self.config.get("pipeline", {})).run())
+        else:
+            self.serial_loop()
+        
+        # Закрываем только созданные компоненты
+        self.registry.close()
+        logger.info("Завершение работы Джарвиса")
+    
+    def serial_loop(self):
+        """Последовательный цикл: слушаем, обрабатываем, отвечаем"""
         while self.running:
             command = self.speech.listen()
             if command:
-                logger.info(f"Получена команда: {command}")
-                response = self.process_command(command)
-                logger.info(f"Ответ: {response}")
-                self.speech.speak(response)
-        
-        logger.info("Завершение работы Джарвиса")
+                logger.info("Получена команда: %s", command)
+                # Без конвейера нет фильтра эха: пока ход обрабатывается и озвучивается,
+                # захват не выделяет фраз, чтобы собственная речь не стала командой
+                with self.speech.muted():
+                    response = self.profiler.run(self.process_command, command)
+                    logger.info("Ответ: %s", response)
+                    if not isinstance(response, SpokenResponse):
+                        self.speech.speak(response)
+
+def run_headless(args):
+    """Режим без микрофона и речи: реплики из файла или stdin, результаты в JSONL"""
+    import tempfile
+    from core.headless import NullSpeech, RecordingAI, run_headless as run
+    
+    overrides = {"speech": NullSpeech}
+    if args.dry_run:
+        overrides["ai"] = RecordingAI
+    jarvis = Jarvis(overrides)
+    media = None
+    if args.dry_run:
+        # Модуль системных команд еще не создан: снимки будут из искусственных кадров
+        # и лягут во временную папку, а очистка не тронет настоящие снимки
+        media = tempfile.TemporaryDirectory(prefix="jarvis-dry-run-")
+        jarvis.config["screenshots"] = dict(
+            jarvis.config.get("screenshots", {}),
+            source="synthetic", save_dir=media.name, retention={"max_mb": 0, "max_age_days": 0},
+        )
+    
+    source = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        summary = run(jarvis, source, output, args.workers, args.dry_run)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        jarvis.registry.close()
+        if media is not None:
+            media.cleanup()
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+
+def parse_args():
+    import argparse
+    parser = argparse.ArgumentParser(description="Джарвис — голосовой ассистент")
+    parser.add_argument("--headless", action="store_true", help="обрабатывать текстовые реплики без микрофона и речи")
+    parser.add_argument("--input", default="-", help="файл с репликами (текст или JSONL с полями id, text); - для stdin")
+    parser.add_argument("--output", default="-", help="файл для результатов JSONL; - для stdout")
+    parser.add_argument("--workers", type=int, default=4, help="число параллельных обработчиков")
+    parser.add_argument("--dry-run", action="store_true", help="записывать действия и запросы к ИИ вместо выполнения")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    jarvis = Jarvis()
-    jarvis.start()
\ No newline at end of file
+    args = parse_args()
+    if args.headless:
+        run_headless(args)
+    else:
+        jarvis = Jarvis()
+        jarvis.start()
\ No newline at end of file
@@ -0,0 +1,298 @@
+import os
+import re
+import sys
+import json
+import time
+import shlex
+import logging
+import bisect
+import threading
+from collections import Counter
+from core.persistence import atomic_write_json
+
+logger = logging.getLogger("jarvis.app_index")
+
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+
+# Упрощение латиницы, чтобы «визуал студио код» и «Visual Studio Code» дали один ключ
+PHONETIC_RULES = [
+    (re.compile(r'ph'), 'f'), (re.compile(r'ch'), 'h'), (re.compile(r'ck'), 'k'),
+    (re.compile(r'c(?=[eiy])'), 's'), (re.compile(r'[cq]'), 'k'), (re.compile(r'x'), 'ks'),
+    (re.compile(r'w'), 'v'), (re.compile(r'z'), 's'), (re.compile(r'ee|ea'), 'i'),
+    (re.compile(r'oo'), 'u'), (re.compile(r'y'), 'i'), (re.compile(r'(\w)\1+'), r'\1'),
+    (re.compile(r'(\w{3,})e\b'), r'\1'),
+]
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Порядок предпочтения при равной похожести: ярлыки с человеческими названиями выше исполняемых файлов
+KIND_PRIORITY = {"desktop": 0, "shortcut": 0, "exe": 1}
+
+def name_key(name):
+    """Нормализованный ключ названия: транслитерация, упрощение написания, без пробелов"""
+    text = name.lower().translate(TRANSLIT_TABLE)
+    text = NON_WORD.sub(" ", text)
+    for pattern, replacement in PHONETIC_RULES:
+        text = pattern.sub(replacement, text)
+    return text.replace(" ", "")
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def default_directories():
+    """Папки с ярлыками приложений для текущей системы"""
+    if sys.platform == "win32":
+        return [
+            os.path.expandvars(r"%ProgramData%\Microsoft\Windows\Start Menu\Programs"),
+            os.path.expandvars(r"%AppData%\Microsoft\Windows\Start Menu\Programs"),
+        ]
+    return ["/usr/share/applications", os.path.expanduser("~/.local/share/applications")]
+
+def executable_extensions():
+    if sys.platform == "win32":
+        return {ext.lower() for ext in os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").split(";") if ext}
+    return None
+
+def read_desktop_entry(path):
+    """Возвращает (названия, команда) из .desktop-файла или None"""
+    names, command, in_entry = [], None, False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_entry = line == "[Desktop Entry]"
+                elif in_entry and "=" in line:
+                    field, value = line.split("=", 1)
+                    if field == "NoDisplay" and value == "true":
+                        return None
+                    if field in ("Name", "Name[ru]", "GenericName[ru]"):
+                        names.append(value)
+                    elif field == "Exec":
+                        # Убираем коды полей %U, %f и т.п.
+                        command = re.sub(r'\s*%[a-zA-Z]', '', value).strip()
+    except OSError:
+        return None
+    return (names, command) if names and command else None
+
+def scan_directory(path, shortcuts):
+    """Сканирует одну папку: (приложения, подпапки).
+
+    Приложение — [название, путь или команда, вид, дополнительные названия].
+    В папках PATH ищутся исполняемые файлы, в папках ярлыков — .desktop/.lnk/.url.
+    """
+    apps, subdirs = [], []
+    extensions = executable_extensions()
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return apps, subdirs
+
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                if shortcuts:
+                    subdirs.append(entry.path)
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            ext = ext.lower()
+            if shortcuts:
+                if ext == ".desktop":
+                    desktop = read_desktop_entry(entry.path)
+                    if desktop:
+                        names, command = desktop
+                        apps.append([names[0], command, "desktop", names[1:] + [stem]])
+                elif ext in (".lnk", ".url"):
+                    apps.append([stem, entry.path, "shortcut", []])
+            elif extensions is None:
+                if os.access(entry.path, os.X_OK):
+                    apps.append([entry.name, entry.path, "exe", []])
+            elif ext in extensions:
+                apps.append([stem, entry.path, "exe", []])
+        except OSError:
+            continue
+    return apps, subdirs
+
+class AppIndex:
+    def __init__(self, index_file, config=None):
+        """Индекс установленных приложений для поиска по произнесенному названию.
+
+        Сканирует PATH и папки ярлыков, сохраняет результат на диск и при
+        обновлении пересканирует только папки с изменившимся mtime. Поиск
+        идет по точному ключу, затем по триграммам ключей ярлыков. Исполняемые
+        файлы из PATH в нечеткий поиск не попадают — там тысячи коротких
+        служебных имен, — для них нужен точный ключ или префикс, покрывающий
+        не меньше exe_prefix_score имени.
+        """
+        config = config or {}
+        self.index_file = index_file
+        self.directories = [os.path.expandvars(d) for d in config.get("directories", default_directories())]
+        self.scan_path = config.get("scan_path", True)
+        self.max_depth = config.get("max_depth", 4)
+        self.min_score = config.get("min_score", 0.6)
+        self.exe_prefix_score = config.get("exe_prefix_score", 0.8)
+        self.refresh_interval = config.get("refresh_interval", 60)
+        self.aliases = {name_key(alias): target for alias, target in config.get("aliases", {}).items()}
+
+        # Состояние сканирования: папка -> {"mtime", "apps", "subdirs"}
+        self.dirs = {}
+        self.apps = []
+        self.keys = []
+        self.exact = {}
+        self.postings = {}
+        self.exe_keys = []
+        self.lock = threading.Lock()
+        self.last_refresh = 0.0
+        self.refresh_thread = None
+
+    def load(self):
+        """Загружает сохраненный индекс без обращения к файловой системе"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.dirs = json.load(f).get("dirs", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.dirs = {}
+        self.rebuild()
+
+    def roots(self):
+        """Корневые папки: (путь, это папка ярлыков)"""
+        roots = [(d, True) for d in self.directories]
+        if self.scan_path:
+            roots += [(d, False) for d in os.environ.get("PATH", "").split(os.pathsep) if d]
+        return roots
+
+    def refresh(self):
+        """Пересканирует изменившиеся папки; возвращает число пересканированных"""
+        dirs, rescanned = {}, 0
+        stack = [(path, shortcuts, 0) for path, shortcuts in reversed(self.roots())]
+        while stack:
+            path, shortcuts, depth = stack.pop()
+            if path in dirs:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+
+            state = self.dirs.get(path)
+            if state is None or state["mtime"] != mtime:
+                apps, subdirs = scan_directory(path, shortcuts)
+                state = {"mtime": mtime, "apps": apps, "subdirs": subdirs}
+                rescanned += 1
+            dirs[path] = state
+
+            if depth < self.max_depth:
+                stack.extend((subdir, shortcuts, depth + 1) for subdir in reversed(state["subdirs"]))
+
+        self.last_refresh = time.monotonic()
+        if rescanned or dirs.keys() != self.dirs.keys():
+            self.dirs = dirs
+            self.rebuild()
+            os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+            atomic_write_json(self.index_file, {"version": 1, "dirs": dirs}, indent=None)
+            logger.info("Индекс приложений обновлен: %s приложений, пересканировано папок: %s", len(self.apps), rescanned)
+        return rescanned
+
+    def refresh_in_background(self):
+        """Запускает обновление в фоне, если оно давно не выполнялось"""
+        if time.monotonic() - self.last_refresh < self.refresh_interval:
+            return
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return
+        self.last_refresh = time.monotonic()
+        self.refresh_thread = threading.Thread(target=self.refresh, name="jarvis-app-index", daemon=True)
+        self.refresh_thread.start()
+
+    def rebuild(self):
+        """Строит таблицу точных ключей и триграммный индекс из состояния папок"""
+        apps, keys, exact, postings, exe_keys = [], [], {}, {}, []
+        seen = set()
+        for state in self.dirs.values():
+            for name, target, kind, extra_names in state["apps"]:
+                # Одноименные файлы из разных папок PATH: побеждает первый, как в оболочке
+                if kind == "exe" and name in seen:
+                    continue
+                seen.add(name)
+                app_id = len(apps)
+                apps.append({"name": name, "target": target, "kind": kind})
+                for spoken in [name] + extra_names:
+                    key = name_key(os.path.splitext(spoken)[0] if kind == "exe" else spoken)
+                    if not key:
+                        continue
+                    exact.setdefault(key, []).append(app_id)
+                    if kind == "exe":
+                        exe_keys.append((key, app_id))
+                        continue
+                    grams = trigrams(key)
+                    key_id = len(keys)
+                    keys.append((app_id, len(grams)))
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(key_id)
+
+        exe_keys.sort()
+        with self.lock:
+            self.apps, self.keys, self.exact, self.postings = apps, keys, exact, postings
+            self.exe_keys = exe_keys
+
+    def preference(self, app_id):
+        app = self.apps[app_id]
+        return KIND_PRIORITY[app["kind"]], len(app["name"])
+
+    def lookup(self, spoken_name):
+        """Находит приложение по названию; возвращает (приложение, похожесть) или None"""
+        key = name_key(self.aliases.get(name_key(spoken_name), spoken_name))
+        if not key:
+            return None
+
+        with self.lock:
+            app_ids = self.exact.get(key)
+            if app_ids:
+                return self.apps[min(app_ids, key=self.preference)], 1.0
+
+            best, best_rank = None, None
+            # Исполняемые файлы: название — начало имени файла («libreoffice» для libreoffice7.5)
+            start = bisect.bisect_left(self.exe_keys, (key,))
+            for index in range(start, len(self.exe_keys)):
+                exe_key, app_id = self.exe_keys[index]
+                if not exe_key.startswith(key):
+                    break
+                score = len(key) / len(exe_key)
+                if score < self.exe_prefix_score:
+                    continue
+                rank = (-score,) + self.preference(app_id)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = app_id, rank
+
+            # Ярлыки: коэффициент Дайса по триграммам ключей
+            query = trigrams(key)
+            overlap = Counter()
+            for gram in query:
+                overlap.update(self.postings.get(gram, ()))
+
+            for key_id, shared in overlap.items():
+                app_id, gram_count = self.keys[key_id]
+                score = 2.0 * shared / (len(query) + gram_count)
+                rank = (-score,) + self.preference(app_id)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = app_id, rank
+
+        if best is None or -best_rank[0] < self.min_score:
+            return None
+        return self.apps[best], -best_rank[0]
+
+def launch(app):
+    """Запускает найденное приложение"""
+    import subprocess
+
+    if app["kind"] == "shortcut":
+        os.startfile(app["target"])
+    elif app["kind"] == "desktop":
+        subprocess.Popen(shlex.split(app["target"]))
+    else:
+        subprocess.Popen([app["target"]])
@@ -2,12 +2,19 @@ import subprocess
 import os
 import webbrowser
 import logging
+from modules.app_index import AppIndex, launch
 
 logger = logging.getLogger("jarvis.apps")
 
 class ApplicationManager:
-    def __init__(self):
-        """Инициализация менеджера приложений"""
+    def __init__(self, command_timeout=10, index_file=None, config=None):
+        """Инициализация менеджера приложений.
+        
+        index_file — где хранить индекс установленных приложений (без него
+        доступны только известные приложения из словаря).
+        """
+        self.command_timeout = command_timeout
+        
         # Словарь приложений и их команд запуска
         self.app_commands = {
             "chrome": "chrome",
@@ -38,13 +45,21 @@ class ApplicationManager:
             "карты": "https://maps.google.com"
         }
         
+        # Индекс приложений из PATH и меню «Пуск»: загружаем сохраненный
+        # и обновляем изменившиеся папки в фоне
+        self.index = None
+        if index_file:
+            self.index = AppIndex(index_file, config)
+            self.index.load()
+            self.index.refresh_in_background()
+        
         logger.info("Менеджер приложений инициализирован")
     
     def open_application(self, app_name):
         """Открывает приложение по имени"""
         app_name = app_name.lower()
         
-        logger.info(f"Попытка открыть приложение: {app_name}")
+        logger.info("Попытка открыть приложение: %s", app_name)
         
         # Проверяем, есть ли приложение в словаре
         if app_name in self.app_commands:
@@ -52,7 +67,7 @@ class ApplicationManager:
                 subprocess.Popen(self.app_commands[app_name])
                 return f"Открываю {app_name}"
             except Exception as e:
-                logger.error(f"Ошибка при открытии {app_name}: {e}")
+                logger.error("Ошибка при открытии %s: %s", app_name, e)
                 return f"Не удалось открыть {app_name}: {e}"
         
         # Проверяем, есть ли это веб-сайт
@@ -61,21 +76,42 @@ class ApplicationManager:
                 webbrowser.open(self.urls[app_name])
                 return f"Открываю {app_name}"
             except Exception as e:
-                logger.error(f"Ошибка при открытии {app_name}: {e}")
+                logger.error("Ошибка при открытии %s: %s", app_name, e)
                 return f"Не удалось открыть {app_name}: {e}"
         
+        # Ищем среди установленных приложений, в том числе по неточному названию
+        elif self.index is not None and self.open_indexed(app_name):
+            return f"Открываю {app_name}"
+        
         # Проверяем, может это путь к файлу
         elif os.path.exists(app_name):
             try:
                 os.startfile(app_name)
                 return f"Открываю {app_name}"
             except Exception as e:
-                logger.error(f"Ошибка при открытии {app_name}: {e}")
+                logger.error("Ошибка при открытии %s: %s", app_name, e)
                 return f"Не удалось открыть {app_name}: {e}"
         
         # Если ничего не подошло
         return f"Не знаю, как открыть {app_name}"
     
+    def open_indexed(self, app_name):
+        """Запускает приложение, найденное в индексе; возвращает False, если не нашлось"""
+        found = self.index.lookup(app_name)
+        if found is None:
+            # Возможно, приложение установлено недавно: обновим индекс для следующих команд
+            self.index.refresh_in_background()
+            return False
+        
+        app, score = found
+        logger.info("Приложение «%s» найдено в индексе: %s (похожесть %.2f)", app_name, app['name'], score)
+        try:
+            launch(app)
+            return True
+        except Exception as e:
+            logger.error("Ошибка при открытии %s: %s", app['name'], e)
+            return False
+    
     def close_application(self, app_name):
         """Закрывает приложение по имени"""
         app_name = app_name.lower()
@@ -92,10 +128,10 @@ class ApplicationManager:
         
         if app_name in app_processes:
             try:
-                subprocess.run(["taskkill", "/f", "/im", app_processes[app_name]])
+                subprocess.run(["taskkill", "/f", "/im", app_processes[app_name]], timeout=self.command_timeout)
                 return f"Закрываю {app_name}"
             except Exception as e:
-                logger.error(f"Ошибка при закрытии {app_name}: {e}")
+                logger.error("Ошибка при закрытии %s: %s", app_name, e)
                 return f"Не удалось закрыть {app_name}: {e}"
         
         return f"Не знаю, как закрыть {app_name}"
\ No newline at end of file
@@ -1,9 +1,9 @@
 import datetime
-import requests
 import logging
-import re
 import json
 import os
+from core.intents import classify_intent
+from modules.weather import WeatherService
 
 logger = logging.getLogger("jarvis.personal")
 
@@ -12,6 +12,7 @@ class PersonalAssistant:
         """Инициализация модуля персонального ассистента"""
         self.config_path = config_path
         self.weather_api_key = ""  # Ключ OpenWeatherMap API (требует регистрации)
+        weather_config = {}
         
         # Если указан путь к конфигу, пытаемся загрузить ключ API
         if config_path and os.path.exists(config_path):
@@ -20,8 +21,14 @@ class PersonalAssistant:
                     config = json.load(f)
                     if "weather_api_key" in config:
                         self.weather_api_key = config["weather_api_key"]
+                    weather_config = config.get("weather", {})
             except Exception as e:
-                logger.error(f"Ошибка загрузки конфигурации: {e}")
+                logger.error("Ошибка загрузки конфигурации: %s", e)
+        
+        # Погода: общий пул соединений, кэш по городам и фоновое обновление города по умолчанию
+        self.weather = WeatherService(self.weather_api_key, weather_config)
+        if self.weather_api_key:
+            self.weather.start_prefetch()
         
         logger.info("Модуль персонального ассистента инициализирован")
     
@@ -58,55 +65,51 @@ class PersonalAssistant:
         
         return f"Сейчас {format_hours(now.hour)} {format_minutes(now.minute)}"
     
-    def get_weather(self, city="Москва"):
-        """Получает информацию о погоде через API"""
+    def get_weather(self, city=None):
+        """Получает информацию о погоде (повторные вопросы отвечаются из кэша)"""
         if not self.weather_api_key:
             return "Для получения информации о погоде необходимо настроить API ключ OpenWeatherMap"
         
         try:
-            # Запрос к API
-            url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={self.weather_api_key}&units=metric&lang=ru"
-            response = requests.get(url)
-            data = response.json()
+            city, data = self.weather.get(city)
             
-            if response.status_code == 200:
-                # Обрабатываем данные
-                temp = data["main"]["temp"]
-                feels_like = data["main"]["feels_like"]
-                description = data["weather"][0]["description"]
-                humidity = data["main"]["humidity"]
-                
-                return (f"Погода в городе {city}: {description}, "
-                       f"температура {temp:.1f}°C, ощущается как {feels_like:.1f}°C, "
-                       f"влажность {humidity}%")
-            else:
-                return f"Не удалось получить информацию о погоде: {data.get('message', 'неизвестная ошибка')}"
+            # Обрабатываем данные
+            temp = data["main"]["temp"]
+            feels_like = data["main"]["feels_like"]
+            description = data["weather"][0]["description"]
+            humidity = data["main"]["humidity"]
+            
+            return (f"Погода в городе {city}: {description}, "
+                   f"температура {temp:.1f}°C, ощущается как {feels_like:.1f}°C, "
+                   f"влажность {humidity}%")
         
+        except RuntimeError as e:
+            return f"Не удалось получить информацию о погоде: {e}"
         except Exception as e:
-            logger.error(f"Ошибка получения погоды: {e}")
+            logger.error("Ошибка получения погоды: %s", e)
             return f"Произошла ошибка при получении данных о погоде: {e}"
     
-    def parse_intent(self, query):
-        """Анализирует запрос пользователя и определяет, что он хочет узнать"""
-        query = query.lower()
-        
-        # Запросы о дате
-        if re.search(r'какое сегодня число|какая сегодня дата|дата сегодня|число сегодня', query):
+    def execute_intent(self, intent):
+        """Выполняет запрос по заранее классифицированному намерению"""
+        if intent.type == "get_date":
             return self.get_date()
-        
-        # Запросы о времени
-        elif re.search(r'который час|сколько времени|время сейчас|текущее время', query):
+        elif intent.type == "get_time":
             return self.get_time()
+        elif intent.type == "get_weather":
+            # Без города — погода в городе по умолчанию
+            return self.get_weather(intent.slots.get("city"))
         
-        # Запросы о погоде
-        elif re.search(r'погода|прогноз погоды', query):
-            # Пробуем найти город в запросе
-            city_match = re.search(r'погода в (\w+)', query) or re.search(r'погода (\w+)', query)
-            if city_match:
-                city = city_match.group(1)
-                return self.get_weather(city)
-            else:
-                return self.get_weather()  # Погода по умолчанию
+        return None
+    
+    def parse_intent(self, query):
+        """Анализирует запрос пользователя, определяет, что он хочет узнать, и отвечает"""
+        intent = classify_intent(query, handler="personal")
+        if intent:
+            return self.execute_intent(intent)
         
         # Если не нашли совпадений
-        return None
\ No newline at end of file
+        return None
+    
+    def close(self):
+        """Останавливает фоновое обновление погоды"""
+        self.weather.close()
@@ -0,0 +1,365 @@
+import os
+import re
+import time
+import zlib
+import struct
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("jarvis.screen")
+
+# Кадр — несжатые пиксели RGB построчно; легко передается в другой процесс
+Frame = namedtuple("Frame", ["size", "data"])
+
+# Прямоугольник экрана: left, top, width, height
+Region = namedtuple("Region", ["left", "top", "width", "height"])
+
+FORMATS = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP"}
+
+# Файлы, которые создает ScreenTools; очистка папки не трогает остальные
+SCREENSHOT_PATTERN = re.compile(r"^screenshot_\d+\.(?:png|jpe?g|webp)$")
+
+ORDINALS = {"перв": 1, "втор": 2, "трет": 3, "четв": 4}
+
+def parse_monitor(text):
+    """Номер монитора из запроса («второго монитора», «монитор 2») или None"""
+    match = re.search(r"(\d+|перв|втор|трет|четв)\w*\s+монитор|монитор\w*\s+(\d+)", text or "")
+    if not match:
+        return None
+    value = match.group(1) or match.group(2)
+    return int(value) if value.isdigit() else ORDINALS[value]
+
+def crop(frame, region):
+    """Вырезает область кадра (координаты относительно кадра)"""
+    width, height = frame.size
+    left, top = max(0, region.left), max(0, region.top)
+    right, bottom = min(width, region.left + region.width), min(height, region.top + region.height)
+    if right <= left or bottom <= top:
+        raise ValueError(f"Область {tuple(region)} за пределами кадра {width}x{height}")
+    rows = [frame.data[(y * width + left) * 3:(y * width + right) * 3] for y in range(top, bottom)]
+    return Frame((right - left, bottom - top), b"".join(rows))
+
+class ScreenSource:
+    """Снимки настоящего экрана: mss, если установлен, иначе pyautogui"""
+    name = "screen"
+
+    def __init__(self, config=None):
+        try:
+            import mss
+            self.mss = mss
+        except ImportError:
+            self.mss = None
+
+    def monitors(self):
+        """Области мониторов; без mss известен только основной"""
+        if self.mss is not None:
+            with self.mss.mss() as screen:
+                return [Region(m["left"], m["top"], m["width"], m["height"]) for m in screen.monitors[1:]]
+        import pyautogui
+        width, height = pyautogui.size()
+        return [Region(0, 0, width, height)]
+
+    def grab(self, region=None):
+        """Снимок области (в координатах рабочего стола) или всего экрана"""
+        if self.mss is not None:
+            with self.mss.mss() as screen:
+                area = screen.monitors[0] if region is None else {
+                    "left": region.left, "top": region.top, "width": region.width, "height": region.height
+                }
+                shot = screen.grab(area)
+                return Frame(shot.size, shot.rgb)
+        import pyautogui
+        image = pyautogui.screenshot(region=tuple(region) if region is not None else None).convert("RGB")
+        return Frame(image.size, image.tobytes())
+
+class SyntheticSource:
+    """Искусственные кадры для проверок без экрана.
+
+    Рисует градиент; при synthetic_changing каждый следующий кадр
+    отличается (по нему сдвигается полоса), иначе кадры одинаковые.
+    """
+    name = "synthetic"
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.width, self.height = config.get("synthetic_size", (320, 200))
+        self.monitor_count = config.get("synthetic_monitors", 2)
+        self.changing = config.get("synthetic_changing", False)
+        self.frames = 0
+
+    def monitors(self):
+        return [Region(i * self.width, 0, self.width, self.height) for i in range(self.monitor_count)]
+
+    def render(self):
+        width, height = self.width * self.monitor_count, self.height
+        reds = bytes(x * 255 // width for x in range(width))
+        # Белая полоса в четверть ширины, сдвигается с каждым кадром
+        band = width // 4
+        start = (self.frames % 4) * band if self.changing else None
+        rows = []
+        for y in range(height):
+            row = bytearray(width * 3)
+            row[0::3] = reds
+            row[1::3] = bytes((y * 255 // height,)) * width
+            row[2::3] = b"\x80" * width
+            if start is not None:
+                row[start * 3:(start + band) * 3] = b"\xff" * (band * 3)
+            rows.append(row)
+        return Frame((width, height), bytes(b"".join(rows)))
+
+    def grab(self, region=None):
+        frame = self.render()
+        self.frames += 1
+        return frame if region is None else crop(frame, region)
+
+SOURCES = {
+    "screen": ScreenSource,
+    "synthetic": SyntheticSource,
+}
+
+def create_source(name, config):
+    """Создает источник снимков по имени из настроек screenshots.source"""
+    source_class = SOURCES.get(name)
+    if source_class is None:
+        raise ValueError(f"Неизвестный источник снимков экрана: {name}")
+    return source_class(config)
+
+def perceptual_hash(frame, size=8):
+    """Разностный хэш (dHash) на size*size бит.
+
+    Кадр уменьшается до сетки (size + 1) x size по яркости — каждая ячейка
+    усредняется по 16 точкам, — затем сравниваются соседние ячейки в строке.
+    Мелкие изменения (мигающий курсор, строка текста) хэш почти не меняют,
+    поэтому он лишь отсеивает явно разные кадры, а повтор подтверждается
+    точным дайджестом пикселей.
+    """
+    width, height = frame.size
+    data = frame.data
+    columns = size + 1
+    bits = 0
+    for row in range(size):
+        cells = []
+        for column in range(columns):
+            total = 0
+            for sy in range(4):
+                y = ((row * 4 + sy) * 2 + 1) * height // (size * 8)
+                for sx in range(4):
+                    x = ((column * 4 + sx) * 2 + 1) * width // (columns * 8)
+                    offset = (y * width + x) * 3
+                    total += data[offset] * 299 + data[offset + 1] * 587 + data[offset + 2] * 114
+            cells.append(total)
+        for left, right in zip(cells, cells[1:]):
+            bits = (bits << 1) | (left > right)
+    return bits
+
+def encode_png(frame, compression):
+    """PNG средствами стандартной библиотеки (если Pillow не установлен)"""
+    width, height = frame.size
+    stride = width * 3
+    # Фильтр 0 для каждой строки: байт типа фильтра и пиксели как есть
+    raw = b"".join(b"\0" + frame.data[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, compression))
+            + chunk(b"IEND", b""))
+
+def encode_image(frame, path, image_format="png", compression=6, quality=85):
+    """Кодирует кадр и атомарно сохраняет файл (выполняется в пуле процессов).
+
+    compression — уровень сжатия PNG (0–9), quality — качество JPEG и WEBP.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        from PIL import Image
+    except ImportError:
+        if image_format != "png":
+            raise RuntimeError(f"Для формата {image_format} установите Pillow")
+        with open(tmp_path, 'wb') as f:
+            f.write(encode_png(frame, compression))
+    else:
+        image = Image.frombytes("RGB", frame.size, frame.data)
+        if image_format == "png":
+            image.save(tmp_path, "PNG", compress_level=compression)
+        else:
+            image.save(tmp_path, FORMATS[image_format], quality=quality)
+    os.replace(tmp_path, path)
+    return path
+
+def apply_retention(directory, max_bytes=None, max_age=None, now=None):
+    """Удаляет из папки снимки старше max_age секунд, затем самые старые, пока размер больше max_bytes.
+
+    Учитываются только файлы снимков (screenshot_*.png и т. п.), остальные
+    файлы папки не удаляются и в размер не входят. Возвращает число удаленных файлов.
+    """
+    now = now or time.time()
+    files = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        # Недописанные файлы (.tmp) принадлежат кодировщику
+        if entry.is_file() and SCREENSHOT_PATTERN.match(entry.name):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+
+    removed = 0
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        too_old = max_age is not None and now - mtime > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if not too_old and not too_big:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except OSError as e:
+            logger.error("Не удалось удалить %s: %s", path, e)
+    if removed:
+        logger.info("Очистка %s: удалено файлов: %s", directory, removed)
+    return removed
+
+class ScreenTools:
+    def __init__(self, save_dir, executor=None, config=None):
+        """Снимки экрана с кодированием в фоне, пропуском повторов и очисткой папки.
+
+        executor — ActionExecutor: кодирование идет в его пуле процессов;
+        без него — в собственном фоновом потоке.
+        """
+        config = config or {}
+        self.save_dir = save_dir
+        self.executor = executor
+        self.source = create_source(config.get("source", "screen"), config)
+
+        self.format = config.get("format", "png").lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"Неизвестный формат снимков: {self.format}")
+        self.compression = config.get("compression", 6)
+        self.quality = config.get("quality", 85)
+
+        # Снимок, совпадающий с предыдущим, не сохраняется заново;
+        # dedup_distance — допуск хэша при отборе кандидатов в повторы
+        self.dedup = config.get("dedup", True)
+        self.dedup_distance = config.get("dedup_distance", 2)
+        self.last_hash = None
+        self.last_digest = None
+        self.last_path = None
+        self.last_area = None
+
+        retention = config.get("retention", {})
+        self.max_bytes = retention.get("max_mb", 500) * 1024 * 1024 if retention.get("max_mb", 500) else None
+        self.max_age = retention.get("max_age_days", 30) * 86400 if retention.get("max_age_days", 30) else None
+
+        self.lock = threading.Lock()
+        self.encoder = None
+        # Снимки, которые еще кодируются: путь -> Future
+        self.pending = {}
+        os.makedirs(save_dir, exist_ok=True)
+
+        # Папка могла вырасти с прошлого запуска
+        if self.max_bytes is not None or self.max_age is not None:
+            threading.Thread(target=self.apply_retention, name="jarvis-media-retention", daemon=True).start()
+
+    def monitors(self):
+        return self.source.monitors()
+
+    def grab(self, region=None, monitor=None):
+        """Снимок области, монитора (нумерация с 1) или всего экрана"""
+        if monitor is not None:
+            monitors = self.source.monitors()
+            if not 1 <= monitor <= len(monitors):
+                raise ValueError(f"Монитора {monitor} нет, доступно мониторов: {len(monitors)}")
+            screen = monitors[monitor - 1]
+            if region is None:
+                region = screen
+            else:
+                region = Region(screen.left + region.left, screen.top + region.top, region.width, region.height)
+        return self.source.grab(region)
+
+    def capture(self, region=None, monitor=None):
+        """Делает снимок и запускает его кодирование в фоне.
+
+        Возвращает путь к файлу и Future кодирования; для повтора
+        предыдущего снимка той же области — путь к уже сохраненному файлу и None.
+        """
+        frame = self.grab(region, monitor)
+
+        if self.dedup:
+            frame_hash = perceptual_hash(frame)
+            # Хэш не замечает изменений размером со строку текста: повтор подтверждает дайджест
+            digest = hashlib.blake2b(frame.data, digest_size=16).digest()
+            with self.lock:
+                # Предыдущий снимок еще кодируется или уже лежит на диске (его могла удалить очистка)
+                duplicate = (
+                    self.last_hash is not None and self.last_path is not None and self.last_area == (region, monitor)
+                    and bin(frame_hash ^ self.last_hash).count("1") <= self.dedup_distance
+                    and digest == self.last_digest
+                    and (self.last_path in self.pending or os.path.exists(self.last_path))
+                )
+                if duplicate:
+                    logger.info("Экран не изменился, снимок не сохраняется повторно")
+                    return self.last_path, None
+                self.last_hash = frame_hash
+                self.last_digest = digest
+                self.last_area = (region, monitor)
+
+        # Миллисекунды в имени: два снимка подряд не перезапишут друг друга
+        extension = "jpg" if self.format == "jpeg" else self.format
+        path = os.path.join(self.save_dir, f"screenshot_{int(time.time() * 1000)}.{extension}")
+        future = self.submit(encode_image, frame, path, self.format, self.compression, self.quality)
+        with self.lock:
+            self.last_path = path
+            self.pending[path] = future
+        future.add_done_callback(lambda future: self.on_encoded(future, path))
+        return path, future
+
+    def submit(self, fn, *args):
+        if self.executor is not None:
+            return self.executor.submit(fn, *args, cpu_bound=True)
+        with self.lock:
+            if self.encoder is None:
+                self.encoder = ThreadPoolExecutor(1, thread_name_prefix="jarvis-screen-encoder")
+        return self.encoder.submit(fn, *args)
+
+    def on_encoded(self, future, path):
+        """После сохранения снимка проверяет ограничения папки"""
+        with self.lock:
+            self.pending.pop(path, None)
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            logger.error("Снимок %s не сохранен: %s", path, error or "кодирование отменено")
+            with self.lock:
+                if self.last_path == path:
+                    self.last_hash = self.last_path = None
+            return
+        self.apply_retention()
+
+    def apply_retention(self):
+        if self.max_bytes is None and self.max_age is None:
+            return 0
+        try:
+            return apply_retention(self.save_dir, self.max_bytes, self.max_age)
+        except Exception as e:
+            logger.error("Ошибка очистки папки снимков: %s", e)
+            return 0
+
+    def close(self):
+        """Дожидается кодирования начатых снимков"""
+        with self.lock:
+            pending = list(self.pending.values())
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass
+        if self.encoder is not None:
+            self.encoder.shutdown(wait=True)
@@ -1,72 +1,71 @@
-import os
 import subprocess
-import pyautogui
-import time
 import logging
+from modules.screen_tools import parse_monitor
 
 logger = logging.getLogger("jarvis.system")
 
 class SystemCommands:
-    def __init__(self):
+    def __init__(self, executor=None, command_timeout=10, screen_tools=None):
         """Инициализация модуля системных команд"""
+        self.executor = executor
+        self.command_timeout = command_timeout
+        self.screen_tools = screen_tools
         logger.info("Модуль системных команд инициализирован")
     
     def shutdown(self):
         """Выключает компьютер"""
         logger.info("Выполняется команда выключения")
         try:
-            subprocess.run(["shutdown", "/s", "/t", "60", "/c", "Выключение компьютера по команде пользователя"])
+            subprocess.run(["shutdown", "/s", "/t", "60", "/c", "Выключение компьютера по команде пользователя"], timeout=self.command_timeout)
             return "Компьютер будет выключен через 60 секунд. Скажите 'отмени выключение', чтобы отменить."
         except Exception as e:
-            logger.error(f"Ошибка при выключении: {e}")
+            logger.error("Ошибка при выключении: %s", e)
             return f"Не удалось выключить компьютер: {e}"
     
     def cancel_shutdown(self):
         """Отменяет выключение компьютера"""
         logger.info("Отмена выключения")
         try:
-            subprocess.run(["shutdown", "/a"])
+            subprocess.run(["shutdown", "/a"], timeout=self.command_timeout)
             return "Выключение отменено"
         except Exception as e:
-            logger.error(f"Ошибка при отмене выключения: {e}")
+            logger.error("Ошибка при отмене выключения: %s", e)
             return f"Не удалось отменить выключение: {e}"
     
     def restart(self):
         """Перезагружает компьютер"""
         logger.info("Выполняется команда перезагрузки")
         try:
-            subprocess.run(["shutdown", "/r", "/t", "60", "/c", "Перезагрузка компьютера по команде пользователя"])
+            subprocess.run(["shutdown", "/r", "/t", "60", "/c", "Перезагрузка компьютера по команде пользователя"], timeout=self.command_timeout)
             return "Компьютер будет перезагружен через 60 секунд. Скажите 'отмени перезагрузку', чтобы отменить."
         except Exception as e:
-            logger.error(f"Ошибка при перезагрузке: {e}")
+            logger.error("Ошибка при перезагрузке: %s", e)
             return f"Не удалось перезагрузить компьютер: {e}"
     
-    def take_screenshot(self, save_dir):
-        """Делает скриншот экрана"""
+    def take_screenshot(self, request=""):
+        """Делает скриншот экрана или монитора, названного в запросе"""
         logger.info("Делаю скриншот")
         try:
-            # Создаем директорию, если она не существует
-            os.makedirs(save_dir, exist_ok=True)
-            
-            # Формируем имя файла с временной меткой
-            filename = f"screenshot_{int(time.time())}.png"
-            filepath = os.path.join(save_dir, filename)
-            
-            # Делаем скриншот
-            screenshot = pyautogui.screenshot()
-            screenshot.save(filepath)
-            
-            return f"Скриншот сохранен: {filepath}"
+            # Файл кодируется в фоне: ответ не ждет сжатия
+            path, future = self.screen_tools.capture(monitor=parse_monitor(request))
+            if future is None:
+                return f"Экран не изменился, скриншот уже сохранен: {path}"
+            return f"Скриншот сохранен: {path}"
         except Exception as e:
-            logger.error(f"Ошибка при создании скриншота: {e}")
+            logger.error("Ошибка при создании скриншота: %s", e)
             return f"Не удалось сделать скриншот: {e}"
     
     def lock_computer(self):
         """Блокирует компьютер"""
         logger.info("Блокировка компьютера")
         try:
-            subprocess.run(["rundll32.exe", "user32.dll,LockWorkStation"])
+            subprocess.run(["rundll32.exe", "user32.dll,LockWorkStation"], timeout=self.command_timeout)
             return "Компьютер заблокирован"
         except Exception as e:
-            logger.error(f"Ошибка при блокировке: {e}")
-            return f"Не удалось заблокировать компьютер: {e}"
\ No newline at end of file
+            logger.error("Ошибка при блокировке: %s", e)
+            return f"Не удалось заблокировать компьютер: {e}"
+    
+    def close(self):
+        """Дожидается сохранения снимков"""
+        if self.screen_tools is not None:
+            self.screen_tools.close()
\ No newline at end of file
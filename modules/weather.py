@@ -0,0 +1,218 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger("jarvis.weather")
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+# Именительный падеж для частых городов; по нему выбирается вариант нормализации
+KNOWN_CITIES = [
+    "Москва", "Санкт-Петербург", "Новосибирск", "Екатеринбург", "Казань", "Нижний Новгород",
+    "Челябинск", "Самара", "Омск", "Ростов-на-Дону", "Уфа", "Красноярск", "Воронеж", "Пермь",
+    "Волгоград", "Краснодар", "Саратов", "Тюмень", "Тольятти", "Ижевск", "Барнаул", "Ульяновск",
+    "Иркутск", "Хабаровск", "Ярославль", "Владивосток", "Махачкала", "Томск", "Оренбург",
+    "Кемерово", "Рязань", "Астрахань", "Пенза", "Липецк", "Тула", "Киров", "Калининград",
+    "Сочи", "Минск", "Киев", "Алматы", "Астана", "Ташкент", "Тбилиси", "Ереван", "Рига",
+    "Вильнюс", "Таллин", "Лондон", "Париж", "Берлин", "Рим", "Мадрид", "Прага", "Вена",
+    "Нью-Йорк", "Токио", "Пекин", "Дубай", "Стамбул",
+]
+
+CITY_ALIASES = {
+    "мск": "Москва",
+    "питер": "Санкт-Петербург",
+    "спб": "Санкт-Петербург",
+    "петербург": "Санкт-Петербург",
+    "нижний": "Нижний Новгород",
+    "екб": "Екатеринбург",
+}
+
+# Окончания косвенных падежей и варианты именительного падежа, от более длинных к коротким
+CASE_ENDINGS = [
+    ("ем", ["ий"]), ("ом", ["", "о"]), ("ой", ["ая", "а"]), ("ей", ["ь"]),
+    ("ах", ["а", "и"]), ("е", ["", "а", "о", "ь"]), ("и", ["ь", "а", "и"]),
+    ("у", ["", "а"]), ("ю", ["я", "ь"]), ("а", [""]), ("я", ["ь"]),
+]
+
+class CityNotFound(RuntimeError):
+    """API не знает такого города (ответ 404)"""
+
+def word_forms(word):
+    """Возможные именительные формы слова, начиная с самого вероятного"""
+    forms = [word]
+    for ending, replacements in CASE_ENDINGS:
+        if word.endswith(ending) and len(word) > len(ending) + 1:
+            stem = word[:-len(ending)]
+            forms.extend(stem + replacement for replacement in replacements)
+    return forms
+
+class CityNormalizer:
+    def __init__(self, known_cities=KNOWN_CITIES, aliases=None, max_candidates=4):
+        """Приводит название города к именительному падежу: «москве» → «Москва».
+
+        Для города не из списка падеж неизвестен, поэтому предлагается
+        несколько вариантов: название как есть, затем формы без окончаний.
+        """
+        self.known = {city.lower(): city for city in known_cities}
+        self.aliases = dict(CITY_ALIASES)
+        self.aliases.update({alias.lower(): city for alias, city in (aliases or {}).items()})
+        self.max_candidates = max_candidates
+        self.cache = {}
+
+    @staticmethod
+    def make_key(name):
+        return " ".join(name.lower().replace("ё", "е").split())
+
+    def normalize(self, name):
+        """Самый вероятный вариант названия"""
+        return self.candidates(name)[0]
+
+    def candidates(self, name):
+        """Варианты названия для запроса к API, начиная с самого вероятного"""
+        key = self.make_key(name)
+        if key in self.cache:
+            return self.cache[key]
+
+        city = self.aliases.get(key) or self.known.get(key)
+        if city is not None:
+            found = [city]
+        else:
+            # Части составного названия склоняются отдельно: «нижнем новгороде», «ростове-на-дону»
+            words = key.split(" ")
+            candidates = [""]
+            for word in words:
+                parts = word.split("-")
+                head_forms = word_forms(parts[0])
+                forms = [form + ("-" + "-".join(parts[1:]) if len(parts) > 1 else "") for form in head_forms]
+                candidates = [f"{prefix} {form}".strip() for prefix in candidates for form in forms][:64]
+
+            for candidate in candidates:
+                city = self.aliases.get(candidate) or self.known.get(candidate)
+                if city is not None:
+                    found = [city]
+                    break
+            else:
+                # Неизвестный город: «Анапа» уже в именительном падеже, а «Барселоне» —
+                # нет, поэтому первым идет название как есть, затем формы без окончаний
+                found = list(dict.fromkeys(candidate.title() for candidate in candidates))[:self.max_candidates]
+
+        self.remember(name, found)
+        return found
+
+    def remember(self, name, candidates):
+        """Запоминает варианты названия (или подтвержденное API название)"""
+        if len(self.cache) >= 1000:
+            self.cache.clear()
+        self.cache[self.make_key(name)] = candidates
+
+class WeatherService:
+    def __init__(self, api_key, config=None):
+        """Погода через OpenWeatherMap с общим пулом соединений и кэшем по городам.
+
+        base_url можно указать на локальный сервер-заглушку для проверок.
+        """
+        config = config or {}
+        self.api_key = api_key
+        self.base_url = config.get("base_url", DEFAULT_BASE_URL)
+        self.default_city = config.get("default_city", "Москва")
+        self.ttl = config.get("ttl", 600)
+        self.timeout = (config.get("connect_timeout", 3), config.get("read_timeout", 5))
+        self.retries = config.get("retries", 2)
+        self.backoff = config.get("backoff", 0.5)
+        self.prefetch_interval = config.get("prefetch_interval", 480)
+
+        self.normalizer = CityNormalizer(aliases=config.get("aliases"))
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+        self.session = None
+        self.session_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.prefetch_thread = None
+
+    def get_session(self):
+        """Общая сессия requests с пулом соединений и повторами (создается при первом запросе)"""
+        with self.session_lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=self.retries, backoff_factor=self.backoff,
+                    status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",)
+                )
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def get(self, city=None):
+        """Возвращает (название города, данные API) из кэша или из сети.
+
+        Варианты названия неизвестного города перебираются, пока API
+        отвечает 404; подтвержденное название запоминается.
+        """
+        name = city or self.default_city
+        candidates = self.normalizer.candidates(name)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.cache.get(candidates[0])
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return candidates[0], entry[1]
+            self.misses += 1
+
+        for index, city in enumerate(candidates):
+            try:
+                data = self.fetch(city)
+                break
+            except CityNotFound:
+                if index == len(candidates) - 1:
+                    raise
+        if len(candidates) > 1:
+            self.normalizer.remember(name, [city])
+        with self.lock:
+            self.cache[city] = (time.monotonic() + self.ttl, data)
+        return city, data
+
+    def fetch(self, city):
+        """Запрашивает погоду; ошибки API выбрасываются как RuntimeError"""
+        response = self.get_session().get(
+            self.base_url,
+            params={"q": city, "appid": self.api_key, "units": "metric", "lang": "ru"},
+            timeout=self.timeout,
+        )
+        data = response.json()
+        if response.status_code == 404:
+            raise CityNotFound(data.get("message", "город не найден"))
+        if response.status_code != 200:
+            raise RuntimeError(data.get("message", "неизвестная ошибка"))
+        return data
+
+    def start_prefetch(self):
+        """Держит погоду города по умолчанию свежей в фоновом потоке"""
+        if self.prefetch_thread is not None or self.prefetch_interval <= 0:
+            return
+
+        def run():
+            while not self.stop_event.is_set():
+                try:
+                    city = self.normalizer.normalize(self.default_city)
+                    data = self.fetch(city)
+                    with self.lock:
+                        self.cache[city] = (time.monotonic() + self.ttl, data)
+                except Exception as e:
+                    logger.warning("Не удалось заранее получить погоду: %s", e)
+                self.stop_event.wait(self.prefetch_interval)
+
+        self.prefetch_thread = threading.Thread(target=run, name="jarvis-weather-prefetch", daemon=True)
+        self.prefetch_thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.session is not None:
+            self.session.close()
@@ -1,9 +1,7 @@
 import webbrowser
 import urllib.parse
 import logging
-import requests
-from bs4 import BeautifulSoup
-import re
+from core.intents import classify_intent
 
 logger = logging.getLogger("jarvis.web_search")
 
@@ -27,7 +25,7 @@ class WebSearch:
     
     def search(self, query, engine="google"):
         """Выполняет поиск запроса в указанном поисковике"""
-        logger.info(f"Поиск запроса: '{query}' в {engine}")
+        logger.info("Поиск запроса: '%s' в %s", query, engine)
         
         if engine in self.search_engines:
             url = self.search_engines[engine].format(urllib.parse.quote(query))
@@ -38,7 +36,7 @@ class WebSearch:
     
     def specialized_search(self, query, search_type):
         """Выполняет специализированный поиск"""
-        logger.info(f"Специализированный поиск: '{query}', тип: {search_type}")
+        logger.info("Специализированный поиск: '%s', тип: %s", query, search_type)
         
         if search_type in self.specialized_searches:
             url = self.specialized_searches[search_type].format(urllib.parse.quote(query))
@@ -55,40 +53,22 @@ class WebSearch:
         """Ищет видео по запросу"""
         return self.specialized_search(query, "видео")
     
-    def parse_search_intent(self, query):
-        """Анализирует запрос и определяет тип поиска"""
-        query = query.lower()
-        
-        # Проверяем различные шаблоны запросов
-        if re.search(r'найти рецепт|как приготовить|рецепт', query):
-            # Извлекаем название блюда
-            match = re.search(r'рецепт\s+([а-яё\s]+)', query) or \
-                    re.search(r'приготовить\s+([а-яё\s]+)', query) or \
-                    re.search(r'найти\s+рецепт\s+([а-яё\s]+)', query)
-            
-            if match:
-                dish_name = match.group(1).strip()
-                return self.search_recipe(dish_name)
-            else:
-                # Если не удалось извлечь название блюда
-                dish_name = query.replace("найти рецепт", "").replace("рецепт", "").replace("как приготовить", "").strip()
-                return self.search_recipe(dish_name)
-        
-        elif re.search(r'найти видео|посмотреть видео', query):
-            # Извлекаем тему видео
-            match = re.search(r'видео\s+([а-яё\s]+)', query)
-            if match:
-                video_topic = match.group(1).strip()
-                return self.search_video(video_topic)
-            else:
-                # Если не удалось извлечь тему видео
-                video_topic = query.replace("найти видео", "").replace("посмотреть видео", "").strip()
-                return self.search_video(video_topic)
+    def execute_intent(self, intent):
+        """Выполняет поиск по заранее классифицированному намерению"""
+        if intent.type == "search_recipe":
+            return self.search_recipe(intent.slots.get("dish", ""))
+        elif intent.type == "search_video":
+            return self.search_video(intent.slots.get("topic", ""))
+        elif intent.type == "search":
+            return self.search(intent.slots.get("query", ""))
         
-        elif re.search(r'найти|поиск|искать|загугли|найди', query):
-            # Общий поиск
-            search_query = re.sub(r'найти|поиск|искать|загугли|найди', '', query).strip()
-            return self.search(search_query)
+        return None
+    
+    def parse_search_intent(self, query):
+        """Анализирует запрос, определяет тип поиска и выполняет его"""
+        intent = classify_intent(query, handler="web_search")
+        if intent:
+            return self.execute_intent(intent)
         
         # Если не подходит ни один из шаблонов, возвращаем None
         return None
\ No newline at end of file
@@ -0,0 +1,41 @@
+import os
+import json
+import unittest
+from core.command_router import CommandRouter
+
+COMMANDS_FILE = os.path.join(os.path.dirname(__file__), "..", "config", "commands.json")
+
+class FuzzyMatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(COMMANDS_FILE, encoding="utf-8") as f:
+            cls.router = CommandRouter(json.load(f))
+
+    def test_exact_commands(self):
+        self.assertEqual(self.router.match("выключи компьютер")[:2], ("system_commands", "shutdown"))
+        self.assertEqual(self.router.match("открой блокнот")[:2], ("app_commands", "open_application"))
+
+    def test_garbled_command(self):
+        self.assertEqual(self.router.match("прогнос погоды")[:2], ("personal_commands", "get_weather"))
+
+    def test_ordinary_phrases_are_not_commands(self):
+        # Раньше эти фразы нечетко совпадали с триггерами и запускали действия
+        for text in ("включи компьютер", "какой вход в метро", "закрою глаза", "открою секрет", "найду ли я работу"):
+            with self.subTest(text=text):
+                self.assertIsNone(self.router.match(text))
+
+    def test_garbled_safe_system_command(self):
+        self.assertEqual(self.router.match("сделай скрин шот")[:2], ("system_commands", "take_screenshot"))
+
+    def test_no_fuzzy_irreversible_actions(self):
+        for text in ("выключи компютер", "перезагрузи компютер", "выключис"):
+            with self.subTest(text=text):
+                match = self.router.match(text)
+                self.assertNotIn(match[1] if match else None, ("shutdown", "restart", "exit"))
+
+    def test_ambiguous_word_is_not_corrected(self):
+        router = CommandRouter({"a": {"покажи окно": "x", "покажи окна": "y"}}, {"min_word_length": 3})
+        self.assertIsNone(router.correct_word("окну"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from benchmarks import fakes
+from core.response_cache import ResponseCache
+
+class TimeSensitiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(os.path.join(self.tmp.name, "cache.json"), {"flush_interval": 0})
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_time_sensitive_questions_bypass_cache(self):
+        for text in ("какая погода в Москве", "что сегодня по телевизору", "какое число", "курс доллара",
+                     "в каком году", "последние новости", "который час", "какая дата"):
+            with self.subTest(text=text):
+                self.assertFalse(self.cache.is_cacheable(text))
+
+    def test_timeless_questions_are_cached(self):
+        # Короткие основы раньше находились внутри обычных слов
+        for text in ("что выгоднее купить", "кто такой кандидат наук", "что такое мандат",
+                     "чему равно число пи", "как настроить курсор мыши", "что ты умеешь"):
+            with self.subTest(text=text):
+                self.assertTrue(self.cache.is_cacheable(text))
+
+    def test_follow_up(self):
+        for text in ("а почему?", "расскажи о нем подробнее", "а там холодно"):
+            with self.subTest(text=text):
+                self.assertTrue(self.cache.is_follow_up(text))
+        self.assertFalse(self.cache.is_follow_up("что ты умеешь"))
+
+class AICacheTest(unittest.TestCase):
+    def setUp(self):
+        from core.ai_brain import AI
+        from core.memory import MemorySystem
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.chat = fakes.FakeChatCompletion(reply="Отвечаю на вопросы.")
+        self.restore = fakes.install_chat_completion(self.chat)
+        self.memory = MemorySystem(os.path.join(self.tmp.name, "memory"))
+        self.ai = AI({"api_key": "test", "stream": False, "cache": {"flush_interval": 0}}, self.memory)
+
+    def tearDown(self):
+        self.ai.close()
+        self.memory.close()
+        self.restore()
+        self.tmp.cleanup()
+
+    def test_repeated_question_hits_after_other_turns(self):
+        self.ai.process("что ты умеешь")
+        self.ai.process("расскажи про Марс")
+        self.ai.process("что ты умеешь")
+        self.ai.process("что ты умеешь")
+        self.assertEqual(self.chat.calls, 2)
+        self.assertEqual(self.ai.cache.stats()["hits"], 2)
+
+    def test_follow_up_depends_on_conversation(self):
+        self.ai.process("расскажи про Марс")
+        self.ai.process("а почему?")
+        self.ai.process("расскажи про Венеру")
+        self.ai.process("а почему?")
+        self.assertEqual(self.chat.calls, 4)
+
+if __name__ == "__main__":
+    unittest.main()
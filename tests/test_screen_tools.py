@@ -0,0 +1,79 @@
+import os
+import time
+import tempfile
+import unittest
+from modules.screen_tools import Frame, Region, ScreenTools, apply_retention, perceptual_hash
+
+WIDTH, HEIGHT = 1000, 600
+
+def desktop(text_row=None):
+    """Кадр с градиентом; text_row рисует «строку текста» 400x18 пикселей"""
+    rows = []
+    for y in range(HEIGHT):
+        row = bytearray(WIDTH * 3)
+        row[0::3] = bytes(x * 255 // WIDTH for x in range(WIDTH))
+        row[1::3] = bytes((y * 255 // HEIGHT,)) * WIDTH
+        row[2::3] = b"\x80" * WIDTH
+        if text_row is not None and text_row <= y < text_row + 18:
+            for x in range(300, 700, 3):
+                row[x * 3:x * 3 + 3] = b"\x00\x00\x00"
+        rows.append(bytes(row))
+    return Frame((WIDTH, HEIGHT), b"".join(rows))
+
+class FrameSource:
+    """Источник, отдающий заранее заданные кадры по очереди"""
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def monitors(self):
+        return [Region(0, 0, WIDTH, HEIGHT)]
+
+    def grab(self, region=None):
+        return self.frames.pop(0)
+
+class DedupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tools = ScreenTools(self.tmp.name, config={"source": "synthetic", "retention": {"max_mb": 0, "max_age_days": 0}})
+
+    def tearDown(self):
+        self.tools.close()
+        self.tmp.cleanup()
+
+    def test_identical_frame_reuses_file(self):
+        frame = desktop()
+        self.tools.source = FrameSource([frame, frame])
+        path, future = self.tools.capture()
+        future.result()
+        self.assertEqual(self.tools.capture(), (path, None))
+
+    def test_small_text_change_saves_new_file(self):
+        before, after = desktop(), desktop(text_row=290)
+        # Перцептивный хэш такое изменение не различает
+        self.assertLessEqual(bin(perceptual_hash(before) ^ perceptual_hash(after)).count("1"), self.tools.dedup_distance)
+        self.tools.source = FrameSource([before, after])
+        first, future = self.tools.capture()
+        future.result()
+        time.sleep(0.002)
+        second, future = self.tools.capture()
+        self.assertIsNotNone(future)
+        self.assertNotEqual(first, second)
+        future.result()
+        self.assertTrue(os.path.exists(second))
+
+class RetentionTest(unittest.TestCase):
+    def test_only_screenshots_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            names = ["screenshot_1.png", "screenshot_2.jpg", "notes.txt", "photo.png", "screenshot_3.png.tmp"]
+            old = time.time() - 100 * 86400
+            for name in names:
+                path = os.path.join(directory, name)
+                with open(path, 'wb') as f:
+                    f.write(b"x" * 10)
+                os.utime(path, (old, old))
+
+            self.assertEqual(apply_retention(directory, max_age=86400), 2)
+            self.assertEqual(sorted(os.listdir(directory)), ["notes.txt", "photo.png", "screenshot_3.png.tmp"])
+
+if __name__ == "__main__":
+    unittest.main()
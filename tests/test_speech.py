@@ -0,0 +1,42 @@
+import unittest
+from benchmarks import fakes
+
+class SerialEchoTest(unittest.TestCase):
+    """Без конвейера захват не должен выдавать собственную речь Джарвиса как фразу"""
+
+    def setUp(self):
+        # «Голос» в микрофоне с 0.6 по 1.4 с — это звучит ответ Джарвиса
+        audio = fakes.synthetic_speech(seconds=2.5, bursts=((0.6, 1.4),))
+        self.restore = [
+            fakes.install_tts(fakes.FakeTTSEngine(seconds_per_char=0.05)),
+            fakes.install_microphone(lambda: fakes.FakeMicrophone(audio, realtime=True)),
+        ]
+        # Модуль речи импортирует pyttsx3, поэтому заменитель ставится раньше
+        from core.speech import SpeechEngine
+        self.speech = SpeechEngine({"tts_cache": {"enabled": False}, "pause_threshold": 0.3})
+
+    def tearDown(self):
+        self.speech.close()
+        for restore in reversed(self.restore):
+            restore()
+
+    def speak_over_microphone(self, muted):
+        capture = self.speech.capture
+        capture.start()
+        # Ответ длится 1.5 с и перекрывает «голос» в микрофоне
+        if muted:
+            with self.speech.muted():
+                self.speech.speak("ответ" * 6)
+        else:
+            self.speech.speak("ответ" * 6)
+        capture.thread.join()
+        return capture.utterances.qsize()
+
+    def test_own_speech_is_not_a_phrase(self):
+        self.assertEqual(self.speak_over_microphone(muted=True), 0)
+
+    def test_phrase_without_muting(self):
+        self.assertEqual(self.speak_over_microphone(muted=False), 1)
+
+if __name__ == "__main__":
+    unittest.main()
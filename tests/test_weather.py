@@ -0,0 +1,39 @@
+import unittest
+from benchmarks.fake_weather_server import FakeWeatherServer
+from modules.weather import CityNotFound, WeatherService
+
+class UnknownCityTest(unittest.TestCase):
+    def setUp(self):
+        # Как OpenWeatherMap: падежные формы и обрубки названий неизвестны
+        self.server = FakeWeatherServer(delay=0, unknown={"Барселоне", "Барселон", "Нигдеграде", "Нигдеград",
+                                                          "Нигдеграда", "Нигдеградо"}).start()
+        self.service = WeatherService("test", {"base_url": self.server.base_url, "prefetch_interval": 0})
+
+    def tearDown(self):
+        self.service.close()
+        self.server.stop()
+
+    def test_nominative_city_is_queried_as_is(self):
+        city, data = self.service.get("анапа")
+        self.assertEqual(city, "Анапа")
+        self.assertEqual(self.server.cities, ["Анапа"])
+
+    def test_locative_city_falls_back_to_stripped_forms(self):
+        city, _ = self.service.get("барселоне")
+        self.assertEqual(city, "Барселона")
+        self.assertEqual(self.server.cities, ["Барселоне", "Барселон", "Барселона"])
+
+        # Подтвержденное название запоминается: повтор берется из кэша
+        self.assertEqual(self.service.get("барселоне")[0], "Барселона")
+        self.assertEqual(len(self.server.cities), 3)
+
+    def test_known_city(self):
+        self.assertEqual(self.service.get("москве")[0], "Москва")
+        self.assertEqual(self.server.cities, ["Москва"])
+
+    def test_city_not_found(self):
+        with self.assertRaises(CityNotFound):
+            self.service.get("нигдеграде")
+
+if __name__ == "__main__":
+    unittest.main()
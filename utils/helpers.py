@@ -0,0 +1,38 @@
+import re
+
+# Конец предложения: знак препинания (и закрывающие кавычки/скобки), затем пробел
+SENTENCE_END_PATTERN = re.compile(r'[.!?…]+["»)]*\s+')
+
+class SpokenResponse(str):
+    """Ответ, который уже был произнесен по мере генерации"""
+
+class SentenceSplitter:
+    def __init__(self, min_length=12):
+        """Инкрементально делит поток текста на предложения.
+
+        Слишком короткие куски (например, «Да.» или «т. е.») присоединяются
+        к следующему предложению, чтобы речь не дробилась.
+        """
+        self.min_length = min_length
+        self.buffer = ""
+
+    def feed(self, text):
+        """Добавляет фрагмент текста и возвращает завершенные предложения"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END_PATTERN.finditer(self.buffer):
+            if match.end() - start < self.min_length:
+                continue
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Возвращает оставшийся незавершенный текст"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
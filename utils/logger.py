@@ -1,22 +1,113 @@
-import logging
 import os
-from logging.handlers import RotatingFileHandler
+import json
+import copy
+import queue
+import atexit
+import logging
+from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from utils.metrics import metrics
+
+# Слушатели очередей по именам логгеров: повторная настройка не добавляет обработчиков
+LISTENERS = {}
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, queue_size=10000):
+        """Кладет записи в ограниченную очередь, не блокируя вызывающий поток.
+
+        Если очередь переполнена (диск не успевает), запись отбрасывается
+        и учитывается в счетчике dropped.
+        """
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Подставляем аргументы в сообщение, а форматирование строки и
+        # трассировки оставляем потоку записи
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.increment("log_records_dropped")
+
+class LogListener(QueueListener):
+    def enqueue_sentinel(self):
+        # При остановке ждем места в очереди: накопленные записи дописываются, а не теряются
+        self.queue.put(self._sentinel)
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON"""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logger(name, log_file, level=logging.INFO, json_lines=False, queue_size=10000):
+    """Настраивает логгер с записью в файл в отдельном потоке.
 
-def setup_logger(name, log_file, level=logging.INFO):
-    """Настраивает логгер"""
+    Вызовы логгера только кладут запись в очередь; файл с ротацией пишет
+    QueueListener. Повторный вызов для того же логгера не добавляет
+    обработчиков: меняет уровень и формат, а для другого файла или
+    размера очереди перезапускает запись.
+    """
     # Создаем логгер
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
+    formatter = JsonLinesFormatter() if json_lines else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    current = LISTENERS.get(name)
+    if current is not None:
+        queue_handler, listener = current
+        file_handler = listener.handlers[0]
+        if file_handler.baseFilename == os.path.abspath(log_file) and queue_handler.queue.maxsize == queue_size:
+            file_handler.setFormatter(formatter)
+            return logger
+        stop_listener(name)
+
     # Создаем обработчик для вывода в файл с ротацией
     # Максимальный размер файла - 1 МБ, максимальное количество файлов - 3
-    handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=3, encoding='utf-8')
-    
-    # Создаем форматтер
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    file_handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=3, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+
+    queue_handler = BoundedQueueHandler(queue_size)
+    listener = LogListener(queue_handler.queue, file_handler, respect_handler_level=True)
+    listener.start()
+
     # Добавляем обработчик к логгеру
-    logger.addHandler(handler)
-    
-    return logger
\ No newline at end of file
+    logger.addHandler(queue_handler)
+    LISTENERS[name] = (queue_handler, listener)
+
+    return logger
+
+def dropped_records():
+    """Число записей, отброшенных из-за переполнения очередей, по логгерам"""
+    return {name: queue_handler.dropped for name, (queue_handler, _) in LISTENERS.items()}
+
+def stop_listener(name):
+    """Отключает очередь логгера, дописывает накопленные записи и закрывает файл"""
+    queue_handler, listener = LISTENERS.pop(name)
+    logging.getLogger(name).removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+@atexit.register
+def shutdown_logging():
+    """Дописывает оставшиеся в очередях записи и закрывает файлы"""
+    for name in list(LISTENERS):
+        stop_listener(name)
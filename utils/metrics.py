@@ -0,0 +1,208 @@
+import os
+import time
+import math
+import json
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from core.persistence import atomic_write_json
+
+logger = logging.getLogger("jarvis.metrics")
+
+# Границы корзин гистограммы в секундах: от 50 мкс до ~2 минут с шагом 20%
+BUCKET_BOUNDS = [5e-5 * 1.2 ** i for i in range(int(math.log(120 / 5e-5, 1.2)) + 2)]
+
+class Histogram:
+    def __init__(self):
+        """Гистограмма длительностей с логарифмическими корзинами"""
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Оценка перцентиля: линейная интерполяция внутри корзины"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for index, in_bucket in enumerate(self.buckets):
+            if in_bucket and seen + in_bucket >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / in_bucket, self.max)
+            seen += in_bucket
+        return self.max
+
+class Metrics:
+    def __init__(self):
+        """Гистограммы задержек по стадиям хода и счетчики событий.
+
+        Ключ — имя и метки (например, stage="handler", category, action).
+        """
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def observe(self, stage, seconds, **labels):
+        """Записывает длительность стадии"""
+        key = self.key(stage, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1, **labels):
+        """Увеличивает счетчик"""
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Замеряет длительность блока; исключения считаются отдельным счетчиком"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment("errors", stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """Текущее состояние: перцентили по стадиям (в миллисекундах) и счетчики"""
+        with self.lock:
+            stages = [
+                {
+                    "stage": name, "labels": dict(labels), "count": histogram.count,
+                    "sum_ms": round(histogram.total * 1000, 3),
+                    "p50_ms": round(histogram.percentile(0.5) * 1000, 3),
+                    "p95_ms": round(histogram.percentile(0.95) * 1000, 3),
+                    "p99_ms": round(histogram.percentile(0.99) * 1000, 3),
+                    "max_ms": round(histogram.max * 1000, 3),
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {"time": time.time(), "stages": stages, "counters": counters}
+
+    def prometheus(self):
+        """Состояние в текстовом формате Prometheus"""
+        def format_labels(labels):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+        snapshot = self.snapshot()
+        lines = ["# TYPE jarvis_stage_seconds summary"]
+        for stage in snapshot["stages"]:
+            labels = ",".join(f'{name}="{value}"' for name, value in {"stage": stage["stage"], **stage["labels"]}.items())
+            for quantile, field in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'jarvis_stage_seconds{{{labels},quantile="{quantile}"}} {stage[field] / 1000:.6g}')
+            lines.append(f"jarvis_stage_seconds_sum{{{labels}}} {stage['sum_ms'] / 1000:.6g}")
+            lines.append(f"jarvis_stage_seconds_count{{{labels}}} {stage['count']}")
+        declared = set()
+        for counter in snapshot["counters"]:
+            name = f"jarvis_{counter['name']}_total"
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{format_labels(counter['labels'])} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+# Общий набор метрик процесса
+metrics = Metrics()
+
+class MetricsExporter:
+    def __init__(self, metrics, config=None, default_file=None):
+        """Периодически сохраняет метрики в файл и, если задан port, отдает их по HTTP на 127.0.0.1.
+
+        port=0 выбирает свободный порт.
+        """
+        config = config or {}
+        self.metrics = metrics
+        self.file = config.get("file", default_file)
+        self.interval = config.get("interval", 30)
+        self.port = config.get("port")
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self):
+        if self.file and self.interval > 0:
+            self.thread = threading.Thread(target=self.run, name="jarvis-metrics", daemon=True)
+            self.thread.start()
+        if self.port is not None:
+            self.start_server()
+        return self
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        """Записывает снимок метрик в файл"""
+        if not self.file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.file) or ".", exist_ok=True)
+            atomic_write_json(self.file, self.metrics.snapshot())
+        except Exception as e:
+            logger.error("Ошибка сохранения метрик: %s", e)
+
+    def start_server(self):
+        """Локальная точка сбора: /metrics (Prometheus) и /metrics.json"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        try:
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        except OSError as e:
+            logger.error("Не удалось открыть порт метрик %s: %s", self.port, e)
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="jarvis-metrics-http", daemon=True).start()
+        logger.info("Метрики доступны на http://127.0.0.1:%s/metrics", self.server.server_address[1])
+
+    def close(self):
+        """Останавливает экспорт и сохраняет итоговый снимок"""
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.export()
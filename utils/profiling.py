@@ -0,0 +1,128 @@
+import os
+import io
+import gc
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+
+logger = logging.getLogger("jarvis.profiling")
+
+class TurnProfiler:
+    def __init__(self, report_dir, config=None):
+        """Профилирование ходов диалога: cProfile и рост памяти раз в N ходов.
+
+        В выключенном режиме run() просто вызывает функцию, без накладных расходов.
+        """
+        config = config or {}
+        self.report_dir = report_dir
+        self.enabled = config.get("enabled", False) or os.environ.get("JARVIS_PROFILE") == "1"
+        self.every_n_turns = max(1, config.get("every_n_turns", 20))
+        self.top = config.get("top", 15)
+        self.max_reports = config.get("max_reports", 50)
+
+        # Ходы обрабатываются параллельно несколькими потоками конвейера
+        self.turns = 0
+        self.turns_lock = threading.Lock()
+        # Одновременно профилируется только один ход: cProfile в Python 3.12+
+        # не допускает двух активных профилировщиков, а снимки памяти общие
+        self.profile_lock = threading.Lock()
+        self.previous_snapshot = None
+
+        # Отчеты разных запусков не перезаписывают друг друга и сортируются по времени
+        self.session = time.strftime("%Y%m%d-%H%M%S")
+
+        if self.enabled:
+            os.makedirs(report_dir, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(config.get("traceback_depth", 10))
+            self.previous_snapshot = self.take_snapshot()
+            logger.info("Профилирование включено: отчет каждые %s ходов", self.every_n_turns)
+
+    def run(self, func, *args, **kwargs):
+        """Выполняет ход; каждый N-й ход профилируется и сохраняется отчет"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        with self.turns_lock:
+            self.turns += 1
+            turn = self.turns
+        if turn % self.every_n_turns or not self.profile_lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+
+        try:
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            result = profile.runcall(func, *args, **kwargs)
+            elapsed = time.perf_counter() - started
+
+            try:
+                self.write_report(profile, elapsed, getattr(func, "__name__", str(func)), turn)
+            except Exception as e:
+                logger.error("Ошибка записи отчета профилирования: %s", e)
+        finally:
+            self.profile_lock.release()
+
+        return result
+
+    def take_snapshot(self):
+        """Снимок выделений памяти без служебных кадров"""
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def write_report(self, profile, elapsed, name, turn):
+        """Пишет компактный отчет: горячие функции, рост памяти и счетчики объектов"""
+        out = io.StringIO()
+        out.write(f"Ход {turn}: {name} за {elapsed * 1000:.1f} мс\n\n")
+
+        # Горячие функции по собственному и накопленному времени
+        out.write(f"== Горячие функции (top {self.top}, cumulative) ==\n")
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        # Рост памяти с предыдущего отчета
+        snapshot = self.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        out.write(f"== Память: сейчас {current / 1024:.0f} КБ, пик {peak / 1024:.0f} КБ ==\n")
+        out.write(f"== Главные источники роста (top {self.top}) ==\n")
+        for diff in snapshot.compare_to(self.previous_snapshot, "lineno")[:self.top]:
+            out.write(f"{diff}\n")
+        self.previous_snapshot = snapshot
+
+        out.write(f"\n== Крупнейшие выделения (top {self.top}) ==\n")
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            out.write(f"{stat}\n")
+
+        # Накапливающиеся обработчики логов и объекты
+        out.write("\n== Обработчики логов ==\n")
+        for logger_name, handlers in self.logger_handlers():
+            out.write(f"{logger_name}: {handlers}\n")
+        out.write(f"\n== Сборщик мусора: объектов {len(gc.get_objects())}, поколения {gc.get_count()} ==\n")
+
+        path = os.path.join(self.report_dir, f"turn_{self.session}_{turn:06d}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+        logger.info("Отчет профилирования сохранен: %s", path)
+
+        self.prune_reports()
+
+    def logger_handlers(self):
+        """Возвращает число обработчиков у логгеров джарвиса"""
+        result = []
+        for logger_name, item in sorted(logging.Logger.manager.loggerDict.items()):
+            if logger_name.startswith("jarvis") and isinstance(item, logging.Logger) and item.handlers:
+                result.append((logger_name, len(item.handlers)))
+        return result
+
+    def prune_reports(self):
+        """Оставляет только последние max_reports отчетов"""
+        reports = sorted(name for name in os.listdir(self.report_dir) if name.startswith("turn_"))
+        for name in reports[:-self.max_reports]:
+            os.remove(os.path.join(self.report_dir, name))